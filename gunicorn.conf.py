@@ -0,0 +1,42 @@
+"""
+The pre-fork serving mode of the hive node, every worker process has its own threads to handle the requests.
+
+$ gunicorn -c gunicorn.conf.py wsgi:app
+
+The environment variables:
+
+- HIVE_BIND: the listening address, default '0.0.0.0:5000'.
+- HIVE_WORKERS: the count of the worker processes, default is the count of the CPUs.
+- HIVE_THREADS: the count of the threads of every worker, default 8.
+- HIVE_TIMEOUT: the seconds of the worker without response is restarted, default 600 for the large files.
+- HIVE_PRELOAD: 'True' to load the application before fork, default 'False'.
+
+The scheduler jobs and the startup tasks run on the leader worker only, see src/utils/leader.py.
+"""
+import multiprocessing
+import os
+
+# the application loaded by the master (preload) starts the threads after fork, see src/utils/prefork.py.
+os.environ['HIVE_PREFORK_MASTER_PID'] = str(os.getpid())
+# the startup tasks run once for all workers.
+os.environ.setdefault('HIVE_BOOT_ID', os.urandom(16).hex())
+
+bind = os.environ.get('HIVE_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('HIVE_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('HIVE_THREADS', 8))
+worker_class = 'gthread'
+timeout = int(os.environ.get('HIVE_TIMEOUT', 600))
+preload_app = os.environ.get('HIVE_PRELOAD', 'False') == 'True'
+accesslog = '-'
+
+
+def post_fork(server, worker):
+    """ Reset the MongoDB connections, the HTTP sessions and the threads created before fork. """
+    from src.utils.prefork import prefork
+    prefork.after_fork()
+
+
+def worker_exit(server, worker):
+    """ Another worker can be the leader immediately. """
+    from src.utils.leader import leader
+    leader.stop()
@@ -1,8 +1,10 @@
 import logging
 
-from . import view, view_db, view_file, view_scripting, view_payment, interceptor, scheduler, view_internal, \
-    view_backup, view_pubsub
+from . import view, view_db, view_file, view_scripting, view_payment, interceptor, scheduler
+from hive.settings import hive_setting
 from hive.util.constants import HIVE_MODE_TEST
+from src.utils.leader import leader
+from src.utils.prefork import prefork
 
 logging.getLogger().level = logging.INFO
 
@@ -17,14 +19,20 @@ def init_app(app, mode):
     view_scripting.init_app(app)
     view_payment.init_app(app)  # including vault create/remove
 
-    # @deprecated unused modules, but keep here
-    view_internal.init_app(app, mode)
-    view_backup.init_app(app, mode)
-    view_pubsub.init_app(app, mode)
+    # @deprecated unused modules, but keep here. They are imported only if enabled to make the start faster.
+    if hive_setting.V1_BACKUP_ENABLED:
+        from . import view_internal, view_backup
+        view_internal.init_app(app, mode)
+        view_backup.init_app(app, mode)
+    if hive_setting.V1_PUBSUB_ENABLED:
+        from . import view_pubsub
+        view_pubsub.init_app(app, mode)
 
     if mode == HIVE_MODE_TEST:
         scheduler.scheduler_init(app, paused=True)
     else:
-        scheduler.scheduler_init(app, paused=False)
+        # the jobs run on the leader process only.
+        prefork.start_in_worker(lambda: scheduler.scheduler_init(app, paused=not leader.is_leader))
+        leader.add_listener(on_elected=scheduler.scheduler_resume, on_lost=scheduler.scheduler_pause)
 
     logging.getLogger('v1_init').info('leave init_app')
@@ -2,7 +2,6 @@ import _thread
 import json
 import logging
 import pathlib
-import pickle
 import shutil
 import subprocess
 import re
@@ -22,17 +21,19 @@ from hive.util.constants import APP_ID, VAULT_ACCESS_R, HIVE_MODE_TEST, HIVE_MOD
     INTER_BACKUP_SERVICE_URL, INTER_BACKUP_FILE_LIST_URL, INTER_BACKUP_FILE_URL, CHUNK_SIZE, \
     INTER_BACKUP_PATCH_HASH_URL, INTER_BACKUP_PATCH_DELTA_URL, INTER_BACKUP_GENE_DELTA_URL
 from hive.util.did_file_info import filter_path_root, get_vault_path
+from hive.util.file_transfer import FileTransfer
 from hive.util.did_info import get_all_did_info_by_did
 from hive.util.did_mongo_db_resource import export_mongo_db, import_mongo_db, delete_mongo_db_export
 from hive.util.error_code import BAD_REQUEST, UNAUTHORIZED, INSUFFICIENT_STORAGE, SUCCESS, NOT_FOUND, CHECKSUM_FAILED, \
-    SERVER_SAVE_FILE_ERROR, SERVER_PATCH_FILE_ERROR, INTERNAL_SERVER_ERROR, SERVER_OPEN_FILE_ERROR
+    SERVER_PATCH_FILE_ERROR, INTERNAL_SERVER_ERROR, SERVER_OPEN_FILE_ERROR
 from hive.util.payment.vault_backup_service_manage import get_vault_backup_service, copy_local_backup_to_vault
 from hive.util.payment.vault_service_manage import get_vault_service, get_vault_used_storage, \
     freeze_vault, unfreeze_vault, delete_user_vault_data
-from hive.util.pyrsync import rsyncdelta, gene_blockchecksums, patchstream
+from hive.util.pyrsync import gene_delta, gene_blockchecksums, patchstream, decode_delta
 from hive.util.vault_backup_info import *
 from hive.util.rclone_tool import RcloneTool
 from hive.util.server_response import ServerResponse
+from src.utils.io_tuning import IOTuning
 from hive.main.interceptor import post_json_param_pre_proc, did_post_json_param_pre_proc
 from hive.settings import hive_setting
 
@@ -352,7 +353,11 @@ class HiveBackup:
             if file_name in saved_file_dict:
                 save_checksum = saved_file_dict[file_name]
                 if save_checksum != file_checksum:
-                    file_patch_list.append([file_full_name, file_name])
+                    # the small file is put directly, which is cheaper than patching.
+                    if HiveBackup.get_file_size(file_full_name) < hive_setting.BACKUP_PATCH_MIN_SIZE:
+                        file_put_list.append([file_full_name, file_name])
+                    else:
+                        file_patch_list.append([file_full_name, file_name])
                 del saved_file_dict[file_name]
             else:
                 file_put_list.append([file_full_name, file_name])
@@ -362,40 +367,43 @@ class HiveBackup:
 
         return file_put_list, file_patch_list, file_delete_list
 
+    @staticmethod
+    def get_file_size(file_name):
+        try:
+            return Path(file_name).stat().st_size
+        except OSError:
+            return 0
+
     @staticmethod
     def put_files(file_put_list, host, token):
-        if not file_put_list:
-            return
+        return FileTransfer(host, token).run("__put_files", file_put_list, HiveBackup.put_file,
+                                             get_size=lambda info: HiveBackup.get_file_size(info[0]))
 
-        for info in file_put_list:
-            src_file = info[0]
-            dst_file = info[1]
-            try:
-                with open(src_file, "br") as f:
-                    f.seek(0)
-                    url = host + INTER_BACKUP_FILE_URL + '?file=' + dst_file
-                    r = requests.put(url,
-                                     data=f,
-                                     headers={"Authorization": "token " + token})
-            except Exception as e:
-                logging.getLogger("HiveBackup").error(
-                    f"__put_files exception:{str(e)}, host:{host}")
-                continue
-            if r.status_code != SUCCESS:
-                logging.getLogger("HiveBackup").error(
-                    f"__put_files err code:{r.status_code}, host:{host}")
-                continue
+    @staticmethod
+    def put_file(transfer, info):
+        src_file = info[0]
+        dst_file = info[1]
+        try:
+            with open(src_file, "br") as f:
+                f.seek(0)
+                r = transfer.request('PUT', INTER_BACKUP_FILE_URL + '?file=' + dst_file, data=f)
+        except Exception as e:
+            logging.getLogger("HiveBackup").error(
+                f"__put_files exception:{str(e)}, host:{transfer.host}")
+            return False
+        if r.status_code != SUCCESS:
+            logging.getLogger("HiveBackup").error(
+                f"__put_files err code:{r.status_code}, host:{transfer.host}")
+            return False
+        return True
 
     @staticmethod
-    def get_unpatch_file_hash(file_name, host, token):
-        get_file_hash_url = host + INTER_BACKUP_PATCH_HASH_URL + "?file=" + file_name
+    def get_unpatch_file_hash(file_name, transfer):
         try:
-            r = requests.get(get_file_hash_url,
-                             headers={"Authorization": "token " + token},
-                             stream=True)
+            r = transfer.request('GET', INTER_BACKUP_PATCH_HASH_URL + "?file=" + file_name, stream=True)
         except Exception as e:
             logging.getLogger("HiveBackup").error(
-                f"get_unpatch_file_hash exception:{str(e)}, host:{host}")
+                f"get_unpatch_file_hash exception:{str(e)}, host:{transfer.host}")
             return None
         if r.status_code != SUCCESS:
             logging.getLogger("HiveBackup").error(
@@ -411,69 +419,53 @@ class HiveBackup:
         return hashes
 
     @staticmethod
-    def patch_remote_file(src_file_name, dst_file_name, host, token):
-        hashes = HiveBackup.get_unpatch_file_hash(dst_file_name, host, token)
+    def patch_remote_file(src_file_name, dst_file_name, transfer):
+        hashes = HiveBackup.get_unpatch_file_hash(dst_file_name, transfer)
+        if hashes is None:
+            return SERVER_PATCH_FILE_ERROR
         try:
-            with open(src_file_name, "rb") as f:
-                delta_list = rsyncdelta(f, hashes, blocksize=CHUNK_SIZE)
+            f = open(src_file_name, "rb")
         except Exception as e:
-            print(f"patch_remote_file get {src_file_name} delta exception:{str(e)}, host:{host}")
             logging.getLogger("HiveBackup").error(
-                f"patch_remote_file get {src_file_name} delta exception:{str(e)}, host:{host}")
+                f"patch_remote_file get {src_file_name} delta exception:{str(e)}, host:{transfer.host}")
             return SERVER_OPEN_FILE_ERROR
 
-        patch_delta_file = gene_temp_file_name()
-        try:
-            with open(patch_delta_file, "wb") as f:
-                pickle.dump(delta_list, f)
-        except Exception as e:
-            logging.getLogger("HiveBackup").error(
-                f"patch_remote_file dump {dst_file_name} delta exception:{str(e)}, host:{host}")
-            patch_delta_file.unlink()
-            return SERVER_SAVE_FILE_ERROR
-
-        post_delta_url = host + INTER_BACKUP_PATCH_DELTA_URL + "?file=" + dst_file_name
+        # the delta is generated while sending.
         try:
-            with open(patch_delta_file.as_posix(), 'rb') as f:
-                r = requests.post(post_delta_url,
-                                  data=f,
-                                  headers={"Authorization": "token " + token})
+            with f:
+                r = transfer.request('POST', INTER_BACKUP_PATCH_DELTA_URL + "?file=" + dst_file_name,
+                                     data=gene_delta(f, hashes, blocksize=CHUNK_SIZE))
         except Exception as e:
             logging.getLogger("HiveBackup").error(
-                f"patch_remote_file post {dst_file_name} exception:{str(e)}, host:{host}")
+                f"patch_remote_file post {dst_file_name} exception:{str(e)}, host:{transfer.host}")
             return SERVER_PATCH_FILE_ERROR
         if r.status_code != SUCCESS:
             return r.status_code
-        patch_delta_file.unlink()
         return SUCCESS
 
     @staticmethod
     def patch_save_files(file_patch_list, host, token):
-        if not file_patch_list:
-            return
-
-        for info in file_patch_list:
-            src_file = info[0]
-            dst_file = info[1]
-            HiveBackup.patch_remote_file(src_file, dst_file, host, token)
+        return FileTransfer(host, token).run("patch_save_files", file_patch_list,
+                                             lambda t, info: HiveBackup.patch_remote_file(info[0], info[1], t) == SUCCESS,
+                                             get_size=lambda info: HiveBackup.get_file_size(info[0]))
 
     @staticmethod
     def delete_files(file_delete_list, host, token):
-        if not file_delete_list:
-            return
+        return FileTransfer(host, token).run("__delete_files", file_delete_list, HiveBackup.delete_file)
 
-        for name in file_delete_list:
-            try:
-                r = requests.delete(host + INTER_BACKUP_FILE_URL + "?file=" + name,
-                                    headers={"Authorization": "token " + token})
-            except Exception as e:
-                logging.getLogger("HiveBackup").error(
-                    f"__delete_files exception:{str(e)}, host:{host}")
-                continue
-            if r.status_code != SUCCESS:
-                logging.getLogger("HiveBackup").error(
-                    f"__delete_files err code:{r.status_code}, host:{host}")
-                continue
+    @staticmethod
+    def delete_file(transfer, name):
+        try:
+            r = transfer.request('DELETE', INTER_BACKUP_FILE_URL + "?file=" + name)
+        except Exception as e:
+            logging.getLogger("HiveBackup").error(
+                f"__delete_files exception:{str(e)}, host:{transfer.host}")
+            return False
+        if r.status_code != SUCCESS:
+            logging.getLogger("HiveBackup").error(
+                f"__delete_files err code:{r.status_code}, host:{transfer.host}")
+            return False
+        return True
 
     @staticmethod
     def save_to_hive_node_start(vault_folder, did, host, backup_token):
@@ -527,7 +519,11 @@ class HiveBackup:
             if file_full_name in local_file_dict:
                 save_checksum = local_file_dict[file_full_name]
                 if save_checksum != file_checksum:
-                    file_patch_list.append([file_name, file_full_name])
+                    # the small file is got directly, which is cheaper than patching.
+                    if HiveBackup.get_file_size(file_full_name) < hive_setting.BACKUP_PATCH_MIN_SIZE:
+                        file_get_list.append([file_name, file_full_name])
+                    else:
+                        file_patch_list.append([file_name, file_full_name])
                 del local_file_dict[file_full_name]
             else:
                 file_get_list.append([file_name, file_full_name])
@@ -539,45 +535,46 @@ class HiveBackup:
 
     @staticmethod
     def get_files(file_get_list, host, token):
-        if not file_get_list:
-            return
+        # the size of the remote file is unknown, so all files are small.
+        return FileTransfer(host, token).run("__get_files", file_get_list, HiveBackup.get_file)
 
-        for info in file_get_list:
-            src_file = info[0]
-            dst_file = Path(info[1])
-            dst_file.resolve()
-            temp_file = gene_temp_file_name()
-
-            if not dst_file.parent.exists():
-                if not create_full_path_dir(dst_file.parent):
-                    logging.getLogger("HiveBackup").error(
-                        f"__get_files error mkdir :{dst_file.parent.as_posix()}, host:{host}")
-                    continue
-            try:
-                r = requests.get(host + INTER_BACKUP_FILE_URL + "?file=" + src_file,
-                                 stream=True,
-                                 headers={"Authorization": "token " + token})
-                with open(temp_file, 'bw') as f:
-                    f.seek(0)
-                    for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
-                        if chunk:
-                            f.write(chunk)
-            except Exception as e:
+    @staticmethod
+    def get_file(transfer, info):
+        src_file = info[0]
+        dst_file = Path(info[1])
+        dst_file.resolve()
+        temp_file = gene_temp_file_name()
+
+        if not dst_file.parent.exists():
+            if not create_full_path_dir(dst_file.parent):
                 logging.getLogger("HiveBackup").error(
-                    f"__get_files exception:{str(e)}, host:{host}")
-                temp_file.unlink()
-                continue
-            if r.status_code != SUCCESS:
-                logging.getLogger("HiveBackup").error(f"__get_files err code:{r.status_code}, host:{host}")
+                    f"__get_files error mkdir :{dst_file.parent.as_posix()}, host:{transfer.host}")
+                return False
+        try:
+            r = transfer.request('GET', INTER_BACKUP_FILE_URL + "?file=" + src_file, stream=True)
+            with IOTuning.open_for_write(temp_file) as f:
+                f.seek(0)
+                for chunk in r.iter_content(chunk_size=IOTuning.get_size(IOTuning.RECEIVE)):
+                    if chunk:
+                        f.write(chunk)
+        except Exception as e:
+            logging.getLogger("HiveBackup").error(
+                f"__get_files exception:{str(e)}, host:{transfer.host}")
+            if temp_file.exists():
                 temp_file.unlink()
-                continue
+            return False
+        if r.status_code != SUCCESS:
+            logging.getLogger("HiveBackup").error(f"__get_files err code:{r.status_code}, host:{transfer.host}")
+            temp_file.unlink()
+            return False
 
-            if dst_file.exists():
-                dst_file.unlink()
-            shutil.move(temp_file.as_posix(), dst_file.as_posix())
+        if dst_file.exists():
+            dst_file.unlink()
+        shutil.move(temp_file.as_posix(), dst_file.as_posix())
+        return True
 
     @staticmethod
-    def patch_local_file(src_file_name, dst_file_name, host, token):
+    def patch_local_file(src_file_name, dst_file_name, transfer):
         full_dst_file_name = Path(dst_file_name).resolve()
         try:
             with open(full_dst_file_name, 'rb') as open_file:
@@ -585,53 +582,44 @@ class HiveBackup:
                 hashes = ""
                 for h in gene:
                     hashes += h
-                r = requests.post(host + INTER_BACKUP_GENE_DELTA_URL + "?file=" + src_file_name,
-                                  data=hashes,
-                                  stream=True,
-                                  headers={"content-type": "application/json",
-                                           "Authorization": "token " + token})
+                r = transfer.request('POST', INTER_BACKUP_GENE_DELTA_URL + "?file=" + src_file_name,
+                                     data=hashes,
+                                     stream=True,
+                                     headers={"content-type": "application/json"})
         except Exception as e:
             logging.getLogger("HiveBackup").error(
-                f"__delete_files exception:{str(e)}, host:{host}")
+                f"__delete_files exception:{str(e)}, host:{transfer.host}")
             return INTERNAL_SERVER_ERROR
         if r.status_code != SUCCESS:
             logging.getLogger("HiveBackup").error(
-                f"__delete_files err code:{r.status_code}, host:{host}")
+                f"__delete_files err code:{r.status_code}, host:{transfer.host}")
             return r.status_code
 
-        patch_delta_file = gene_temp_file_name()
-        with open(patch_delta_file, 'wb') as f:
-            f.seek(0)
-            for chunk in r.iter_content(CHUNK_SIZE):
-                f.write(chunk)
-
-        with open(patch_delta_file, 'rb') as f:
-            delta_list = pickle.load(f)
+        # the delta is decoded and patched while receiving.
+        new_file = gene_temp_file_name()
         try:
-            new_file = gene_temp_file_name()
             with open(full_dst_file_name, "br") as unpatched:
                 with open(new_file, "bw") as save_to:
                     unpatched.seek(0)
-                    patchstream(unpatched, save_to, delta_list)
-            patch_delta_file.unlink()
+                    patchstream(unpatched, save_to, decode_delta(r.raw))
             if full_dst_file_name.exists():
                 full_dst_file_name.unlink()
             shutil.move(new_file.as_posix(), full_dst_file_name.as_posix())
         except Exception as e:
             logging.getLogger("HiveBackup").error(f"exception of post_file_patch_delta patch error is {str(e)}")
+            if new_file.exists():
+                new_file.unlink()
             return SERVER_PATCH_FILE_ERROR
+        finally:
+            r.close()
 
         return SUCCESS
 
     @staticmethod
     def patch_restore_files(file_patch_list, host, token):
-        if not file_patch_list:
-            return
-
-        for info in file_patch_list:
-            src_file = info[0]
-            dst_file = info[1]
-            HiveBackup.patch_local_file(src_file, dst_file, host, token)
+        return FileTransfer(host, token).run("patch_restore_files", file_patch_list,
+                                             lambda t, info: HiveBackup.patch_local_file(info[0], info[1], t) == SUCCESS,
+                                             get_size=lambda info: HiveBackup.get_file_size(info[1]))
 
     @staticmethod
     def restore_from_hive_node_start(vault_folder, did, host, backup_token):
@@ -1,4 +1,3 @@
-import pickle
 import shutil
 from pathlib import Path
 from flask import request, Response
@@ -15,9 +14,10 @@ from hive.util.flask_rangerequest import RangeRequest
 from hive.util.payment.vault_backup_service_manage import get_vault_backup_service, get_vault_backup_path, \
     update_vault_backup_service_item
 from hive.util.payment.vault_service_manage import can_access_backup
-from hive.util.pyrsync import patchstream, gene_blockchecksums, rsyncdelta
+from hive.util.pyrsync import patchstream, gene_blockchecksums, gene_delta, decode_delta
 from hive.util.vault_backup_info import *
 from hive.util.server_response import ServerResponse
+from src.utils.io_tuning import IOTuning
 from hive.main.interceptor import post_json_param_pre_proc, did_post_json_param_pre_proc, pre_proc, \
     did_get_param_pre_proc
 
@@ -126,15 +126,12 @@ class HiveInternal:
 
         temp_file = gene_temp_file_name()
         try:
-            with open(temp_file, "bw") as f:
-                chunk_size = CHUNK_SIZE
-                while True:
-                    chunk = request.stream.read(chunk_size)
-                    if len(chunk) == 0:
-                        break
-                    f.write(chunk)
+            with IOTuning.open_for_write(temp_file) as f:
+                IOTuning.copy_stream(request.stream, f)
         except Exception as e:
             logger.error(f"exception of put_file error is {str(e)}")
+            if temp_file.exists():
+                temp_file.unlink()
             return self.response.response_err(SERVER_SAVE_FILE_ERROR, f"Exception: {str(e)}")
 
         if full_path_name.exists():
@@ -255,35 +252,20 @@ class HiveInternal:
         if not file_full_name:
             return resp
 
-        patch_delta_file = gene_temp_file_name()
+        # the delta is decoded and patched while receiving.
+        new_file = gene_temp_file_name()
         try:
-            with open(patch_delta_file, "bw") as f:
-                chunk_size = CHUNK_SIZE
-                while True:
-                    chunk = request.stream.read(chunk_size)
-                    if len(chunk) == 0:
-                        break
-                    f.write(chunk)
-        except Exception as e:
-            logger.error(f"exception of post_file_patch_delta read error is {str(e)}")
-            resp.status_code = SERVER_SAVE_FILE_ERROR
-            return resp
-
-        with open(patch_delta_file, "rb") as f:
-            delta_list = pickle.load(f)
-
-        try:
-            new_file = gene_temp_file_name()
             with open(file_full_name, "br") as unpatched:
                 with open(new_file, "bw") as save_to:
                     unpatched.seek(0)
-                    patchstream(unpatched, save_to, delta_list)
-            patch_delta_file.unlink()
+                    patchstream(unpatched, save_to, decode_delta(request.stream))
             if file_full_name.exists():
                 file_full_name.unlink()
             shutil.move(new_file.as_posix(), file_full_name.as_posix())
         except Exception as e:
             logger.error(f"exception of post_file_patch_delta patch error is {str(e)}")
+            if new_file.exists():
+                new_file.unlink()
             resp.status_code = SERVER_PATCH_FILE_ERROR
             return resp
 
@@ -306,30 +288,11 @@ class HiveInternal:
             h = (int(data[0]), data[1].decode("utf-8"))
             hashes.append(h)
 
-        with open(file_full_name, "rb") as f:
-            delta_list = rsyncdelta(f, hashes, blocksize=CHUNK_SIZE)
+        def gene():
+            # the delta is generated while sending.
+            with open(file_full_name, "rb") as f:
+                yield from gene_delta(f, hashes, blocksize=CHUNK_SIZE)
 
-        patch_delta_file = gene_temp_file_name()
-        try:
-            with open(patch_delta_file, "wb") as f:
-                pickle.dump(delta_list, f)
-        except Exception as e:
-            logging.getLogger("HiveBackup").error(
-                f"get_file_delta dump {file_full_name} delta exception:{str(e)}")
-            patch_delta_file.unlink()
-            resp.status_code = SERVER_SAVE_FILE_ERROR
-            return resp
-
-        size = patch_delta_file.stat().st_size
-        with open(patch_delta_file, 'rb') as f:
-            etag = RangeRequest.make_etag(f)
-        last_modified = datetime.utcnow()
-
-        data = RangeRequest(open(patch_delta_file, 'rb'),
-                            etag=etag,
-                            last_modified=last_modified,
-                            size=size).make_response()
-
-        patch_delta_file.unlink()
-        print("patch file name:" + patch_delta_file.as_posix())
-        return data
+        resp = Response(gene(), mimetype='application/octet-stream')
+        resp.status_code = SUCCESS
+        return resp
@@ -1,3 +1,4 @@
+import logging
 from datetime import datetime
 
 from hive.main.interceptor import post_json_param_pre_proc, pre_proc
@@ -6,7 +7,8 @@ from hive.util.error_code import ALREADY_EXIST, NOT_FOUND
 from hive.util.pubsub.pb_exchanger import pubsub_push_message
 from hive.util.pubsub.publisher import pub_setup_channel, pub_add_subscriber, pub_remove_channel, \
     pub_remove_subscribe, pub_get_pub_channels, pub_get_sub_channels, pub_get_channel
-from hive.util.pubsub.subscriber import sub_setup_message_subscriber, sub_pop_messages, sub_get_message_subscriber
+from hive.util.pubsub.subscriber import sub_setup_message_subscriber, sub_pop_messages, sub_get_message_subscriber, \
+    sub_migrate_messages
 from hive.util.server_response import ServerResponse
 
 
@@ -17,6 +19,10 @@ class HivePubSub:
 
     def init_app(self, app):
         self.app = app
+        try:
+            sub_migrate_messages()
+        except Exception as e:
+            logging.getLogger("HivePubSub").error(f"Failed to migrate the messages: {str(e)}")
 
     def publish_channel(self):
         did, app_id, content, err = post_json_param_pre_proc(self.response, "channel_name")
@@ -128,6 +134,7 @@ class HivePubSub:
         pub_appid = content["pub_app_id"]
         channel_name = content["channel_name"]
         limit = int(content["message_limit"])
-        message_list = sub_pop_messages(pub_did, pub_appid, channel_name, did, app_id, limit)
+        wait_ms = int(content.get("wait_ms", 0))
+        message_list = sub_pop_messages(pub_did, pub_appid, channel_name, did, app_id, limit, wait_ms)
         data = {"messages": message_list}
         return self.response.response_ok(data)
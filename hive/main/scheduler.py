@@ -5,6 +5,7 @@ from flask_apscheduler import APScheduler
 
 from hive.util.payment.vault_order import check_pay_order_timeout_job, check_wait_order_tx_job
 from hive.util.payment.vault_service_manage import proc_expire_vault_job
+from src.utils.job_lease import leased_job
 
 scheduler = APScheduler()
 
@@ -28,22 +29,27 @@ def scheduler_pause():
     scheduler.pause()
 
 
+# the jobs run on one process of the nodes sharing the same MongoDB, see src/utils/job_lease.py
 @scheduler.task(trigger='interval', id='expire_vault_job', days=1)
+@leased_job('expire_vault_job')
 def expire_vault_job():
     logging.getLogger("Hive scheduler").debug(f"expire_vault_job start: {str(datetime.utcnow())}")
-    proc_expire_vault_job()
+    count = proc_expire_vault_job()
     logging.getLogger("Hive scheduler").debug(f"expire_vault_job end: {str(datetime.utcnow())}")
+    return count
 
 
 @scheduler.task(trigger='interval', id='check_order_timeout_job', minutes=1)
+@leased_job('check_order_timeout_job')
 def check_order_timeout_job():
     # logging.getLogger("Hive scheduler").debug(f"check_order_timeout_job start: {str(datetime.utcnow())}")
-    check_pay_order_timeout_job()
+    return check_pay_order_timeout_job()
     # logging.getLogger("Hive scheduler").debug(f"check_order_timeout_job end: {str(datetime.utcnow())}")
 
 
 @scheduler.task(trigger='interval', id='wait_orders_tx_job', minutes=1)
+@leased_job('wait_orders_tx_job')
 def wait_orders_tx_job():
     # logging.getLogger("Hive scheduler").debug(f"wait_orders_tx_job start: {str(datetime.utcnow())}")
-    check_wait_order_tx_job()
+    return check_wait_order_tx_job()
     # logging.getLogger("Hive scheduler").debug(f"wait_orders_tx_job end: {str(datetime.utcnow())}")
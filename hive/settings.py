@@ -114,6 +114,46 @@ class HiveSetting:
         """ INFO: Just keep this item in this file, not required in .env. """
         return self.env_config('BACKUP_FTP_PASSIVE_PORTS_END', default=8400, cast=int)
 
+    @property
+    def BACKUP_TRANSFER_WORKERS(self):
+        """ INFO: Just keep this item in this file, not required in .env. """
+        return self.env_config('BACKUP_TRANSFER_WORKERS', default=4, cast=int)
+
+    @property
+    def BACKUP_TRANSFER_RETRIES(self):
+        """ INFO: Just keep this item in this file, not required in .env. """
+        return self.env_config('BACKUP_TRANSFER_RETRIES', default=2, cast=int)
+
+    @property
+    def BACKUP_PATCH_MIN_SIZE(self):
+        """ INFO: Just keep this item in this file, not required in .env.
+        The changed files smaller than this are transferred whole instead of patched. """
+        return self.env_config('BACKUP_PATCH_MIN_SIZE', default=1024 * 1024, cast=int)
+
+    @property
+    def PUBSUB_POP_MAX_WAIT(self):
+        """ INFO: Just keep this item in this file, not required in .env.
+        The max milliseconds of waiting for the new messages when popping. """
+        return self.env_config('PUBSUB_POP_MAX_WAIT', default=30000, cast=int)
+
+    @property
+    def PUBSUB_CHANNEL_LOG_SIZE(self):
+        """ INFO: Just keep this item in this file, not required in .env.
+        The count of the latest messages kept for every channel. """
+        return self.env_config('PUBSUB_CHANNEL_LOG_SIZE', default=10000, cast=int)
+
+    @property
+    def V1_BACKUP_ENABLED(self):
+        """ INFO: Just keep this item in this file, not required in .env.
+        The deprecated v1 backup (Google Drive, the backup node) and its internal APIs are loaded if enabled. """
+        return self.env_config('V1_BACKUP_ENABLED', default='True', cast=bool)
+
+    @property
+    def V1_PUBSUB_ENABLED(self):
+        """ INFO: Just keep this item in this file, not required in .env.
+        The deprecated v1 pubsub APIs are loaded if enabled. """
+        return self.env_config('V1_PUBSUB_ENABLED', default='True', cast=bool)
+
     @property
     def MONGO_URI(self):
         """ INFO: Just keep this item in this file, not required in .env. """
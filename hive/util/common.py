@@ -6,7 +6,8 @@ from urllib.parse import urlparse
 import hashlib
 
 from hive.util.constants import CHUNK_SIZE
-from hive.settings import hive_setting
+from src.utils.io_tuning import IOTuning
+from src.utils.temp_files import temp_files
 
 
 def did_tail_part(did):
@@ -31,29 +32,13 @@ def get_host(url):
     return data.hostname
 
 
-def get_temp_path():
-    path = Path(hive_setting.DATA_STORE_PATH).resolve() / ".temp/"
-    if not path.exists():
-        create_full_path_dir(path)
-    return path
-
-
 def gene_temp_file_name():
-    temp_path = get_temp_path()
-    while True:
-        patch_delta_file = temp_path / random_string(10)
-        if not patch_delta_file.exists():
-            return patch_delta_file
+    """ The new empty temporary file, it is safe for the concurrent requests, see temp_files.allocate(). """
+    return temp_files.allocate()
 
 
 def get_file_md5_info(file_name):
-    m = hashlib.md5()
-    with open(file_name, 'rb') as f:
-        while True:
-            chunk = f.read(4)
-            if not chunk:
-                break
-            m.update(chunk)
+    m = IOTuning.update_hash(hashlib.md5(), file_name)
     return [m.hexdigest(), file_name]
 
 
@@ -94,6 +94,14 @@ PUB_CHANNEL_NAME = "channel_name"
 PUB_CHANNEL_SUB_DID = "sub_did"
 PUB_CHANNEL_SUB_APPID = "sub_appid"
 PUB_CHANNEL_MODIFY_TIME = "modify_time"
+PUB_CHANNEL_LAST_SEQ = "last_seq"
+PUB_CHANNEL_LEGACY_MESSAGES = "legacy_messages"
+
+PUB_MESSAGE_COLLECTION = "pub_message_col"
+PUB_MESSAGE_CHANNEL_ID = "channel_id"
+PUB_MESSAGE_SEQ = "seq"
+PUB_MESSAGE_DATA = "message_data"
+PUB_MESSAGE_TIME = "message_time"
 
 SUB_MESSAGE_COLLECTION = "sub_message_col"
 SUB_MESSAGE_SUBSCRIBE_ID = "subscribe_id"
@@ -105,6 +113,7 @@ SUB_MESSAGE_SUB_APPID = "sub_appid"
 SUB_MESSAGE_DATA = "message_data"
 SUB_MESSAGE_TIME = "message_time"
 SUB_MESSAGE_MODIFY_TIME = "modify_time"
+SUB_MESSAGE_CLAIM = "claim"
 # pubsub end
 
 # other
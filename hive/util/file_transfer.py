@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from hive.settings import hive_setting
+from src.utils.prefork import prefork
+
+
+class FileTransfer:
+    """ Transfer the files of the backup to or from the host concurrently.
+
+    The connections to the same host are kept alive and shared. The small files are handled in batches
+    by one task, and the failed files are retried without restarting the others.
+    """
+
+    SMALL_FILE_SIZE = 256 * 1024
+    BATCH_FILES = 32
+
+    __sessions = dict()
+    __lock = threading.Lock()
+
+    def __init__(self, host, token, workers=None, retries=None):
+        self.host = host
+        self.token = token
+        self.workers = workers if workers else hive_setting.BACKUP_TRANSFER_WORKERS
+        self.retries = retries if retries is not None else hive_setting.BACKUP_TRANSFER_RETRIES
+        self.session = FileTransfer.get_session(host, self.workers)
+
+    @staticmethod
+    def get_session(host, pool_size):
+        with FileTransfer.__lock:
+            session = FileTransfer.__sessions.get(host)
+            if not session:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                FileTransfer.__sessions[host] = session
+            return session
+
+    @staticmethod
+    def reset_sessions():
+        """ The connections created before fork can not be used by the worker process. """
+        FileTransfer.__lock = threading.Lock()
+        FileTransfer.__sessions = dict()
+
+    def request(self, method, path, **kwargs):
+        headers = dict(kwargs.pop('headers', dict()))
+        headers["Authorization"] = "token " + self.token
+        return self.session.request(method, self.host + path, headers=headers, **kwargs)
+
+    def run(self, name, items, handle, get_size=None):
+        """ Handle the items by the pool and return the failed ones.
+
+        :param name: For the logs.
+        :param items: The file items.
+        :param handle: handle(transfer, item) returns True if success.
+        :param get_size: get_size(item) returns the size of the file, all files are small if not specified.
+        """
+        if not items:
+            return list()
+
+        start, pending = time.time(), list(items)
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                logging.getLogger("HiveBackup").info(f"{name} retry {len(pending)} failed files, attempt {attempt}")
+                time.sleep(min(2 ** attempt, 30))
+            pending = self.__run_once(pending, handle, get_size)
+            if not pending:
+                break
+
+        elapsed = max(time.time() - start, 0.001)
+        done = len(items) - len(pending)
+        logging.getLogger("HiveBackup").info(f"{name} finished {done} files in {elapsed:.2f} seconds, "
+                                             f"{done / elapsed:.1f} files/s, failed {len(pending)} files, host:{self.host}")
+        return pending
+
+    def __run_once(self, items, handle, get_size):
+        def handle_batch(batch):
+            failed = list()
+            for item in batch:
+                try:
+                    if not handle(self, item):
+                        failed.append(item)
+                except Exception as e:
+                    logging.getLogger("HiveBackup").error(f"transfer file {item} exception:{str(e)}, host:{self.host}")
+                    failed.append(item)
+            return failed
+
+        with ThreadPoolExecutor(self.workers) as pool:
+            futures = [pool.submit(handle_batch, batch) for batch in self.__get_batches(items, get_size)]
+            return [item for future in as_completed(futures) for item in future.result()]
+
+    def __get_batches(self, items, get_size):
+        """ One large file or some small files a batch. """
+        batches, small = list(), list()
+        for item in items:
+            try:
+                size = get_size(item) if get_size else 0
+            except OSError:
+                size = 0
+            if size >= FileTransfer.SMALL_FILE_SIZE:
+                batches.append([item])
+            else:
+                small.append(item)
+
+        # some batches for every worker to balance the load.
+        batch_files = min(FileTransfer.BATCH_FILES, max(len(small) // (self.workers * 4), 1))
+        batches.extend([small[i:i + batch_files] for i in range(0, len(small), batch_files)])
+        return batches
+
+
+prefork.register_after_fork(FileTransfer.reset_sessions)
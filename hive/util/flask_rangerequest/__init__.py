@@ -1,4 +1,4 @@
-from ._request import RangeRequest
+from src.utils.range_request import RangeRequest
 
 __version__ = '0.0.0'
 
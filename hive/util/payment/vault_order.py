@@ -205,11 +205,14 @@ def check_pay_order_timeout_job():
     query = {VAULT_ORDER_STATE: VAULT_ORDER_STATE_WAIT_PAY}
     info_list = col.find(query)
     now = datetime.utcnow().timestamp()
+    count = 0
     for info in info_list:
         create_time = info[VAULT_ORDER_CREATE_TIME]
         if (now - create_time) > (PaymentConfig.get_payment_timeout() * 60):
             info[VAULT_ORDER_STATE] = VAULT_ORDER_STATE_WAIT_PAY_TIMEOUT
             update_order_info(info["_id"], info)
+            count += 1
+    return count
 
 
 def check_wait_order_tx_job():
@@ -223,7 +226,9 @@ def check_wait_order_tx_job():
     col = db[VAULT_ORDER_COL]
     query = {VAULT_ORDER_STATE: VAULT_ORDER_STATE_WAIT_TX}
     info_list = col.find(query)
+    count = 0
     for info in info_list:
+        count += 1
         state = deal_order_tx(info)
         if state == VAULT_ORDER_STATE_SUCCESS:
             # Be compatible
@@ -236,6 +241,7 @@ def check_wait_order_tx_job():
                     vault_backup_order_success(info)
                 else:
                     logger.error("check_wait_order_tx_job not support type:" + info[VAULT_ORDER_TYPE])
+    return count
 
 
 def vault_order_success(info):
@@ -194,19 +194,22 @@ def proc_expire_vault_job():
     query = {VAULT_SERVICE_PRICING_USING: {"$ne": VAULT_SERVICE_FREE}}
     info_list = col.find(query)
     now = datetime.utcnow().timestamp()
+    count = 0
     for service in info_list:
         if service[VAULT_SERVICE_END_TIME] == -1:
             continue
         elif now > service[VAULT_SERVICE_END_TIME]:
             free_info = PaymentConfig.get_free_vault_info()
-            query_id = {"_id": service["_id"]}
+            # not expire the vault which is renewed after the query.
+            query_id = {"_id": service["_id"], VAULT_SERVICE_END_TIME: service[VAULT_SERVICE_END_TIME]}
             value = {"$set": {VAULT_SERVICE_PRICING_USING: VAULT_SERVICE_FREE,
                               VAULT_SERVICE_MAX_STORAGE: free_info["maxStorage"],
                               VAULT_SERVICE_START_TIME: now,
                               VAULT_SERVICE_END_TIME: -1,
                               VAULT_SERVICE_MODIFY_TIME: now
                               }}
-            col.update_one(query_id, value)
+            count += col.update_one(query_id, value).modified_count
+    return count
 
 
 def count_file_system_storage_size(did):
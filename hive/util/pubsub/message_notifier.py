@@ -0,0 +1,87 @@
+# notifier: wake up the waiting pops when the messages are added to the subscriptions.
+import logging
+import threading
+import time
+
+from pymongo.errors import PyMongoError
+
+from hive.util.constants import PUB_MESSAGE_CHANNEL_ID
+from src.utils.prefork import prefork
+
+
+class MessageNotifier:
+    """ The messages pushed by this process notify the waiters of the channel directly, the ones pushed by
+    the other processes are watched by the change stream of the message log if MongoDB supports it (replica set).
+    Without the change stream, the waiters check the log every CHECK_INTERVAL seconds.
+
+    The subscription which is found empty is remembered until the next message of the channel, then the empty
+    pops needn't query the database. This is only trusted while the change stream is watching.
+    """
+
+    CHECK_INTERVAL = 5
+    WATCH_RETRY_INTERVAL = 60
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """ Also called after fork, the watcher thread does not exist in the forked process. """
+        self.cond = threading.Condition()
+        self.versions = dict()  # channel_id -> the count of the pushed messages
+        self.empty = dict()  # subscribe_id -> the version of the channel when the subscription is found empty
+        self.watching = False
+        self.watcher = None
+        self.watch_failed_time = 0
+
+    def notify(self, channel_id):
+        with self.cond:
+            self.versions[channel_id] = self.versions.get(channel_id, 0) + 1
+            self.cond.notify_all()
+
+    def get_version(self, channel_id):
+        with self.cond:
+            return self.versions.get(channel_id, 0)
+
+    def set_empty(self, subscribe_id, version):
+        """ The subscription is empty when the version of the channel is got before querying. """
+        with self.cond:
+            self.empty[subscribe_id] = version
+
+    def is_empty(self, subscribe_id, channel_id):
+        with self.cond:
+            return self.watching and self.empty.get(subscribe_id) == self.versions.get(channel_id, 0)
+
+    def wait(self, channel_id, version, timeout):
+        """ Wait until a message is pushed to the channel after the version, return False if timeout. """
+        with self.cond:
+            if not self.watching:
+                timeout = min(timeout, MessageNotifier.CHECK_INTERVAL)
+            return self.cond.wait_for(lambda: self.versions.get(channel_id, 0) != version, timeout)
+
+    def start_watching(self, col):
+        with self.cond:
+            if self.watcher or time.time() - self.watch_failed_time < MessageNotifier.WATCH_RETRY_INTERVAL:
+                return
+            self.watcher = threading.Thread(target=self.__watch, args=(col,), daemon=True)
+            self.watcher.start()
+
+    def __watch(self, col):
+        try:
+            with col.watch([{"$match": {"operationType": "insert"}}]) as stream:
+                with self.cond:
+                    self.watching = True
+                for change in stream:
+                    self.notify(change["fullDocument"][PUB_MESSAGE_CHANNEL_ID])
+        except PyMongoError as e:
+            logging.getLogger("MessageNotifier").info(f"The change stream of the messages is not available: {str(e)}")
+        finally:
+            with self.cond:
+                self.watching = False
+                self.watcher = None
+                self.watch_failed_time = time.time()
+                self.empty.clear()
+                self.cond.notify_all()
+
+
+message_notifier = MessageNotifier()
+prefork.register_after_fork(message_notifier.reset)
@@ -1,13 +1,41 @@
 import hashlib
 from datetime import datetime
 
+import pymongo
 from pymongo import MongoClient
 from pymongo.errors import DuplicateKeyError
 
 from hive.settings import hive_setting
+from src.utils.prefork import prefork
 from hive.util.constants import DID_INFO_DB_NAME, PUB_CHANNEL_COLLECTION, PUB_CHANNEL_PUB_DID, \
     PUB_CHANNEL_PUB_APPID, PUB_CHANNEL_NAME, PUB_CHANNEL_MODIFY_TIME, PUB_CHANNEL_ID, \
-    PUB_CHANNEL_SUB_DID, PUB_CHANNEL_SUB_APPID
+    PUB_CHANNEL_SUB_DID, PUB_CHANNEL_SUB_APPID, PUB_CHANNEL_LAST_SEQ, PUB_MESSAGE_COLLECTION, \
+    PUB_MESSAGE_CHANNEL_ID, PUB_MESSAGE_SEQ, PUB_MESSAGE_DATA, PUB_MESSAGE_TIME
+
+# shared by the message operations which are called frequently.
+__connection = None
+
+# the old messages are removed every TRIM_INTERVAL messages of the channel.
+TRIM_INTERVAL = 100
+
+
+def pubsub_get_col(col_name):
+    global __connection
+    if not __connection:
+        if hive_setting.MONGO_URI:
+            __connection = MongoClient(hive_setting.MONGO_URI)
+        else:
+            __connection = MongoClient(hive_setting.MONGODB_URL)
+    return __connection[DID_INFO_DB_NAME][col_name]
+
+
+def pubsub_reset_connection():
+    """ The connection created before fork can not be used by the worker process. """
+    global __connection
+    __connection = None
+
+
+prefork.register_after_fork(pubsub_reset_connection)
 
 
 # publisher: create channel, list channels, subscribe, push messages
@@ -52,6 +80,8 @@ def pub_remove_channel(pub_did, pub_appid, channel_name):
         PUB_CHANNEL_NAME: channel_name,
     }
     col.delete_many(query)
+    pubsub_get_col(PUB_MESSAGE_COLLECTION).delete_many(
+        {PUB_MESSAGE_CHANNEL_ID: pubsub_get_channel_id(pub_did, pub_appid, channel_name)})
 
 
 def pubsub_get_channel_id(did, app_id, channel_name):
@@ -139,7 +169,9 @@ def pub_add_subscriber(pub_did, pub_appid, channel_name, sub_did, sub_appid):
         PUB_CHANNEL_NAME: channel_name,
         PUB_CHANNEL_SUB_DID: sub_did,
         PUB_CHANNEL_SUB_APPID: sub_appid,
-        PUB_CHANNEL_MODIFY_TIME: datetime.utcnow().timestamp()
+        PUB_CHANNEL_MODIFY_TIME: datetime.utcnow().timestamp(),
+        # the subscriber only gets the messages after subscribing.
+        PUB_CHANNEL_LAST_SEQ: pub_get_last_seq(pubsub_get_channel_id(pub_did, pub_appid, channel_name))
     }
     try:
         ret = col.insert_one(dic)
@@ -150,6 +182,43 @@ def pub_add_subscriber(pub_did, pub_appid, channel_name, sub_did, sub_appid):
     return subscribe_id
 
 
+def pub_init_message_log():
+    pubsub_get_col(PUB_MESSAGE_COLLECTION).create_index(
+        [(PUB_MESSAGE_CHANNEL_ID, pymongo.ASCENDING), (PUB_MESSAGE_SEQ, pymongo.ASCENDING)], unique=True)
+
+
+def pub_get_last_seq(channel_id):
+    message = pubsub_get_col(PUB_MESSAGE_COLLECTION).find_one({PUB_MESSAGE_CHANNEL_ID: channel_id},
+                                                              sort=[(PUB_MESSAGE_SEQ, pymongo.DESCENDING)])
+    return message[PUB_MESSAGE_SEQ] if message else 0
+
+
+def pub_append_message(channel_id, message, message_time):
+    """ Append the message to the log of the channel once, the subscribers read it by their own cursors.
+
+    The sequence is taken by the unique index, so the message with the larger sequence is always visible later.
+    """
+    col = pubsub_get_col(PUB_MESSAGE_COLLECTION)
+    while True:
+        seq = pub_get_last_seq(channel_id) + 1
+        try:
+            col.insert_one({
+                PUB_MESSAGE_CHANNEL_ID: channel_id,
+                PUB_MESSAGE_SEQ: seq,
+                PUB_MESSAGE_DATA: message,
+                PUB_MESSAGE_TIME: message_time
+            })
+            break
+        except DuplicateKeyError:
+            # another message takes the sequence at the same time.
+            continue
+
+    if seq % TRIM_INTERVAL == 0 and seq > hive_setting.PUBSUB_CHANNEL_LOG_SIZE:
+        col.delete_many({PUB_MESSAGE_CHANNEL_ID: channel_id,
+                         PUB_MESSAGE_SEQ: {"$lte": seq - hive_setting.PUBSUB_CHANNEL_LOG_SIZE}})
+    return seq
+
+
 def pub_remove_subscribe(pub_did, pub_appid, channel_name, sub_did, sub_appid):
     if hive_setting.MONGO_URI:
         uri = hive_setting.MONGO_URI
@@ -1,14 +1,28 @@
-from datetime import datetime
+import logging
+import time
+from datetime import datetime, timedelta
 
 import pymongo
+from bson import ObjectId
 from pymongo import MongoClient
 from pymongo.errors import DuplicateKeyError
 
 from hive.settings import hive_setting
 from hive.util.constants import DID_INFO_DB_NAME, SUB_MESSAGE_COLLECTION, SUB_MESSAGE_PUB_DID, \
     SUB_MESSAGE_PUB_APPID, SUB_MESSAGE_CHANNEL_NAME, SUB_MESSAGE_SUB_DID, SUB_MESSAGE_SUB_APPID, \
-    SUB_MESSAGE_MODIFY_TIME, SUB_MESSAGE_DATA, SUB_MESSAGE_TIME, SUB_MESSAGE_SUBSCRIBE_ID
-from hive.util.pubsub.publisher import pubsub_get_subscribe_id
+    SUB_MESSAGE_MODIFY_TIME, SUB_MESSAGE_DATA, SUB_MESSAGE_TIME, SUB_MESSAGE_SUBSCRIBE_ID, PUB_CHANNEL_COLLECTION, \
+    PUB_CHANNEL_PUB_DID, PUB_CHANNEL_PUB_APPID, PUB_CHANNEL_NAME, PUB_CHANNEL_SUB_DID, PUB_CHANNEL_LAST_SEQ, \
+    PUB_CHANNEL_LEGACY_MESSAGES, PUB_MESSAGE_COLLECTION, PUB_MESSAGE_CHANNEL_ID, PUB_MESSAGE_SEQ, PUB_MESSAGE_DATA, \
+    PUB_MESSAGE_TIME, SUB_MESSAGE_CLAIM
+from hive.util.pubsub.message_notifier import message_notifier
+from hive.util.pubsub.publisher import pubsub_get_subscribe_id, pubsub_get_channel_id, pubsub_get_col, \
+    pub_get_last_seq, pub_init_message_log
+
+# the seconds after which the claimed but not removed messages can be claimed again.
+CLAIM_TIMEOUT = 60
+
+# subscribe_id -> the cursor moved by the latest pop of this process.
+__cursors = dict()
 
 
 def sub_setup_message_subscriber(pub_did, pub_appid, channel_name, sub_did, sub_appid):
@@ -75,66 +89,140 @@ def sub_get_message_subscriber(pub_did, pub_appid, channel_name, sub_did, sub_ap
     return info
 
 
-def sub_add_message(pub_did, pub_appid, channel_name, sub_did, sub_appid, message, message_time):
-    if hive_setting.MONGO_URI:
-        uri = hive_setting.MONGO_URI
-        connection = MongoClient(uri)
-    else:
-        connection = MongoClient(hive_setting.MONGODB_URL)
-
-    db = connection[DID_INFO_DB_NAME]
-    col = db[SUB_MESSAGE_COLLECTION]
+def sub_pop_messages(pub_did, pub_appid, channel_name, sub_did, sub_appid, limit, wait_ms=0):
+    """ Pop the messages, wait at most wait_ms milliseconds for the new messages if there is none. """
+    message_notifier.start_watching(pubsub_get_col(PUB_MESSAGE_COLLECTION))
+    channel_id = pubsub_get_channel_id(pub_did, pub_appid, channel_name)
     _id = pubsub_get_subscribe_id(pub_did, pub_appid, channel_name, sub_did, sub_appid)
-    dic = {
-        SUB_MESSAGE_SUBSCRIBE_ID: _id,
-        SUB_MESSAGE_PUB_DID: pub_did,
-        SUB_MESSAGE_PUB_APPID: pub_appid,
-        SUB_MESSAGE_CHANNEL_NAME: channel_name,
-        SUB_MESSAGE_SUB_DID: sub_did,
-        SUB_MESSAGE_SUB_APPID: sub_appid,
-        SUB_MESSAGE_DATA: message,
-        SUB_MESSAGE_TIME: message_time
+    deadline = time.time() + min(max(wait_ms, 0), hive_setting.PUBSUB_POP_MAX_WAIT) / 1000
+
+    while True:
+        # the version before querying, the messages pushed during the querying will wake up the waiting.
+        version = message_notifier.get_version(channel_id)
+        if not message_notifier.is_empty(_id, channel_id):
+            message_list = __pop_messages(channel_id, _id, limit)
+            if len(message_list) < limit:
+                message_notifier.set_empty(_id, version)
+            if message_list:
+                return message_list
+
+        timeout = deadline - time.time()
+        if timeout <= 0:
+            return list()
+        message_notifier.wait(channel_id, version, timeout)
+
+
+def __pop_messages(channel_id, subscribe_id, limit):
+    """ Read the messages after the cursor of the subscription from the log of the channel and move the cursor.
+
+    Moving the cursor is the claim: it is compared and set, so the concurrent pops never get the same message.
+    """
+    col = pubsub_get_col(PUB_CHANNEL_COLLECTION)
+    # the cursor moved by the previous pop saves reading the subscription, it is checked by the moving.
+    last_seq = __cursors.get(subscribe_id)
+    while True:
+        message_list = list()
+        if last_seq is None:
+            subscription = col.find_one({"_id": subscribe_id})
+            if not subscription:
+                return list()
+            if PUB_CHANNEL_LAST_SEQ not in subscription:
+                sub_migrate_subscription(subscription)
+                continue
+
+            # the messages stored for every subscriber by the previous versions go first.
+            if subscription.get(PUB_CHANNEL_LEGACY_MESSAGES):
+                message_list, is_drained = __pop_legacy_messages(subscribe_id, limit)
+                if not is_drained:
+                    if message_list:
+                        return message_list
+                    continue
+                col.update_one({"_id": subscribe_id}, {"$unset": {PUB_CHANNEL_LEGACY_MESSAGES: ""}})
+            last_seq = subscription[PUB_CHANNEL_LAST_SEQ]
+
+        query = {
+            PUB_MESSAGE_CHANNEL_ID: channel_id,
+            PUB_MESSAGE_SEQ: {"$gt": last_seq}
+        }
+        cursor = pubsub_get_col(PUB_MESSAGE_COLLECTION).find(query).sort(PUB_MESSAGE_SEQ, pymongo.ASCENDING)\
+            .limit(limit - len(message_list))
+        messages = list(cursor)
+        if not messages:
+            if subscribe_id in __cursors and not message_list:
+                # the cached cursor may be ahead if the channel is removed and published again.
+                __cursors.pop(subscribe_id, None)
+                last_seq = None
+                continue
+            return message_list
+
+        new_seq = messages[-1][PUB_MESSAGE_SEQ]
+        ret = col.update_one({"_id": subscribe_id, PUB_CHANNEL_LAST_SEQ: last_seq},
+                             {"$set": {PUB_CHANNEL_LAST_SEQ: new_seq}})
+        if ret.modified_count:
+            __cursors[subscribe_id] = new_seq
+            return message_list + [{"message": m[PUB_MESSAGE_DATA], "time": m[PUB_MESSAGE_TIME]} for m in messages]
+
+        # the messages have been popped by another request or the cached cursor is out of date, read it again.
+        __cursors.pop(subscribe_id, None)
+        if message_list:
+            return message_list
+        last_seq = None
+
+
+def __pop_legacy_messages(subscribe_id, limit):
+    """ Claim the messages by a marker then remove them by it, the concurrent pops never get the same message.
+
+    The claimed messages which are not removed in CLAIM_TIMEOUT seconds can be claimed again.
+
+    :return: the messages, whether there is no more message.
+    """
+    col = pubsub_get_col(SUB_MESSAGE_COLLECTION)
+    unclaimed = {"$or": [{SUB_MESSAGE_CLAIM: {"$exists": False}},
+                         {SUB_MESSAGE_CLAIM: {"$lt": ObjectId.from_datetime(
+                             datetime.utcnow() - timedelta(seconds=CLAIM_TIMEOUT))}}]}
+    query = {
+        SUB_MESSAGE_SUBSCRIBE_ID: subscribe_id,
+        **unclaimed
     }
-    ret = col.insert_one(dic)
-    return ret
-
-
-def sub_pop_messages(pub_did, pub_appid, channel_name, sub_did, sub_appid, limit):
-    if hive_setting.MONGO_URI:
-        uri = hive_setting.MONGO_URI
-        connection = MongoClient(uri)
-    else:
-        connection = MongoClient(hive_setting.MONGODB_URL)
-
-    db = connection[DID_INFO_DB_NAME]
-    col = db[SUB_MESSAGE_COLLECTION]
-    _id = pubsub_get_subscribe_id(pub_did, pub_appid, channel_name, sub_did, sub_appid)
+    messages = list(col.find(query).sort(SUB_MESSAGE_TIME, pymongo.ASCENDING).limit(limit))
+    is_drained = len(messages) < limit
+    if not messages:
+        return list(), is_drained
+
+    claim = ObjectId()
+    ret = col.update_many({"_id": {"$in": [m["_id"] for m in messages]}, **unclaimed},
+                          {"$set": {SUB_MESSAGE_CLAIM: claim}})
+    if ret.modified_count != len(messages):
+        # some ones are claimed by another pop at the same time.
+        messages = list(col.find({SUB_MESSAGE_CLAIM: claim}).sort(SUB_MESSAGE_TIME, pymongo.ASCENDING))
+    col.delete_many({SUB_MESSAGE_CLAIM: claim})
+    return [{"message": m[SUB_MESSAGE_DATA], "time": m[SUB_MESSAGE_TIME]} for m in messages], is_drained
+
+
+def sub_migrate_subscription(subscription):
+    """ Set the cursor of the subscription which is created by the previous versions. """
+    channel_id = pubsub_get_channel_id(subscription[PUB_CHANNEL_PUB_DID],
+                                       subscription[PUB_CHANNEL_PUB_APPID],
+                                       subscription[PUB_CHANNEL_NAME])
+    update = {PUB_CHANNEL_LAST_SEQ: pub_get_last_seq(channel_id)}
+    if pubsub_get_col(SUB_MESSAGE_COLLECTION).find_one({SUB_MESSAGE_SUBSCRIBE_ID: subscription["_id"]}):
+        update[PUB_CHANNEL_LEGACY_MESSAGES] = True
+    pubsub_get_col(PUB_CHANNEL_COLLECTION).update_one(
+        {"_id": subscription["_id"], PUB_CHANNEL_LAST_SEQ: {"$exists": False}}, {"$set": update})
+
+
+def sub_migrate_messages():
+    """ Prepare the message log and the cursors of the subscriptions, only the first run does the migration. """
+    pub_init_message_log()
+    pubsub_get_col(SUB_MESSAGE_COLLECTION).create_index(
+        [(SUB_MESSAGE_SUBSCRIBE_ID, pymongo.ASCENDING), (SUB_MESSAGE_TIME, pymongo.ASCENDING)])
     query = {
-        SUB_MESSAGE_SUBSCRIBE_ID: _id,
+        PUB_CHANNEL_SUB_DID: {"$exists": True},
+        PUB_CHANNEL_LAST_SEQ: {"$exists": False}
     }
-    cursor = col.find(query).sort(SUB_MESSAGE_TIME, pymongo.ASCENDING).limit(limit)
-    message_list = list()
-    message_ids = list()
-
-    for message in cursor:
-        data = {
-            "message": message[SUB_MESSAGE_DATA],
-            "time": message[SUB_MESSAGE_TIME]
-        }
-        message_list.append(data)
-        message_ids.append(message["_id"])
-    if message_ids:
-        __remove_messages(message_ids)
-    return message_list
-
-
-def __remove_messages(message_ids):
-    if hive_setting.MONGO_URI:
-        uri = hive_setting.MONGO_URI
-        connection = MongoClient(uri)
-    else:
-        connection = MongoClient(hive_setting.MONGODB_URL)
-
-    db = connection[DID_INFO_DB_NAME]
-    col = db[SUB_MESSAGE_COLLECTION]
-    col.delete_many({"_id": {"$in": message_ids}})
+    count = 0
+    for subscription in pubsub_get_col(PUB_CHANNEL_COLLECTION).find(query):
+        sub_migrate_subscription(subscription)
+        count += 1
+    if count:
+        logging.getLogger("HivePubSub").info(f"Migrated {count} subscriptions to the message log.")
@@ -31,11 +31,32 @@ http://samba.anu.edu.au/rsync/.
     >>> patchstream(unpatched, save_to, delta)
 """
 
+import bisect
 import collections
 import hashlib
 
+import numpy as np
+
 __all__ = ["rollingchecksum", "weakchecksum", "patchstream", "rsyncdelta",
-           "blockchecksums", "gene_blockchecksums"]
+           "blockchecksums", "gene_blockchecksums", "gene_delta", "encode_delta",
+           "decode_delta"]
+
+# The data is read and checksummed by numpy in the batches of this size.
+BATCH_SIZE = 1024 * 1024
+
+_FILTER_SIZE = 1 << 24
+
+# The binary delta format:
+#   header: DELTA_MAGIC, DELTA_VERSION (1 byte), blocksize (varint)
+#   records: _DELTA_COPY, start block (varint), count of the blocks (varint)
+#            _DELTA_DATA, size (varint), raw data
+#            _DELTA_END
+DELTA_MAGIC = b'HRSD'
+DELTA_VERSION = 1
+
+_DELTA_END = 0
+_DELTA_COPY = 1
+_DELTA_DATA = 2
 
 
 def rsyncdelta(datastream, remotesignatures, blocksize=4096):
@@ -45,84 +66,298 @@ def rsyncdelta(datastream, remotesignatures, blocksize=4096):
     up-to-date data. The blocksize must be the same as the value
     used to generate remotesignatures.
     """
-    remote_weak = list()
-    remote_strong = list()
+    deltaqueue = [blocksize]
+
+    for element in _deltaelements(datastream, remotesignatures, blocksize):
+        if isinstance(element, bytearray) and isinstance(deltaqueue[-1], bytearray):
+            deltaqueue[-1] += element
+        else:
+            deltaqueue.append(element)
+
+    # Return a delta that starts with the blocksize and converts all iterables
+    # to bytes.
+    deltastructure = [blocksize]
+    for element in deltaqueue[1:]:
+        if isinstance(element, int):
+            deltastructure.append(element)
+        elif element:
+            deltastructure.append(bytes(element))
+
+    return deltastructure
 
-    for sig in remotesignatures:
-        remote_weak.append(int(sig[0]))
-        remote_strong.append(sig[1])
 
-    match = True
+def gene_delta(datastream, remotesignatures, blocksize=4096):
+    """
+    yield the binary delta (see encode_delta) of the up-to-date data
+    without holding the whole delta in memory.
+    """
+    return encode_delta(_deltaelements(datastream, remotesignatures, blocksize), blocksize)
+
+
+def _deltaelements(datastream, remotesignatures, blocksize):
+    """
+    Yields the elements of the delta: the index of the matching block (int),
+    the data not found inside of a matching block (bytearray, the adjacent
+    ones belong to the same element), and the last window (bytes).
+
+    The weak checksums of all windows in a batch of the data are calculated
+    by numpy, and only the windows whose weak checksum is in the remote ones
+    are checked one by one. The result is the same as the original
+    byte-by-byte implementation: a matching block is the first one after the
+    previous matching (or weak matching) block.
+    """
+    remote_weak = dict()
+    remote_strong = dict()
+
+    for i, sig in enumerate(remotesignatures):
+        remote_weak.setdefault(int(sig[0]), list()).append(i)
+        remote_strong.setdefault(sig[1], list()).append(i)
+
+    # The filter of the weak checksums, the windows which pass it are checked
+    # by the dict. The weak checksums out of the range can not match any window.
+    weak_filter = np.zeros(_FILTER_SIZE, dtype=np.bool_)
+    weak_filter[_filterkeys(np.array([w for w in remote_weak if 0 <= w < 1 << 62], dtype=np.int64))] = True
+
     matchblock = -1
-    deltaqueue = collections.deque()
 
+    def find_matchblock(checksum, window):
+        nonlocal matchblock
+
+        # If there are two identical weak checksums in a file, and the
+        # matching strong hash does not occur at the first match, it will
+        # be missed and the data sent over.
+        blocks = remote_weak.get(checksum)
+        i = bisect.bisect_right(blocks, matchblock) if blocks else 0
+        if not blocks or i == len(blocks):
+            return None
+        matchblock = blocks[i]
+
+        blocks = remote_strong.get(hashlib.sha256(window).hexdigest())
+        i = bisect.bisect_left(blocks, matchblock) if blocks else 0
+        if not blocks or i == len(blocks):
+            return None
+        matchblock = blocks[i]
+        return matchblock
+
+    buffer, pos = b'', 0
     while True:
-        if match and datastream is not None:
-            # Whenever there is a match or the loop is running for the first
-            # time, populate the window using weakchecksum instead of rolling
-            # through every single byte which takes at least twice as long.
-            window = collections.deque(bytes(datastream.read(blocksize)))
-            checksum, a, b = weakchecksum(window)
-
-        try:
-            # If there are two identical weak checksums in a file, and the
-            # matching strong hash does not occur at the first match, it will
-            # be missed and the data sent over. May fix eventually, but this
-            # problem arises very rarely.
-            matchblock = remote_weak.index(checksum, matchblock + 1)
-            stronghash = hashlib.sha256(bytes(window)).hexdigest()
-            matchblock = remote_strong.index(stronghash, matchblock)
-
-            match = True
-            deltaqueue.append(matchblock)
-
-            if datastream.closed:
-                break
+        data = datastream.read(BATCH_SIZE)
+        if not data:
+            break
+
+        buffer, pos = buffer[pos:] + data, 0
+        if len(buffer) <= blocksize:
             continue
 
-        except ValueError:
-            # The weakchecksum did not match
-            match = False
-            try:
-                if datastream:
-                    # Get the next byte and affix to the window
-                    newbyte = ord(datastream.read(1))
-                    window.append(newbyte)
-            except TypeError:
-                # No more data from the file; the window will slowly shrink.
-                # newbyte needs to be zero from here on to keep the checksum
-                # correct.
-                newbyte = 0
-                tailsize = datastream.tell() % blocksize
-                datastream = None
-
-            if datastream is None and len(window) <= tailsize:
-                # The likelihood that any blocks will match after this is
-                # nearly nil so call it quits.
-                deltaqueue.append(window)
+        # Only the windows followed by at least one byte are handled here,
+        # the others are handled with the tail of the stream.
+        limit = len(buffer) - blocksize
+        checksums = _windowchecksums(buffer, blocksize)[:limit]
+        candidates = np.flatnonzero(weak_filter[_filterkeys(checksums)]).tolist()
+
+        i = 0
+        while True:
+            i = bisect.bisect_left(candidates, pos, i)
+            if i == len(candidates):
                 break
+            start = candidates[i]
+            block = find_matchblock(int(checksums[start]), buffer[start:start + blocksize])
+            if block is None:
+                i += 1
+                continue
+            if pos < start:
+                yield bytearray(buffer[pos:start])
+            yield block
+            pos = start + blocksize
+
+        if pos < limit:
+            yield bytearray(buffer[pos:limit])
+            pos = limit
+
+    # No more data from the file; the window will slowly shrink.
+    # The removed byte needs to be zero from here on to keep the checksum
+    # correct.
+    window = collections.deque(buffer[pos:])
+    checksum, a, b = weakchecksum(buffer[pos:])
+    tailsize = None
+    removed = bytearray()
 
-            # Yank off the extra byte and calculate the new window checksum
-            oldbyte = window.popleft()
-            checksum, a, b = rollingchecksum(oldbyte, newbyte, a, b, blocksize)
+    while True:
+        block = find_matchblock(checksum, bytes(window))
+        if block is not None:
+            if removed:
+                yield removed
+            yield block
+            break
+
+        if tailsize is None:
+            tailsize = datastream.tell() % blocksize
+
+        if len(window) <= tailsize:
+            # The likelihood that any blocks will match after this is
+            # nearly nil so call it quits.
+            if removed:
+                yield removed
+            yield bytes(window)
+            break
+
+        oldbyte = window.popleft()
+        checksum, a, b = rollingchecksum(oldbyte, 0, a, b, blocksize)
+        removed.append(oldbyte)
+
+
+def encode_delta(delta, blocksize=None):
+    """
+    yield the binary format of the delta, the delta can be the result of
+    rsyncdelta, or the elements without the blocksize (the blocksize is
+    specified). The adjacent blocks are encoded as one record.
+    """
+    delta = iter(delta)
+    if blocksize is None:
+        blocksize = next(delta)
 
-            # Add the old byte the file delta. This is data that was not found
-            # inside of a matching block so it needs to be sent to the target.
-            try:
-                deltaqueue[-1].append(oldbyte)
-            except (AttributeError, IndexError):
-                deltaqueue.append([oldbyte])
+    output = bytearray(DELTA_MAGIC)
+    output.append(DELTA_VERSION)
+    output += _varint(blocksize)
+    start, count = 0, 0
 
-    # Return a delta that starts with the blocksize and converts all iterables
-    # to bytes.
-    deltastructure = [blocksize]
-    for element in deltaqueue:
+    for element in delta:
         if isinstance(element, int):
-            deltastructure.append(element)
+            if count and element == start + count:
+                count += 1
+                continue
+            if count:
+                output.append(_DELTA_COPY)
+                output += _varint(start) + _varint(count)
+            start, count = element, 1
         elif element:
-            deltastructure.append(bytes(element))
+            if count:
+                output.append(_DELTA_COPY)
+                output += _varint(start) + _varint(count)
+                count = 0
+            output.append(_DELTA_DATA)
+            output += _varint(len(element))
+            output += element
+
+        if len(output) >= BATCH_SIZE:
+            yield bytes(output)
+            output = bytearray()
+
+    if count:
+        output.append(_DELTA_COPY)
+        output += _varint(start) + _varint(count)
+    output.append(_DELTA_END)
+    yield bytes(output)
+
+
+def decode_delta(instream):
+    """
+    yield the delta from the binary format in the readable stream: the
+    blocksize first, then the indexes of the blocks and the data, which
+    can be patched by patchstream.
+    """
+    header = _readexactly(instream, len(DELTA_MAGIC) + 1)
+    if header[:len(DELTA_MAGIC)] != DELTA_MAGIC:
+        raise ValueError('Invalid delta format.')
+    if header[-1] != DELTA_VERSION:
+        raise ValueError(f'Unsupported delta version {header[-1]}.')
+    yield _readvarint(instream)
 
-    return deltastructure
+    while True:
+        tag = _readexactly(instream, 1)[0]
+        if tag == _DELTA_END:
+            return
+        elif tag == _DELTA_COPY:
+            start = _readvarint(instream)
+            yield from range(start, start + _readvarint(instream))
+        elif tag == _DELTA_DATA:
+            size = _readvarint(instream)
+            while size > 0:
+                data = _readexactly(instream, min(size, BATCH_SIZE))
+                size -= len(data)
+                yield data
+        else:
+            raise ValueError(f'Invalid delta record {tag}.')
+
+
+def _varint(value):
+    result = bytearray()
+    while value > 0x7f:
+        result.append((value & 0x7f) | 0x80)
+        value >>= 7
+    result.append(value)
+    return result
+
+
+def _readvarint(instream):
+    value, shift = 0, 0
+    while True:
+        byte = _readexactly(instream, 1)[0]
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value
+        shift += 7
+
+
+def _readexactly(instream, size):
+    data = instream.read(size)
+    while len(data) < size:
+        more = instream.read(size - len(data))
+        if not more:
+            raise ValueError('The delta is truncated.')
+        data += more
+    return data
+
+
+def _windowchecksums(data, blocksize):
+    """
+    Returns the weak checksums of all windows of the defined size in the
+    data, which are the same as the ones by rollingchecksum.
+    """
+    # a = p[k+n] - p[k], b = sum((n - i) * x[k+i]) = q[k+n] - q[k] - n * p[k]
+    # p is the prefix sums of the data, and q is the prefix sums of p.
+    values = np.frombuffer(data, dtype=np.uint8)
+    p = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(values, dtype=np.int64, out=p[1:])
+    q = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(p[1:], out=q[1:])
+
+    a = p[blocksize:] - p[:-blocksize]
+    b = q[blocksize:] - q[:-blocksize] - blocksize * p[:-blocksize]
+    return (b << 16) | a
+
+
+def _filterkeys(checksums):
+    """
+    Returns the keys in the filter of the weak checksums, which mixes the
+    bits of 'a' and 'b' of the checksums.
+    """
+    return (checksums ^ (checksums >> 24)) & (_FILTER_SIZE - 1)
+
+
+def _signatures(instream, blocksize):
+    """
+    Yields the weak and strong hashes for each block of the defined size
+    for the given data stream, the weak hashes of the batch are calculated
+    by numpy.
+    """
+    weights = np.arange(blocksize, 0, -1, dtype=np.int64)
+    batch = max(BATCH_SIZE // blocksize, 1) * blocksize
+
+    while True:
+        read = instream.read(batch)
+        if not read:
+            break
+
+        count = len(read) // blocksize
+        blocks = np.frombuffer(read, dtype=np.uint8, count=count * blocksize).reshape(count, blocksize)
+        weakhashes = ((blocks.dot(weights) << 16) | blocks.sum(axis=1, dtype=np.int64)).tolist()
+        if len(read) % blocksize:
+            weakhashes.append(weakchecksum(read[count * blocksize:])[0])
+
+        view = memoryview(read)
+        for i, weakhash in enumerate(weakhashes):
+            yield weakhash, hashlib.sha256(view[i * blocksize:(i + 1) * blocksize]).hexdigest()
 
 
 def blockchecksums(instream, blocksize=4096):
@@ -132,12 +367,10 @@ def blockchecksums(instream, blocksize=4096):
     """
     weakhashes = list()
     stronghashes = list()
-    read = instream.read(blocksize)
 
-    while read:
-        weakhashes.append(weakchecksum(bytes(read))[0])
-        stronghashes.append(hashlib.sha256(read).hexdigest())
-        read = instream.read(blocksize)
+    for weakhash, stronghash in _signatures(instream, blocksize):
+        weakhashes.append(weakhash)
+        stronghashes.append(stronghash)
 
     return weakhashes, stronghashes
 
@@ -147,23 +380,20 @@ def gene_blockchecksums(instream, blocksize=4096):
     yield a list of weak and strong hashes for each block of the
     defined size for the given data stream.
     """
-    read = instream.read(blocksize)
-
-    while read:
-        weakhash = weakchecksum(bytes(read))[0]
-        stronghash = hashlib.sha256(read).hexdigest()
+    for weakhash, stronghash in _signatures(instream, blocksize):
         yield ",".join([str(weakhash), str(stronghash)]) + "\n"
-        read = instream.read(blocksize)
 
 
 def patchstream(instream, outstream, delta):
     """
     Patches instream using the supplied delta and write the resultantant
-    data to outstream.
+    data to outstream. The delta can be the result of rsyncdelta or
+    decode_delta.
     """
-    blocksize = delta[0]
+    delta = iter(delta)
+    blocksize = next(delta)
 
-    for element in delta[1:]:
+    for element in delta:
         if isinstance(element, int) and blocksize:
             instream.seek(element * blocksize)
             element = instream.read(blocksize)
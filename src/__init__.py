@@ -20,6 +20,8 @@ from src.utils.auth_token import TokenParser
 from src.utils.did.did_init import init_did_backend
 from src.utils.consts import HIVE_MODE_PROD, HIVE_MODE_TEST
 from src.utils.payment_config import PaymentConfig
+from src.utils.leader import leader
+from src.utils.prefork import prefork
 from src import view
 
 import hive.settings
@@ -111,7 +113,6 @@ def create_app(mode=HIVE_MODE_PROD, hive_config='/etc/hive/.env'):
     logging.getLogger("src_init").info("##############################")
     logging.getLogger("src_init").info("HIVE NODE IS STARTING")
     logging.getLogger("src_init").info("##############################")
-    init_did_backend()
 
     # init v1 configure items
     hive.settings.hive_setting.init_config(hive_config)
@@ -120,6 +121,9 @@ def create_app(mode=HIVE_MODE_PROD, hive_config='/etc/hive/.env'):
     hive_setting.init_config(hive_config)
     PaymentConfig.init_config()
 
+    # the DID backend uses the resolver and the cache path of the configuration.
+    init_did_backend()
+
     # init v1 APIs
     hive.main.init_app(app, mode)
 
@@ -135,10 +139,14 @@ def create_app(mode=HIVE_MODE_PROD, hive_config='/etc/hive/.env'):
             CORS(app, supports_credentials=True)
 
         from src.utils.scheduler import scheduler_init
-        scheduler_init(app)
+        prefork.start_in_worker(lambda: scheduler_init(app))
 
     init_executor(app, mode)
 
+    if mode != HIVE_MODE_TEST:
+        # the scheduler jobs and the startup tasks run after this process is elected as the leader.
+        prefork.start_in_worker(leader.start)
+
     return app
 
 
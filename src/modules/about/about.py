@@ -6,6 +6,8 @@ The entrance for backup module.
 from src import hive_setting
 from src.modules.auth.auth import Auth
 from src.modules.provider.provider import Provider
+from src.utils.http_exception import ServiceUnavailableException
+from src.utils.startup import Startup
 
 
 class About:
@@ -30,6 +32,17 @@ class About:
             'commit_id': hive_setting.LAST_COMMIT
         }
 
+    def get_node_ready(self):
+        """ The node is ready after the startup migrations of this start are done, see Startup. """
+        try:
+            state = Startup().get_state()
+        except Exception as e:
+            raise ServiceUnavailableException(f'The node is not ready: {str(e)}')
+
+        if not state['ready']:
+            raise ServiceUnavailableException(f'The node is not ready: {state["state"]}, {state["tasks"]}')
+        return state
+
     def get_node_info(self):
         import shutil
         import psutil
@@ -37,6 +50,7 @@ class About:
         from src.modules.auth.user import UserManager
         from src.modules.subscription.vault import VaultManager
         from src.modules.backup.backup import BackupManager
+        from src.utils.temp_files import temp_files
 
         def get_last_access_time():
             vaults = VaultManager().get_all_vaults()
@@ -44,7 +58,7 @@ class About:
 
         owner_did, credential = Provider.get_verified_owner_did()
         auth = Auth()
-        memory, storage = psutil.virtual_memory(), shutil.disk_usage("/")
+        memory, storage, temp_usage = psutil.virtual_memory(), shutil.disk_usage("/"), temp_files.get_usage()
 
         return {
             "service_did": auth.did_str,
@@ -62,5 +76,7 @@ class About:
             "memory_used": memory.available,
             "memory_total": memory.total,
             "storage_used": storage.used,
-            "storage_total": storage.total
+            "storage_total": storage.total,
+            "temp_files": temp_usage['files'],
+            "temp_size": temp_usage['size']
         }
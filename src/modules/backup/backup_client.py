@@ -14,17 +14,21 @@ from src.modules.files.ipfs_client import IpfsClient
 from src.utils.consts import BACKUP_TARGET_TYPE, BACKUP_TARGET_TYPE_HIVE_NODE, BACKUP_REQUEST_ACTION, \
     BACKUP_REQUEST_ACTION_BACKUP, BACKUP_REQUEST_ACTION_RESTORE, BACKUP_REQUEST_STATE, BACKUP_REQUEST_STATE_PROCESS, \
     BACKUP_REQUEST_STATE_MSG, BACKUP_REQUEST_TARGET_HOST, BACKUP_REQUEST_TARGET_DID, BACKUP_REQUEST_TARGET_TOKEN, \
-    BACKUP_REQUEST_STATE_STOP, BACKUP_REQUEST_STATE_SUCCESS, \
+    BACKUP_REQUEST_STATE_STOP, BACKUP_REQUEST_STATE_SUCCESS, BACKUP_REQUEST_MANIFEST, BACKUP_REQUEST_STATS, \
     URL_SERVER_INTERNAL_BACKUP, URL_SERVER_INTERNAL_RESTORE, \
     COL_IPFS_BACKUP_CLIENT, USR_DID, URL_V2
-from src.utils.http_exception import BadRequestException, InsufficientStorageException
-from src.modules.files.local_file import LocalFile
+from src.utils.http_exception import BadRequestException, InsufficientStorageException, HiveException
+from src.utils.temp_files import temp_files
 from src.utils.http_client import HttpClient
 from src.modules.auth.auth import Auth
 from src.modules.auth.user import UserManager
 from src.modules.subscription.vault import VaultManager
 from src.modules.database.mongodb_client import MongodbClient
 from src.modules.backup.backup_server_client import BackupServerClient
+from src.modules.backup.backup_manifest import BackupManifest
+from src.modules.backup.backup_pipeline import DatabasePipeline
+from src.modules.backup.backup_progress import client_progress
+from src.modules.backup.compression import Compression
 from src.modules.backup.backup_executor import BackupClientExecutor, RestoreExecutor
 
 
@@ -38,6 +42,7 @@ class BackupClient:
         self.user_manager = UserManager()
         self.vault_manager = VaultManager()
         self.ipfs_client = IpfsClient()
+        self.database_pipeline = DatabasePipeline()
 
     def get_state(self):
         """ :v2 API: """
@@ -52,10 +57,12 @@ class BackupClient:
                 'message': '',
             }
 
+        # the latest progress may be not written yet.
+        result, message = client_progress.get_pending(g.usr_did) or (doc[BACKUP_REQUEST_STATE], doc[BACKUP_REQUEST_STATE_MSG])
         return {
             'state': doc[BACKUP_REQUEST_ACTION],
-            'result': doc[BACKUP_REQUEST_STATE],
-            'message': doc[BACKUP_REQUEST_STATE_MSG],
+            'result': result,
+            'message': message,
         }
 
     def backup(self, credential: str, is_force):
@@ -137,12 +144,21 @@ class BackupClient:
             BACKUP_REQUEST_TARGET_DID: target_did,
             BACKUP_REQUEST_TARGET_TOKEN: access_token}}
 
+        # the manifest only describes the data on the previous backup node.
+        doc = self.__get_request_doc(user_did)
+        if doc and (doc.get(BACKUP_REQUEST_TARGET_HOST) != target_host or doc.get(BACKUP_REQUEST_TARGET_DID) != target_did):
+            update['$set'][BACKUP_REQUEST_MANIFEST] = None
+
         self.mcli.get_management_collection(COL_IPFS_BACKUP_CLIENT).update_one(filter_, update, upsert=True)
         return self.__get_request_doc(user_did)
 
     # the following is for the executors.
 
     def update_request_state(self, user_did, state, msg=None):
+        """ The progress is written at most once per second. """
+        client_progress.update(user_did, state, msg, self.__write_request_state)
+
+    def __write_request_state(self, user_did, state, msg):
         filter_ = {USR_DID: user_did,
                    BACKUP_TARGET_TYPE: BACKUP_TARGET_TYPE_HIVE_NODE}
 
@@ -152,41 +168,59 @@ class BackupClient:
 
         self.mcli.get_management_collection(COL_IPFS_BACKUP_CLIENT).update_one(filter_, update)
 
-    def dump_database_data_to_backup_cids(self, user_did, encryption: Encryption, process_callback=t.Optional[t.Callable[[int, int], None]]):
+    def get_backup_manifest(self, user_did) -> BackupManifest:
+        """ Get the manifest of the latest successful backup, empty one if not exists. """
+        doc = self.__get_request_doc(user_did)
+        return BackupManifest(doc.get(BACKUP_REQUEST_MANIFEST) if doc else None)
+
+    def update_backup_manifest(self, user_did, manifest: t.Optional[dict]):
+        """ Keep the manifest after the backup successfully or reset it to None to make the next backup full. """
+        filter_ = {USR_DID: user_did,
+                   BACKUP_TARGET_TYPE: BACKUP_TARGET_TYPE_HIVE_NODE}
+
+        update = {'$set': {BACKUP_REQUEST_MANIFEST: manifest}}
+
+        self.mcli.get_management_collection(COL_IPFS_BACKUP_CLIENT).update_one(filter_, update)
+
+    def update_backup_stats(self, user_did, stats: t.Optional[dict]):
+        """ Keep the duration and the transferred size of the successful backup, None to clear. """
+        filter_ = {USR_DID: user_did,
+                   BACKUP_TARGET_TYPE: BACKUP_TARGET_TYPE_HIVE_NODE}
+
+        update = {'$set': {BACKUP_REQUEST_STATS: stats}}
+
+        self.mcli.get_management_collection(COL_IPFS_BACKUP_CLIENT).update_one(filter_, update)
+
+    def dump_database_data_to_backup_cids(self, user_did, encryption: Encryption,
+                                          process_callback: t.Optional[t.Callable[[int, int], None]] = None,
+                                          manifest: t.Optional[BackupManifest] = None,
+                                          compression: t.Optional[Compression] = None):
         """ Each application holds its databases under the same user did.
         The steps to dump each database data to each application is under the specific user did and application did:
 
-        - dump the specific database to a snapshot file;
-        - upload this snapshot file into IPFS node
+        - skip the database which content does not change since the backup of the manifest;
+        - dump the specific database, compress, encrypt and upload it into IPFS node by the pipeline.
+
+        The databases are handled concurrently, and process_callback is called with the count of the finished ones.
         """
         names = self.user_manager.get_database_names(user_did)
-        metadata_list, length = list(), len(names)
-        for i in range(length):
-            if process_callback:
-                process_callback(i + 1, length)
-
-            d = {
-                'path': LocalFile.generate_tmp_file_path(),
-                'name': names[i]
-            }
-            # dump the database data to snapshot file.
-            LocalFile.dump_mongodb_to_full_path(d['name'], d['path'])
+        secret_key, nonce = encryption.get_private_key()
 
-            # encrypt the dump file.
-            try:
-                encrypt_path = encryption.encrypt_file(d['path'])
-            except Exception as e:
-                raise BadRequestException(f'Can not encrypt the dump file for the database {names[i]}: {e}')
-            d['path'].unlink()
+        def dump_database(name):
+            # the dump file of the unchanged database is still on the backup node.
+            db_hash = self.mcli.get_database_hash(name)
+            unchanged = manifest.get_unchanged_database(name, db_hash) if manifest else None
+            if unchanged:
+                logging.info(f'[BackupClient] The database {name} does not change, skip dumping.')
+                return unchanged
 
-            # upload this snapshot file onto IPFS node.
-            d['cid'] = self.ipfs_client.upload_file(encrypt_path)
-            d['sha256'] = LocalFile.get_sha256(encrypt_path.as_posix())
-            d['size'] = encrypt_path.stat().st_size
-            encrypt_path.unlink()
+            try:
+                d = self.database_pipeline.dump_database(name, encryption, compression)
+            except HiveException as e:
+                raise BadRequestException(f'Can not dump the database {name}: {e.msg}')
+            return dict(d, hash=db_hash, encryption={'secret_key': secret_key, 'nonce': nonce})
 
-            metadata_list.append(d)
-        return metadata_list
+        return self.database_pipeline.run(dump_database, names, process_callback)
 
     def send_root_backup_cid_to_backup_node(self, user_did, cid, sha256, size, is_force):
         """
@@ -215,41 +249,36 @@ class BackupClient:
                              + f'?public_key={Encryption.get_service_did_public_key(False)}',
                              req[BACKUP_REQUEST_TARGET_TOKEN])
 
-        tmp_file = LocalFile.generate_tmp_file_path()
-        self.ipfs_client.download_file(data['cid'], tmp_file, is_proxy=True, sha256=data['sha256'], size=data['size'])
+        with temp_files.scope() as scope:
+            tmp_file = scope.new_path()
+            self.ipfs_client.download_file(data['cid'], tmp_file, is_proxy=True, sha256=data['sha256'], size=data['size'])
 
-        try:
-            plain_path = Encryption.decrypt_file_with_curve25519(tmp_file, data['public_key'], False)
-            tmp_file.unlink()
-            with open(plain_path, 'r') as f:
-                request_metadata = json.load(f)
-        except Exception as e:
-            raise BadRequestException('Failed to decrypt the metadata for restoring on the vault node.')
+            try:
+                plain_path = scope.track(Encryption.decrypt_file_with_curve25519(tmp_file, data['public_key'], False))
+                request_metadata = json.loads(Compression.decompress_bytes(plain_path.read_bytes()))
+            except Exception as e:
+                raise BadRequestException('Failed to decrypt the metadata for restoring on the vault node.')
 
         if request_metadata['vault_size'] > self.vault_manager.get_vault(user_did).get_storage_quota():
             raise InsufficientStorageException('No enough space to restore, please upgrade the vault and try again.')
         return request_metadata
 
     def restore_database_by_dump_files(self, request_metadata):
-        databases, secret_key, nonce = request_metadata['databases'], request_metadata['encryption']['secret_key'], request_metadata['encryption']['nonce']
+        databases = request_metadata['databases']
         if not databases:
             logging.info('[BackupClient] No user databases dump files, skip.')
             return
 
-        for d in databases:
-            temp_file = LocalFile.generate_tmp_file_path()
-            msg = self.ipfs_client.download_file(d['cid'], temp_file, is_proxy=True, sha256=d['sha256'], size=d['size'])
-            if msg:
-                logging.error(f'[BackupClient] Failed to download dump file for database {d["name"]}.')
-                temp_file.unlink()
-                raise BadRequestException(msg)
-
-            plain_path = Encryption(secret_key, nonce).decrypt_file(temp_file)
-            temp_file.unlink()
+        def restore_database(d):
+            # the database reused from the previous backup keeps its own encryption key, added from the version 1.1.
+            encryption = d.get('encryption', request_metadata['encryption'])
+            try:
+                self.database_pipeline.restore_database(d, Encryption(encryption['secret_key'], encryption['nonce']))
+            except HiveException as e:
+                logging.error(f'[BackupClient] Failed to restore the dump file for database {d["name"]}.')
+                raise BadRequestException(e.msg)
 
-            LocalFile.restore_mongodb_from_full_path(plain_path)
-            plain_path.unlink()
-            logging.info(f'[BackupClient] Success to restore the dump file for database {d["name"]}.')
+        self.database_pipeline.run(restore_database, databases)
 
     def retry_backup_request(self):
         """ retry unfinished backup&restore action when node rebooted """
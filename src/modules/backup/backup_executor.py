@@ -7,15 +7,19 @@ import time
 import traceback
 from datetime import datetime
 
+from src import hive_setting
+from src.modules.backup.backup_manifest import BackupManifest
 from src.modules.backup.backup_server_client import BackupServerClient
+from src.modules.backup.compression import Compression
 from src.modules.backup.encryption import Encryption
 from src.modules.files.file_metadata import FileMetadataManager
 from src.modules.files.ipfs_cid_ref import IpfsCidRef
 from src.modules.files.ipfs_client import IpfsClient
 from src.modules.files.local_file import LocalFile
+from src.utils.temp_files import temp_files
 from src.modules.subscription.vault import VaultManager
 from src.utils.consts import BACKUP_REQUEST_STATE_SUCCESS, BACKUP_REQUEST_STATE_FAILED, USR_DID, BACKUP_REQUEST_STATE_PROCESS, BACKUP_REQUEST_TARGET_HOST, \
-    BACKUP_REQUEST_TARGET_TOKEN
+    BACKUP_REQUEST_TARGET_TOKEN, BKSERVER_REQ_BASE_CID
 from src.utils.http_exception import HiveException, BadRequestException
 
 
@@ -50,7 +54,8 @@ class ExecutorBase(threading.Thread):
         # INFO: override this.
         pass
 
-    def generate_root_backup_cid(self, database_cids, files_cids, total_file_size, encryption: Encryption):
+    def generate_root_backup_cid(self, database_cids, files_cids, total_file_size, encryption: Encryption, delta=None,
+                                 compression: Compression = None):
         """ Create a json doc containing basic root informations:
 
         - database data DIDs;
@@ -58,15 +63,22 @@ class ExecutorBase(threading.Thread):
         - total amount of vault data;
         - total amount of backup data to sync.
         - create timestamp.
+        - the delta since the previous backup if incremental.
+
+        The json doc is compressed before the encryption if the backup node supports.
         """
+        compression = compression if compression else Compression()
 
         secret_key, nonce = encryption.get_private_key()
         data = {
-            'version': '1.0',
+            'version': '1.2',
             'databases': [{'name': d['name'],
                            'sha256': d['sha256'],
                            'cid': d['cid'],
-                           'size': d['size']} for d in database_cids],
+                           'size': d['size'],
+                           'hash': d.get('hash'),
+                           'encryption': d['encryption'],
+                           'compression': d.get('compression', Compression.NONE)} for d in database_cids],
             'files': [{'sha256': d['sha256'],
                        'cid': d['cid'],
                        'size': d['size'],
@@ -78,20 +90,21 @@ class ExecutorBase(threading.Thread):
             "encryption": {
                 "secret_key": secret_key,
                 "nonce": nonce
-            }
+            },
+            "compression": compression.codec
         }
+        if delta:
+            data['delta'] = delta
 
-        temp_file = LocalFile.generate_tmp_file_path()
-        with temp_file.open('w') as f:
-            json.dump(data, f)
+        with temp_files.scope() as scope:
+            temp_file = scope.new_path()
+            temp_file.write_bytes(compression.compress_bytes(json.dumps(data).encode()))
 
-        _, _, _, public_key = BackupServerClient.get_state_by_user_did(self.user_did)
-        encryption_path = Encryption.encrypt_file_with_curve25519(temp_file, public_key, False)
-        temp_file.unlink()
+            _, _, _, public_key = BackupServerClient.get_state_by_user_did(self.user_did)
+            encryption_path = scope.track(Encryption.encrypt_file_with_curve25519(temp_file, public_key, False))
 
-        sha256, size = LocalFile.get_sha256(encryption_path.as_posix()), encryption_path.stat().st_size
-        cid = IpfsClient().upload_file(encryption_path)
-        encryption_path.unlink()
+            sha256, size = LocalFile.get_sha256(encryption_path.as_posix()), encryption_path.stat().st_size
+            cid = IpfsClient().upload_file(encryption_path)
         return cid, sha256, size, data
 
     @staticmethod
@@ -147,37 +160,73 @@ class ExecutorBase(threading.Thread):
                 execute_pin_unpin(d['cid'])
             logging.info(f'[ExecutorBase] Success to {"pin" if not is_unpin else "unpin"} all databases CIDs.')
 
-        # pin or unpin files
+        # pin or unpin files, the references of the cids are changed together by one bulk writing.
         if contain_files and request_metadata.get('files'):
+            deltas = dict()
             for f in request_metadata.get('files'):
                 if not only_files_ref:
                     execute_pin_unpin(f['cid'])
 
-                cid_ref = IpfsCidRef(f['cid'])
-                if not is_unpin:
-                    cid_ref.decrease(f['count'])
-                else:
-                    cid_ref.increase(f['count'])
+                deltas[f['cid']] = deltas.get(f['cid'], 0) + (-f['count'] if not is_unpin else f['count'])
 
+            IpfsCidRef.update_counts(deltas)
             logging.info('[ExecutorBase] Success to pin all files CIDs.')
 
+    @staticmethod
+    def handle_delta_cids_in_local_ipfs(delta):
+        """ Handle the CIDs of the incremental backup, the CIDs of the base backup already on the local IPFS node.
+
+        Pin the added CIDs first, then unpin the removed ones and the root CID of the base backup.
+        """
+        databases, files = delta['databases'], delta['files']
+        ExecutorBase.handle_cids_in_local_ipfs({'databases': databases['added'], 'files': files['added']})
+
+        # only the reference count changes.
+        increased = [f for f in files['changed'] if f['count'] > 0]
+        decreased = [dict(f, count=-f['count']) for f in files['changed'] if f['count'] < 0]
+        ExecutorBase.handle_cids_in_local_ipfs({'files': increased}, contain_databases=False, only_files_ref=True)
+        ExecutorBase.handle_cids_in_local_ipfs({'files': decreased}, contain_databases=False, is_unpin=True, only_files_ref=True)
+
+        ExecutorBase.handle_cids_in_local_ipfs({'databases': databases['removed'], 'files': files['removed']},
+                                               root_cid=delta['base_cid'], is_unpin=True)
+
 
 class BackupClientExecutor(ExecutorBase):
+    # seconds, the long polling of the state of the backup server.
+    STATE_WAIT = 20
+    STATE_MAX_BACKOFF = 60
+    STATE_MAX_FAILURES = 8
+
     def __init__(self, user_did, client, req, **kwargs):
         super().__init__(user_did, client, 'backup_client', **kwargs)
         self.req = req
         self.file_manager = FileMetadataManager()
 
     def execute(self):
-        def callback_dump_databases(index, total):
-            percent = str(int(15 * (index - 1) / total))
+        def callback_dump_databases(finished, total):
+            percent = str(int(15 * finished / total))
             self.owner.update_request_state(self.user_did, BACKUP_REQUEST_STATE_PROCESS, percent)
 
-        encryption = Encryption()
+        start_time = time.time()
+
+        # the old backup node can not decompress or decrypt the data, so only use the codec and the format it supports.
+        state_body = BackupServerClient.get_state_body_by_user_did(self.user_did)
+        compression = Compression.negotiate(hive_setting.BACKUP_COMPRESSION, state_body.get('compressions', []))
+        encryption = Encryption(format_=Encryption.negotiate(state_body.get('encryptions', [])))
+
+        # the force backup is always the full one.
+        is_incremental = hive_setting.BACKUP_INCREMENTAL and not self.is_force
+        manifest = self.owner.get_backup_manifest(self.user_did) if is_incremental else BackupManifest()
+
+        # the backup node may lose the base of the manifest or be an old one which does not report it.
+        if not manifest.is_empty() and state_body.get('base_cid') != manifest.root_cid:
+            logging.info(f'[BackupExecutor] The base {manifest.root_cid} is not on the backup node, do the full backup.')
+            manifest = BackupManifest()
 
         self.owner.update_request_state(self.user_did, BACKUP_REQUEST_STATE_PROCESS, '0')  # 100-based
 
-        database_cids = self.owner.dump_database_data_to_backup_cids(self.user_did, encryption, callback_dump_databases)
+        database_cids = self.owner.dump_database_data_to_backup_cids(self.user_did, encryption, callback_dump_databases,
+                                                                     manifest=manifest, compression=compression)
         self.owner.update_request_state(self.user_did, BACKUP_REQUEST_STATE_PROCESS, '15')  # 100-based
         logging.info('[BackupExecutor] Dumped the database data to IPFS node and returned with array of CIDs')
 
@@ -185,7 +234,9 @@ class BackupClientExecutor(ExecutorBase):
         self.owner.update_request_state(self.user_did, BACKUP_REQUEST_STATE_PROCESS, '25')  # 100-based
         logging.info('[BackupExecutor] Got an array of CIDs to file data')
 
-        cid, sha256, size, request_metadata = self.generate_root_backup_cid(database_cids, file_cids, filedata_size, encryption)
+        delta = manifest.diff(database_cids, file_cids) if not manifest.is_empty() else None
+        cid, sha256, size, request_metadata = self.generate_root_backup_cid(database_cids, file_cids, filedata_size, encryption,
+                                                                            delta=delta, compression=compression)
         self.owner.update_request_state(self.user_did, BACKUP_REQUEST_STATE_PROCESS, '35')  # 100-based
         logging.info(f'[BackupExecutor] Generated the root backup CID to vault data, request_metadata, {request_metadata}, cid, {cid}')
 
@@ -195,24 +246,55 @@ class BackupClientExecutor(ExecutorBase):
 
         # wait until the server ends
         try:
-            client = BackupServerClient(self.req[BACKUP_REQUEST_TARGET_HOST], token=self.req[BACKUP_REQUEST_TARGET_TOKEN])
-            while True:
-                remote_action, remote_state, remote_msg, _ = client.get_state()
-
-                if remote_state == BACKUP_REQUEST_STATE_PROCESS:
-                    self.owner.update_request_state(self.user_did, BACKUP_REQUEST_STATE_PROCESS, remote_msg)  # 100-based
-                elif remote_state == BACKUP_REQUEST_STATE_SUCCESS:
-                    break
-                else:
-                    raise BadRequestException(f'server error: {remote_msg}')
-
-                time.sleep(2)
+            self.wait_server_state()
+            self.owner.update_backup_manifest(self.user_did, BackupManifest.from_request_metadata(cid, request_metadata))
         except Exception as e:
+            # the backup node may be not the same state as the manifest, the next backup MUST be the full one.
+            self.owner.update_backup_manifest(self.user_did, None)
             raise e
         finally:
             if 'http://localhost' not in self.req[BACKUP_REQUEST_TARGET_HOST]:  # for local dev
-                # clean client side cids
-                super().handle_cids_in_local_ipfs(request_metadata, root_cid=cid, contain_databases=True, contain_files=False, is_unpin=True)
+                # clean client side cids, the reused database dump files are only on the backup node.
+                uploaded = {'databases': [d for d in request_metadata['databases'] if not manifest.is_database_uploaded(d)]}
+                super().handle_cids_in_local_ipfs(uploaded, root_cid=cid, contain_databases=True, contain_files=False, is_unpin=True)
+
+        transferred, duration = BackupManifest.get_delta_size(delta) if delta else request_metadata['backup_size'], time.time() - start_time
+        self.owner.update_backup_stats(self.user_did, {'incremental': bool(delta), 'duration': duration,
+                                                       'transferred': transferred, 'backup_size': request_metadata['backup_size']})
+        logging.info(f'[BackupExecutor] Finished the {"incremental" if delta else "full"} backup in {int(duration)} seconds, '
+                     f'{transferred} bytes need be transferred to the backup node.')
+
+    def wait_server_state(self):
+        """ Follow the progress of the backup server by the long polling until it ends.
+
+        The old backup server does not support the long polling, then poll it every 2 seconds.
+        Retry with the exponential backoff when the backup server is unavailable.
+        """
+        client = BackupServerClient(self.req[BACKUP_REQUEST_TARGET_HOST], token=self.req[BACKUP_REQUEST_TARGET_TOKEN])
+        remote_state, remote_msg, failures = None, None, 0
+        while True:
+            try:
+                body = client.get_state_body(BackupClientExecutor.STATE_WAIT, remote_state, remote_msg)
+                failures = 0
+            except HiveException as e:
+                failures += 1
+                if failures > BackupClientExecutor.STATE_MAX_FAILURES:
+                    raise e
+                delay = min(2 ** failures, BackupClientExecutor.STATE_MAX_BACKOFF)
+                logging.info(f'[BackupExecutor] Failed to get the state from the backup node, retry after {delay} seconds: {e.msg}')
+                time.sleep(delay)
+                continue
+
+            remote_state, remote_msg = body['result'], body['message']
+            if remote_state == BACKUP_REQUEST_STATE_PROCESS:
+                self.owner.update_request_state(self.user_did, BACKUP_REQUEST_STATE_PROCESS, remote_msg)  # 100-based
+            elif remote_state == BACKUP_REQUEST_STATE_SUCCESS:
+                break
+            else:
+                raise BadRequestException(f'server error: {remote_msg}')
+
+            if not body.get('long_poll'):
+                time.sleep(2)
 
 
 class RestoreExecutor(ExecutorBase):
@@ -255,7 +337,13 @@ class BackupServerExecutor(ExecutorBase):
         self.owner.update_request_state(self.user_did, BACKUP_REQUEST_STATE_PROCESS, '60')  # 100-based
         logging.info('[BackupServerExecutor] Success to get request metadata.')
 
-        self.__class__.handle_cids_in_local_ipfs(request_metadata)
+        # only handle the delta if the base of the incremental backup is the previous backup on this node.
+        delta = request_metadata.get('delta')
+        if delta and delta.get('base_cid') and delta['base_cid'] == self.req.get(BKSERVER_REQ_BASE_CID):
+            self.__class__.handle_delta_cids_in_local_ipfs(delta)
+            logging.info(f'[BackupServerExecutor] Success to handle the delta CIDs based on {delta["base_cid"]}.')
+        else:
+            self.__class__.handle_cids_in_local_ipfs(request_metadata)
         self.owner.update_request_state(self.user_did, BACKUP_REQUEST_STATE_PROCESS, '80')  # 100-based
         logging.info('[BackupServerExecutor] Success to get pin all CIDs.')
 
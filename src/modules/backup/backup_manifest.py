@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+"""
+The manifest of the latest successful backup on the vault node side, used to build the incremental backup.
+"""
+import typing as t
+
+
+class BackupManifest:
+    """ Keeps the CIDs of the databases and files which have already been on the backup node.
+
+    The manifest is saved on the vault node after the backup node finishes the backup successfully.
+    The next backup compares with it to get the delta (added, removed CIDs and changed databases)
+    then the backup node only needs to pin or unpin the delta.
+    """
+
+    def __init__(self, doc: t.Optional[dict] = None):
+        doc = doc if doc else {}
+        self.root_cid = doc.get('root_cid')
+        self.databases = {d['name']: d for d in doc.get('databases', [])}
+        self.files = {f['cid']: f for f in doc.get('files', [])}
+
+    def is_empty(self):
+        return not self.root_cid
+
+    def get_unchanged_database(self, name, db_hash) -> t.Optional[dict]:
+        """ Get the dump information of the database if the content does not change since last backup. """
+        if not db_hash:
+            return None
+
+        d = self.databases.get(name)
+        if not d or d.get('hash') != db_hash or not d.get('encryption'):
+            return None
+        return d
+
+    def is_database_uploaded(self, database: dict):
+        """ Whether the dump file of the database has already been on the backup node. """
+        d = self.databases.get(database['name'])
+        return d is not None and d['cid'] == database['cid']
+
+    def diff(self, database_cids: list, files_cids: list) -> dict:
+        """ Get the delta between the manifest and the current vault data.
+
+        The files with the same CID but different reference count are put into 'changed',
+        which count is the difference of the reference count.
+        """
+        old_db_cids = set(d['cid'] for d in self.databases.values())
+        new_db_cids = set(d['cid'] for d in database_cids)
+
+        added_files, changed_files, new_files = list(), list(), dict()
+        for f in files_cids:
+            new_files[f['cid']] = f
+            old = self.files.get(f['cid'])
+            if not old:
+                added_files.append(f)
+            elif old['count'] != f['count']:
+                changed_files.append(dict(f, count=f['count'] - old['count']))
+
+        return {
+            'base_cid': self.root_cid,
+            'databases': {
+                'added': [d for d in database_cids if d['cid'] not in old_db_cids],
+                'removed': [d for d in self.databases.values() if d['cid'] not in new_db_cids]
+            },
+            'files': {
+                'added': added_files,
+                'removed': [f for cid, f in self.files.items() if cid not in new_files],
+                'changed': changed_files
+            }
+        }
+
+    @staticmethod
+    def get_delta_size(delta: dict):
+        """ The size of the data which the backup node needs to pin. """
+        return sum([d['size'] for d in delta['databases']['added']]) + sum([f['size'] for f in delta['files']['added']])
+
+    @staticmethod
+    def from_request_metadata(root_cid, request_metadata: dict) -> dict:
+        """ Build the manifest document from the request metadata which has been backup successfully. """
+        return {
+            'root_cid': root_cid,
+            'databases': request_metadata['databases'],
+            'files': request_metadata['files']
+        }
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+"""
+The pipelines to backup and restore the application databases without the local dump files.
+"""
+import hashlib
+import logging
+import time
+import typing as t
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from src import hive_setting
+from src.modules.backup.compression import Compression, CompressingReader
+from src.modules.backup.encryption import Encryption
+from src.modules.files.ipfs_client import IpfsClient
+from src.modules.files.local_file import LocalFile
+from src.utils.http_exception import BadRequestException
+from src.utils.io_tuning import IOTuning
+from src.utils.temp_files import temp_files
+
+
+class HashingReader:
+    """ Count the size and sha256 of the data which is read from the stream. """
+
+    def __init__(self, stream: t.BinaryIO):
+        self.stream = stream
+        self.sha = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size=None) -> bytes:
+        data = self.stream.read(size)
+        self.sha.update(data)
+        self.size += len(data)
+        return data
+
+    def hexdigest(self):
+        return self.sha.hexdigest()
+
+
+class DatabasePipeline:
+    """ Each database goes through the stages in a stream, and the databases are handled concurrently by a bounded pool.
+
+    - backup: mongodump -> compress -> encrypt -> sha256 -> upload to the IPFS node
+    - restore: download from the IPFS node -> sha256 -> the checked temporary file -> decrypt -> decompress -> mongorestore
+    """
+
+    def __init__(self, workers: int = None):
+        self.workers = workers if workers else hive_setting.BACKUP_PIPELINE_WORKERS
+        self.ipfs_client = IpfsClient()
+
+    def dump_database(self, name, encryption: Encryption, compression: Compression = None) -> dict:
+        """ Dump the database and upload the compressed and encrypted archive to the IPFS node. """
+        compression = compression if compression else Compression()
+        sha, size, start = hashlib.sha256(), 0, time.time()
+
+        def hashing(chunks: t.Iterator[bytes]):
+            nonlocal size
+            for chunk in chunks:
+                sha.update(chunk)
+                size += len(chunk)
+                yield chunk
+
+        cid = None
+        try:
+            with LocalFile.dump_mongodb_to_pipe(name) as pipe:
+                reader = compression.compress_reader(pipe.stream)
+                cid = self.ipfs_client.upload_stream(hashing(encryption.encrypt_chunks(reader)))
+        except BadRequestException:
+            # mongodump fails after the truncated archive is uploaded and pinned.
+            if cid:
+                self.ipfs_client.cid_unpin(cid)
+            raise
+
+        logging.info(f'[DatabasePipeline] Success to dump the database {name}, size {size}.')
+        if isinstance(reader, CompressingReader):
+            # estimate the transfer time saved by the speed of the whole pipeline.
+            elapsed, saved = time.time() - start, reader.raw_size - reader.compressed_size
+            saved_time = saved * elapsed / reader.compressed_size if reader.compressed_size else 0
+            logging.info(f'[DatabasePipeline] Compressed the database {name} by {compression.codec}, '
+                         f'{reader.raw_size} -> {reader.compressed_size} bytes, saved {saved} bytes, '
+                         f'compression cost {reader.cost_time:.2f} seconds, transfer saved about {saved_time:.2f} seconds.')
+        return {'name': name, 'cid': cid, 'sha256': sha.hexdigest(), 'size': size, 'compression': compression.codec}
+
+    def restore_database(self, d: dict, encryption: Encryption):
+        """ Download the encrypted archive from the IPFS node to the temporary file, check it, then restore it to the database.
+
+        'mongorestore --drop' drops the collections first, so the archive is checked before restoring,
+        then the broken download never leaves the database partly restored.
+        """
+        with temp_files.scope() as scope:
+            temp_file = scope.new_path()
+            response = self.ipfs_client.download_stream(d['cid'], is_proxy=True)
+            try:
+                reader = HashingReader(response.raw)
+                with IOTuning.open_for_write(temp_file.as_posix()) as f:
+                    IOTuning.copy_stream(reader, f)
+            finally:
+                response.close()
+
+            if reader.size != d['size'] or reader.hexdigest() != d['sha256']:
+                raise BadRequestException(f'Failed to get the dump file of the database {d["name"]} with cid {d["cid"]}, '
+                                          f'size {d["size"], reader.size}, sha256 {d["sha256"], reader.hexdigest()}')
+
+            with open(temp_file.as_posix(), 'rb') as f, LocalFile.restore_mongodb_from_pipe(d['name']) as pipe:
+                # the codec is detected from the data, the old dump files are not compressed.
+                writer = Compression.decompress_writer(pipe.stream)
+                encryption.decrypt_stream(f, writer)
+                writer.flush()
+
+        logging.info(f'[DatabasePipeline] Success to restore the database {d["name"]}.')
+
+    def run(self, fn: t.Callable[[t.Any], t.Any], items: list,
+            process_callback: t.Optional[t.Callable[[int, int], None]] = None) -> list:
+        """ Run fn on every item by the pool and return the results with the same order of the items.
+
+        :param fn: The function to handle one item.
+        :param items: The items to handle.
+        :param process_callback: Called with the count of the finished items and the total count.
+        """
+        if not items:
+            return []
+
+        with ThreadPoolExecutor(min(self.workers, len(items))) as pool:
+            futures = [pool.submit(fn, item) for item in items]
+            try:
+                for i, future in enumerate(as_completed(futures)):
+                    future.result()
+                    if process_callback:
+                        process_callback(i + 1, len(items))
+            except Exception as e:
+                # not start the waiting ones.
+                for future in futures:
+                    future.cancel()
+                raise e
+            return [future.result() for future in futures]
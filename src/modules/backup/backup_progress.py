@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""
+The progress channel of the backup and restore requests.
+"""
+import logging
+import threading
+import time
+import typing as t
+
+from src.utils.consts import BACKUP_REQUEST_STATE_PROCESS
+
+
+class ProgressChannel:
+    """ Coalesce the progress writes of the requests and wake up the waiters of the state.
+
+    The progress ('process' state) of one user is written at most once per interval, the latest one is kept
+    in memory and written by a timer. The final state (success or failed) is written immediately.
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.cond = threading.Condition(threading.RLock())
+        self.last_write = {}  # user_did -> the timestamp of the latest write
+        self.pending = {}  # user_did -> (write_fn, state, msg)
+        self.versions = {}  # user_did -> the count of the updates
+
+    def update(self, user_did, state, msg, write_fn: t.Callable[[str, str, str], None]):
+        """ Update the state of the user and write it by write_fn(user_did, state, msg) now or later. """
+        with self.cond:
+            self.notify(user_did)
+
+            if state == BACKUP_REQUEST_STATE_PROCESS:
+                delay = self.last_write.get(user_did, 0) + self.interval - time.time()
+                if delay > 0:
+                    if user_did not in self.pending:
+                        timer = threading.Timer(delay, self.__flush, (user_did,))
+                        timer.daemon = True
+                        timer.start()
+                    self.pending[user_did] = (write_fn, state, msg)
+                    return
+
+            # the pending progress is older than this one.
+            self.pending.pop(user_did, None)
+            self.__write(user_did, write_fn, state, msg)
+            if state != BACKUP_REQUEST_STATE_PROCESS:
+                self.last_write.pop(user_did, None)
+
+    def notify(self, user_did):
+        """ Wake up the waiters of the user, call this if the state is written directly. """
+        with self.cond:
+            self.versions[user_did] = self.versions.get(user_did, 0) + 1
+            self.cond.notify_all()
+
+    def get_pending(self, user_did) -> t.Optional[t.Tuple[str, str]]:
+        """ Get the state and message which is not written yet. """
+        with self.cond:
+            pending = self.pending.get(user_did)
+            return (pending[1], pending[2]) if pending else None
+
+    def get_version(self, user_did) -> int:
+        with self.cond:
+            return self.versions.get(user_did, 0)
+
+    def wait(self, user_did, version, timeout):
+        """ Wait until the state of the user is updated after the version or timeout. """
+        with self.cond:
+            self.cond.wait_for(lambda: self.versions.get(user_did, 0) != version, timeout)
+
+    def __flush(self, user_did):
+        with self.cond:
+            if user_did not in self.pending:
+                return
+            write_fn, state, msg = self.pending.pop(user_did)
+            try:
+                self.__write(user_did, write_fn, state, msg)
+            except Exception as e:
+                logging.error(f'[ProgressChannel] Failed to write the progress of {user_did}: {e}')
+
+    def __write(self, user_did, write_fn, state, msg):
+        self.last_write[user_did] = time.time()
+        write_fn(user_did, state, msg)
+
+
+# the vault side and the backup side, the same user may be on both sides of the same node.
+client_progress = ProgressChannel()
+server_progress = ProgressChannel()
@@ -1,16 +1,20 @@
 # -*- coding: utf-8 -*-
 import json
 import logging
+import time
 
 from flask import g
 
+from src.modules.backup.backup_progress import server_progress
+from src.modules.backup.compression import Compression
 from src.modules.backup.encryption import Encryption
-from src.modules.files.local_file import LocalFile
+from src.utils.temp_files import temp_files
 from src.utils.consts import BKSERVER_REQ_STATE, BACKUP_REQUEST_STATE_PROCESS, BKSERVER_REQ_ACTION, \
     BACKUP_REQUEST_ACTION_BACKUP, BKSERVER_REQ_CID, BKSERVER_REQ_SHA256, BKSERVER_REQ_SIZE, \
     BKSERVER_REQ_STATE_MSG, BACKUP_REQUEST_STATE_FAILED, COL_IPFS_BACKUP_SERVER, USR_DID, BACKUP_REQUEST_STATE_SUCCESS, \
     VAULT_BACKUP_SERVICE_MAX_STORAGE, VAULT_BACKUP_SERVICE_START_TIME, VAULT_BACKUP_SERVICE_END_TIME, \
-    VAULT_BACKUP_SERVICE_USING, VAULT_BACKUP_SERVICE_USE_STORAGE, VAULT_SERVICE_MAX_STORAGE, BKSERVER_REQ_PUBLIC_KEY
+    VAULT_BACKUP_SERVICE_USING, VAULT_BACKUP_SERVICE_USE_STORAGE, VAULT_SERVICE_MAX_STORAGE, BKSERVER_REQ_PUBLIC_KEY, \
+    BKSERVER_REQ_BASE_CID
 from src.utils.http_exception import BackupNotFoundException, AlreadyExistsException, BadRequestException, \
     InsufficientStorageException, NotImplementedException, VaultNotFoundException
 from src.utils.payment_config import PaymentConfig
@@ -26,6 +30,10 @@ from src.modules.subscription.vault import VaultManager
 
 
 class BackupServer:
+    # the long polling of the state, less than the timeout of the http client.
+    STATE_MAX_WAIT = 20
+    STATE_CHECK_INTERVAL = 5
+
     def __init__(self):
         self.vault = VaultSubscription()
         self.client = BackupClient()
@@ -73,6 +81,9 @@ class BackupServer:
         # pin the request metadata to local ipfs node.
         self.ipfs_client.cid_pin(cid)
 
+        # the previous successful backup can be the base of the incremental backup.
+        base_cid = backup.get(BKSERVER_REQ_CID) if backup.get(BKSERVER_REQ_STATE) == BACKUP_REQUEST_STATE_SUCCESS else None
+
         # recode the request and run the executor.
         update = {
             BKSERVER_REQ_ACTION: BACKUP_REQUEST_ACTION_BACKUP,
@@ -81,18 +92,40 @@ class BackupServer:
             BKSERVER_REQ_CID: cid,
             BKSERVER_REQ_SHA256: sha256,
             BKSERVER_REQ_SIZE: size,
-            BKSERVER_REQ_PUBLIC_KEY: public_key
+            BKSERVER_REQ_PUBLIC_KEY: public_key,
+            BKSERVER_REQ_BASE_CID: base_cid
         }
         self.backup_manager.update_backup(g.usr_did, update)
+        server_progress.notify(g.usr_did)
         BackupServerExecutor(g.usr_did, self, self.backup_manager.get_backup(g.usr_did)).start()
 
-    def internal_backup_state(self):
-        backup = self.backup_manager.get_backup(g.usr_did)
+    def internal_backup_state(self, wait=0, last_result=None, last_message=None):
+        """ Get the state, or wait at most 'wait' seconds until it is different from the last one (long polling). """
+        deadline = time.time() + min(max(wait, 0), BackupServer.STATE_MAX_WAIT)
+        while True:
+            version = server_progress.get_version(g.usr_did)
+            backup = self.backup_manager.get_backup(g.usr_did)
+
+            # the latest progress may be not written yet.
+            result, message = server_progress.get_pending(g.usr_did) or (backup.get(BKSERVER_REQ_STATE), backup.get(BKSERVER_REQ_STATE_MSG))
+
+            remaining = deadline - time.time()
+            if remaining <= 0 or (result, message) != (last_result, last_message):
+                break
+
+            # the executor may be in another process, so check the database sometimes.
+            server_progress.wait(g.usr_did, version, min(remaining, BackupServer.STATE_CHECK_INTERVAL))
+
         return {
             'state': backup.get(BKSERVER_REQ_ACTION),  # None or backup
-            'result': backup.get(BKSERVER_REQ_STATE),
-            'message': backup.get(BKSERVER_REQ_STATE_MSG),
-            'public_key': Encryption.get_service_did_public_key(True)
+            'result': result,
+            'message': message,
+            'public_key': Encryption.get_service_did_public_key(True),
+            'compressions': Compression.get_supported(),
+            'encryptions': Encryption.get_supported(),
+            # the client only does the incremental backup based on the same successful backup.
+            'base_cid': backup.get(BKSERVER_REQ_CID) if backup.get(BKSERVER_REQ_STATE) == BACKUP_REQUEST_STATE_SUCCESS else None,
+            'long_poll': True
         }
 
     def internal_restore(self, public_key):
@@ -117,15 +150,13 @@ class BackupServer:
 
         # decrypt and encrypt the metadata.
         try:
-            tmp_file = LocalFile.generate_tmp_file_path()
-            self.ipfs_client.download_file(backup.get(BKSERVER_REQ_CID), tmp_file)
-
-            plain_path = Encryption.decrypt_file_with_curve25519(tmp_file, backup.get(BKSERVER_REQ_PUBLIC_KEY), True)
-            cipher_path = Encryption.encrypt_file_with_curve25519(plain_path, public_key, True)
-            self.ipfs_client.upload_file(cipher_path)
-            cipher_path.unlink()
-            plain_path.unlink()
-            tmp_file.unlink()
+            with temp_files.scope() as scope:
+                tmp_file = scope.new_path()
+                self.ipfs_client.download_file(backup.get(BKSERVER_REQ_CID), tmp_file)
+
+                plain_path = scope.track(Encryption.decrypt_file_with_curve25519(tmp_file, backup.get(BKSERVER_REQ_PUBLIC_KEY), True))
+                cipher_path = scope.track(Encryption.encrypt_file_with_curve25519(plain_path, public_key, True))
+                self.ipfs_client.upload_file(cipher_path)
         except Exception as e:
             raise BadRequestException(f'Failed to prepare restore metadata on the backup node: {e}')
 
@@ -140,6 +171,10 @@ class BackupServer:
     # the flowing is for the executors.
 
     def update_request_state(self, user_did, state, msg=None):
+        """ The progress is written at most once per second. """
+        server_progress.update(user_did, state, msg, self.__write_request_state)
+
+    def __write_request_state(self, user_did, state, msg):
         self.backup_manager.update_backup(user_did, {BKSERVER_REQ_STATE: state, BKSERVER_REQ_STATE_MSG: msg})
 
     def get_server_request_metadata(self, user_did, req, is_promotion=False, vault_max_size=0):
@@ -167,16 +202,12 @@ class BackupServer:
     def __get_verified_request_metadata(self, user_did, req):
         cid, sha256, size, public_key = req.get(BKSERVER_REQ_CID), req.get(BKSERVER_REQ_SHA256), req.get(BKSERVER_REQ_SIZE), req.get(BKSERVER_REQ_PUBLIC_KEY)
 
-        tmp_file = LocalFile.generate_tmp_file_path()
-        self.ipfs_client.download_file(cid, tmp_file, is_proxy=True, sha256=sha256, size=size)
-
-        plain_path = Encryption.decrypt_file_with_curve25519(tmp_file, public_key, True)
-        tmp_file.unlink()
+        with temp_files.scope() as scope:
+            tmp_file = scope.new_path()
+            self.ipfs_client.download_file(cid, tmp_file, is_proxy=True, sha256=sha256, size=size)
 
-        with open(plain_path, 'r') as f:
-            metadata = json.load(f)
-        plain_path.unlink()
-        return metadata
+            plain_path = scope.track(Encryption.decrypt_file_with_curve25519(tmp_file, public_key, True))
+            return json.loads(Compression.decompress_bytes(plain_path.read_bytes()))
 
     # ipfs-subscription
 
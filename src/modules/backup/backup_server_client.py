@@ -29,10 +29,19 @@ class BackupServerClient:
         return self.token
 
     def get_state(self):
+        body = self.get_state_body()
+        # action (None or 'backup'), state, message, public key for curve25519
+        return body['state'], body['result'], body['message'], body['public_key']
+
+    def get_state_body(self, wait=0, last_result=None, last_message=None) -> dict:
+        """ Get the whole response body of the state, which contains the extra information of the backup server.
+
+        :param wait: The backup server which supports the long polling ('long_poll' in the body) waits at most
+                     these seconds until the state is different from the last one.
+        """
+        args = {'wait': wait, 'result': last_result, 'message': last_message} if wait > 0 else None
         try:
-            body = self.http.get(self.target_host + URL_V2 + URL_SERVER_INTERNAL_STATE, self.get_token())
-            # action (None or 'backup'), state, message, public key for curve25519
-            return body['state'], body['result'], body['message'], body['public_key']
+            return self.http.get(self.target_host + URL_V2 + URL_SERVER_INTERNAL_STATE, self.get_token(), params=args)
         except Exception as e:
             # backup service not exists
             raise BadRequestException(f'Failed to get the status from the backup server: {str(e)}, {traceback.format_exc()}, {traceback.format_stack()}')
@@ -48,3 +57,8 @@ class BackupServerClient:
     def get_state_by_user_did(user_did):
         req = BackupServerClient.__get_request_doc(user_did)
         return BackupServerClient(req[BACKUP_REQUEST_TARGET_HOST], token=req[BACKUP_REQUEST_TARGET_TOKEN]).get_state()
+
+    @staticmethod
+    def get_state_body_by_user_did(user_did):
+        req = BackupServerClient.__get_request_doc(user_did)
+        return BackupServerClient(req[BACKUP_REQUEST_TARGET_HOST], token=req[BACKUP_REQUEST_TARGET_TOKEN]).get_state_body()
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+"""
+The compression of the backup data (database dump files and the request metadata) before the encryption.
+"""
+import logging
+import time
+import typing as t
+import zlib
+
+
+class Compression:
+    """ Compress the data with the selected codec, the decompression detects the codec by the magic of the data.
+
+    'zstd' needs the package 'zstandard', 'gzip' is always supported.
+    """
+
+    NONE = 'none'
+    GZIP = 'gzip'
+    ZSTD = 'zstd'
+
+    GZIP_MAGIC = b'\x1f\x8b'
+    ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+    MAGIC_LEN = 4
+
+    def __init__(self, codec: str = NONE):
+        if codec not in Compression.get_supported() + [Compression.NONE]:
+            raise ValueError(f'Unsupported compression codec: {codec}')
+        self.codec = codec
+
+    @staticmethod
+    def get_supported() -> list:
+        """ Get the codecs supported by this node. """
+        try:
+            import zstandard
+            return [Compression.ZSTD, Compression.GZIP]
+        except ImportError:
+            return [Compression.GZIP]
+
+    @staticmethod
+    def negotiate(codec: str, other_side_codecs: list) -> 'Compression':
+        """ Select the codec supported by both sides, or no compression.
+
+        :param codec: The codec preferred by this node.
+        :param other_side_codecs: The codecs supported by the other node.
+        """
+        supported = [c for c in Compression.get_supported() if c in other_side_codecs]
+        if codec == Compression.NONE or not supported:
+            return Compression(Compression.NONE)
+        if codec not in supported:
+            logging.info(f'[Compression] The codec {codec} is not supported by both sides, use {supported[0]}.')
+            return Compression(supported[0])
+        return Compression(codec)
+
+    def compressobj(self):
+        if self.codec == Compression.ZSTD:
+            import zstandard
+            return zstandard.ZstdCompressor(level=3).compressobj()
+        return zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress_reader(self, src: t.BinaryIO) -> t.BinaryIO:
+        """ The readable stream of the compressed data of src. """
+        return src if self.codec == Compression.NONE else CompressingReader(src, self.compressobj())
+
+    def compress_bytes(self, data: bytes) -> bytes:
+        if self.codec == Compression.NONE:
+            return data
+        obj = self.compressobj()
+        return obj.compress(data) + obj.flush()
+
+    @staticmethod
+    def detect(head: bytes) -> str:
+        """ Detect the codec by the beginning of the data. """
+        if head.startswith(Compression.ZSTD_MAGIC):
+            return Compression.ZSTD
+        elif head.startswith(Compression.GZIP_MAGIC):
+            return Compression.GZIP
+        return Compression.NONE
+
+    @staticmethod
+    def decompressobj(codec: str):
+        if codec == Compression.ZSTD:
+            import zstandard
+            return zstandard.ZstdDecompressor().decompressobj()
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    @staticmethod
+    def decompress_writer(dst: t.BinaryIO) -> 'DecompressingWriter':
+        """ The writable stream which writes the decompressed data to dst, MUST call flush() after writing all. """
+        return DecompressingWriter(dst)
+
+    @staticmethod
+    def decompress_bytes(data: bytes) -> bytes:
+        codec = Compression.detect(data[:Compression.MAGIC_LEN])
+        if codec == Compression.NONE:
+            return data
+        obj = Compression.decompressobj(codec)
+        return obj.decompress(data) + obj.flush()
+
+
+class CompressingReader:
+    """ Read the data from the source stream and return the compressed data. """
+
+    def __init__(self, src: t.BinaryIO, compressobj, chunk_size=1024 * 1024):
+        self.src = src
+        self.obj = compressobj
+        self.chunk_size = chunk_size
+        self.buf = bytearray()
+        self.is_end = False
+
+        # statistics
+        self.raw_size = 0
+        self.compressed_size = 0
+        self.cost_time = 0.0
+
+    def read(self, size=None) -> bytes:
+        while not self.is_end and (size is None or size < 0 or len(self.buf) < size):
+            data = self.src.read(self.chunk_size)
+            start = time.time()
+            if data:
+                self.raw_size += len(data)
+                self.buf += self.obj.compress(data)
+            else:
+                self.buf += self.obj.flush()
+                self.is_end = True
+            self.cost_time += time.time() - start
+
+        if size is None or size < 0:
+            size = len(self.buf)
+        data = bytes(self.buf[:size])
+        del self.buf[:size]
+        self.compressed_size += len(data)
+        return data
+
+
+class DecompressingWriter:
+    """ Decompress the written data by the codec detected from the beginning and write to the destination stream.
+
+    The data without compression is written directly.
+    """
+
+    def __init__(self, dst: t.BinaryIO):
+        self.dst = dst
+        self.head = b''
+        self.obj = None
+        self.codec = None
+
+    def write(self, data: bytes):
+        if self.codec is None:
+            # wait enough data to detect the codec.
+            self.head += data
+            if len(self.head) < Compression.MAGIC_LEN:
+                return
+            data, self.head = self.head, b''
+            self.codec = Compression.detect(data)
+            if self.codec != Compression.NONE:
+                self.obj = Compression.decompressobj(self.codec)
+
+        self.dst.write(self.obj.decompress(data) if self.obj else data)
+
+    def flush(self):
+        if self.codec is None and self.head:
+            # too short to be compressed.
+            self.dst.write(self.head)
+        elif self.obj and self.codec == Compression.GZIP:
+            self.dst.write(self.obj.flush())
+        self.dst.flush()
@@ -1,6 +1,12 @@
+import collections
+import logging
+import struct
+import threading
+import typing as t
 from pathlib import Path
 
 import base58
+import nacl.bindings
 import nacl.secret
 import nacl.utils
 
@@ -13,12 +19,45 @@ from src.utils.http_exception import BadRequestException
 class Encryption:
     TRUNK_SIZE = 4096
 
-    def __init__(self, pk: str = None, nonce: str = None):
+    # the curve25519 ciphers of the service DID: (is_server, other side public key) -> cipher
+    MAX_CIPHERS = 16
+    __ciphers = collections.OrderedDict()
+    __public_keys = dict()  # is_server -> public key with base58 format
+    __cipher_lock = threading.Lock()
+
+    # The header of the stream format: magic, version, chunk size of the plain data.
+    STREAM_MAGIC = b'HIVESS'
+    STREAM_VERSION = 1
+    STREAM_HEADER = struct.Struct('>6sBI')
+
+    # the formats of the encrypted data, the old node can only decrypt the whole data by SecretBox.
+    SECRET_STREAM = 'secretstream'
+    SECRET_BOX = 'secretbox'
+
+    def __init__(self, pk: str = None, nonce: str = None, chunk_size: int = None, format_: str = None):
         self.private_key = base58.b58decode(bytes(pk, 'utf8')) \
             if pk is not None else nacl.utils.random(nacl.secret.SecretBox.KEY_SIZE)
         self.nonce = base58.b58decode(bytes(nonce, 'utf8')) \
             if nonce is not None else nacl.utils.random(nacl.secret.SecretBox.NONCE_SIZE)
         self.box = nacl.secret.SecretBox(self.private_key)
+        self.chunk_size = chunk_size if chunk_size else hive_setting.BACKUP_ENCRYPTION_CHUNK_SIZE
+        self.format = format_ if format_ else Encryption.SECRET_STREAM
+
+    @staticmethod
+    def get_supported() -> list:
+        """ Get the formats which this node can decrypt. """
+        return [Encryption.SECRET_STREAM, Encryption.SECRET_BOX]
+
+    @staticmethod
+    def negotiate(other_side_formats: list) -> str:
+        """ Select the stream format if the other node supports it, else the SecretBox one which all nodes can decrypt.
+
+        :param other_side_formats: The formats supported by the other node, empty for the old node.
+        """
+        if Encryption.SECRET_STREAM in other_side_formats:
+            return Encryption.SECRET_STREAM
+        logging.info(f'[Encryption] The other side does not support the format {Encryption.SECRET_STREAM}, use {Encryption.SECRET_BOX}.')
+        return Encryption.SECRET_BOX
 
     def get_private_key(self):
         """ return the private key with base58 format. """
@@ -26,55 +65,163 @@ class Encryption:
 
     def encrypt_file(self, src_full_path: Path) -> Path:
         dst_full_path = Path(src_full_path.as_posix() + '.encryption')
-        with open(src_full_path.as_posix(), 'rb') as f:
-            data = f.read()
-        cipher_msg = self.box.encrypt(data, self.nonce)
-        with open(dst_full_path.as_posix(), 'wb') as f:
-            f.write(cipher_msg.ciphertext)
+        with open(src_full_path.as_posix(), 'rb') as sf, open(dst_full_path.as_posix(), 'wb') as df:
+            self.encrypt_stream(sf, df)
         return dst_full_path
 
     def decrypt_file(self, src_full_path: Path):
         dst_full_path = Path(src_full_path.as_posix() + '.decryption')
-        with open(src_full_path.as_posix(), 'rb') as f:
-            data = f.read()
-        plain_data = self.box.decrypt(data, self.nonce)
-        with open(dst_full_path.as_posix(), 'wb') as f:
-            f.write(plain_data)
+        with open(src_full_path.as_posix(), 'rb') as sf, open(dst_full_path.as_posix(), 'wb') as df:
+            self.decrypt_stream(sf, df)
         return dst_full_path
 
+    def encrypt_stream(self, src: t.BinaryIO, dst: t.BinaryIO):
+        """ Encrypt the data from src to dst, see 'encrypt_chunks' for the format. """
+        for chunk in self.encrypt_chunks(src):
+            dst.write(chunk)
+
+    def encrypt_chunks(self, src: t.BinaryIO) -> t.Iterator[bytes]:
+        """ Encrypt the data chunk by chunk with the secretstream (xchacha20poly1305), the format is:
+
+            stream header | secretstream header | encrypted chunk | ... | encrypted final chunk
+
+        Every encrypted chunk is the plain chunk with fixed size (except the final one) and the extra authentication bytes.
+
+        The whole data is encrypted by SecretBox in memory for the SecretBox format.
+        """
+        if self.format == Encryption.SECRET_BOX:
+            yield self.box.encrypt(src.read(), self.nonce).ciphertext
+            return
+
+        state = nacl.bindings.crypto_secretstream_xchacha20poly1305_state()
+        header = nacl.bindings.crypto_secretstream_xchacha20poly1305_init_push(state, self.private_key)
+        yield self.STREAM_HEADER.pack(self.STREAM_MAGIC, self.STREAM_VERSION, self.chunk_size) + header
+
+        # read ahead one chunk to know which one is the final.
+        data = Encryption.__read_fully(src, self.chunk_size)
+        while True:
+            next_data = Encryption.__read_fully(src, self.chunk_size) if len(data) == self.chunk_size else b''
+            tag = nacl.bindings.crypto_secretstream_xchacha20poly1305_TAG_MESSAGE if next_data \
+                else nacl.bindings.crypto_secretstream_xchacha20poly1305_TAG_FINAL
+            yield nacl.bindings.crypto_secretstream_xchacha20poly1305_push(state, data, tag=tag)
+            if not next_data:
+                break
+            data = next_data
+
+    @staticmethod
+    def __read_fully(src: t.BinaryIO, size: int) -> bytes:
+        """ The pipe returns less data than the size before the end, so read until the size or the end. """
+        data = src.read(size)
+        if not data or len(data) == size:
+            return data
+
+        buf = bytearray(data)
+        while len(buf) < size:
+            data = src.read(size - len(buf))
+            if not data:
+                break
+            buf += data
+        return bytes(buf)
+
+    def decrypt_stream(self, src: t.BinaryIO, dst: t.BinaryIO):
+        """ Decrypt the data encrypted by 'encrypt_stream' or the old whole data by SecretBox. """
+        head = Encryption.__read_fully(src, self.STREAM_HEADER.size)
+        if len(head) < self.STREAM_HEADER.size or head[:len(self.STREAM_MAGIC)] != self.STREAM_MAGIC:
+            # the whole data encrypted by SecretBox before the stream format.
+            dst.write(self.box.decrypt(head + src.read(), self.nonce))
+            return
+
+        _, version, chunk_size = self.STREAM_HEADER.unpack(head)
+        if version != self.STREAM_VERSION:
+            raise BadRequestException(f'Unsupported encryption stream version {version}.')
+
+        state = nacl.bindings.crypto_secretstream_xchacha20poly1305_state()
+        header = Encryption.__read_fully(src, nacl.bindings.crypto_secretstream_xchacha20poly1305_HEADERBYTES)
+        nacl.bindings.crypto_secretstream_xchacha20poly1305_init_pull(state, header, self.private_key)
+
+        cipher_size = chunk_size + nacl.bindings.crypto_secretstream_xchacha20poly1305_ABYTES
+        while True:
+            data = Encryption.__read_fully(src, cipher_size)
+            if not data:
+                raise BadRequestException('The encryption stream is truncated.')
+
+            plain_data, tag = nacl.bindings.crypto_secretstream_xchacha20poly1305_pull(state, data)
+            dst.write(plain_data)
+            if tag == nacl.bindings.crypto_secretstream_xchacha20poly1305_TAG_FINAL:
+                break
+
     @staticmethod
     def __get_cipher(is_server: bool, other_side_public_key: str = None):
+        """ Deriving the cipher from the DID store through FFI is slow, so the ciphers are cached by
+        (is_server, other side public key). The least recently used one is dropped when the cache is full,
+        and it is released by FFI when the streams being used no longer reference it. """
+        key = (is_server, other_side_public_key)
+        with Encryption.__cipher_lock:
+            cipher = Encryption.__ciphers.get(key)
+            if cipher is not None:
+                Encryption.__ciphers.move_to_end(key)
+                return cipher
+
         auth_ = auth.Auth()
         doc = auth_.doc
         cipher = doc.create_curve25519_cipher(auth_.did_str, 3, hive_setting.PASSWORD, is_server)
         if other_side_public_key is not None:
             cipher.set_other_side_public_key(base58.b58decode(bytes(other_side_public_key, 'utf8')))
+
+        with Encryption.__cipher_lock:
+            cipher = Encryption.__ciphers.setdefault(key, cipher)
+            Encryption.__ciphers.move_to_end(key)
+            while len(Encryption.__ciphers) > Encryption.MAX_CIPHERS:
+                Encryption.__ciphers.popitem(last=False)
         return cipher
 
+    @staticmethod
+    def __create_encryption_stream(is_server: bool, other_side_public_key: str):
+        cipher = Encryption.__get_cipher(is_server, other_side_public_key)
+        with Encryption.__cipher_lock:
+            return cipher.create_encryption_stream()
+
+    @staticmethod
+    def __create_decryption_stream(is_server: bool, other_side_public_key: str, header: bytes):
+        cipher = Encryption.__get_cipher(is_server, other_side_public_key)
+        with Encryption.__cipher_lock:
+            return cipher.create_decryption_stream(header)
+
     @staticmethod
     def get_service_did_public_key(is_server: bool):
-        public_key = Encryption.__get_cipher(is_server).get_curve25519_public_key()
-        return base58.b58encode(public_key).decode('utf8')
+        public_key = Encryption.__public_keys.get(is_server)
+        if public_key is None:
+            public_key = base58.b58encode(Encryption.__get_cipher(is_server).get_curve25519_public_key()).decode('utf8')
+            Encryption.__public_keys[is_server] = public_key
+        return public_key
 
     @staticmethod
     def encrypt_file_with_curve25519(src_full_path: Path, other_side_public_key: str, is_server: bool) -> Path:
         dst_full_path = Path(src_full_path.as_posix() + '.encryption.curve25519')
-        stream = Encryption.__get_cipher(is_server, other_side_public_key).create_encryption_stream()
+        stream = Encryption.__create_encryption_stream(is_server, other_side_public_key)
         total_size = src_full_path.stat().st_size
         remain = total_size
 
-        with open(src_full_path, 'rb') as sf:
-            with open(dst_full_path, 'wb') as df:  # header + encrypted data
-                df.write(stream.header())
-                while remain > 0:
-                    data = sf.read(min(remain, Encryption.TRUNK_SIZE))
-                    if not data:
-                        break
+        # the chunks are read into the same buffer.
+        buf = bytearray(Encryption.TRUNK_SIZE)
+        view = memoryview(buf)
+        try:
+            with open(src_full_path, 'rb') as sf:
+                with open(dst_full_path, 'wb') as df:  # header + encrypted data
+                    df.write(stream.header())
+                    while remain > 0:
+                        size = sf.readinto(view[:min(remain, Encryption.TRUNK_SIZE)])
+                        if not size:
+                            break
 
-                    cipher_data = stream.push(data, remain - len(data) <= 0)
-                    df.write(cipher_data)
+                        cipher_data = stream.push(view[:size], remain - size <= 0)
+                        df.write(cipher_data)
 
-                    remain -= len(data)
+                        remain -= size
+        except Exception:
+            # the partial file is not returned to the caller to remove.
+            Encryption.__remove_partial_file(dst_full_path)
+            raise
 
         return dst_full_path
 
@@ -87,19 +234,33 @@ class Encryption:
         if remain <= CipherDecryptionStream.header_len():
             raise BadRequestException('Too short data for curve25519 decryption.')
 
-        with open(src_full_path, 'rb') as sf:
-            header = sf.read(CipherDecryptionStream.header_len())
-            stream = Encryption.__get_cipher(is_server, other_side_public_key).create_decryption_stream(header)
+        try:
+            with open(src_full_path, 'rb') as sf:
+                header = sf.read(CipherDecryptionStream.header_len())
+                stream = Encryption.__create_decryption_stream(is_server, other_side_public_key, header)
 
-            with open(dst_full_path, 'wb') as df:
-                while remain > 0:
-                    data = sf.read(min(remain, Encryption.TRUNK_SIZE + CipherDecryptionStream.extra_encryption_size()))
-                    if not data:
-                        break
+                chunk_size = Encryption.TRUNK_SIZE + CipherDecryptionStream.extra_encryption_size()
+                buf = bytearray(chunk_size)
+                view = memoryview(buf)
+                with open(dst_full_path, 'wb') as df:
+                    while remain > 0:
+                        size = sf.readinto(view[:min(remain, chunk_size)])
+                        if not size:
+                            break
 
-                    plain_data = stream.pull(data)
-                    df.write(plain_data)
+                        plain_data = stream.pull(view[:size])
+                        df.write(plain_data)
 
-                    remain -= len(data)
+                        remain -= size
+        except Exception:
+            Encryption.__remove_partial_file(dst_full_path)
+            raise
 
         return dst_full_path
+
+    @staticmethod
+    def __remove_partial_file(path: Path):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
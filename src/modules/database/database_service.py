@@ -3,16 +3,18 @@
 """
 The entrance for database module.
 """
-import json
-from bson import json_util
-
 from flask import g
 
+from src import hive_setting
+from src.utils.consts import COL_QUERY_CURSOR_SKIP, COL_QUERY_CURSOR_REMAINING, COL_QUERY_CURSOR_PAGE_SIZE, COL_QUERY_CURSOR_COLLECTION, \
+    COL_QUERY_CURSOR_FILTER, COL_QUERY_CURSOR_OPTIONS
 from src.utils.http_exception import InvalidParameterException, CollectionNotFoundException
 from src.utils.http_request import RequestData
+from src.utils.json_stream import JsonItems, JsonValue
 from src.modules.database.mongodb_client import MongodbClient
 from src.modules.subscription.vault import VaultManager
 from src.modules.database.collection_metadata import CollectionMetadata
+from src.modules.database.query_cursor import QueryCursor
 
 
 class DatabaseService:
@@ -22,6 +24,7 @@ class DatabaseService:
         self.mcli = MongodbClient()
         self.vault_manager = VaultManager()
         self.collection_metadata = CollectionMetadata()
+        self.query_cursor = QueryCursor()
 
     def create_collection(self, collection_name, is_encrypt, encrypt_method):
         """ Create collection by name
@@ -179,12 +182,84 @@ class DatabaseService:
 
         return self.mcli.get_user_collection(g.usr_did, g.app_did, collection_name)
 
+    @staticmethod
+    def __get_page_size(page_size):
+        """ The page size is DATABASE_PAGE_SIZE by default and no more than DATABASE_MAX_PAGE_SIZE. """
+        max_size = max(hive_setting.DATABASE_MAX_PAGE_SIZE, 1)
+        return min(page_size if page_size and page_size > 0 else hive_setting.DATABASE_PAGE_SIZE, max_size)
+
     def __do_internal_find(self, collection_name, filter_, options):
+        """ Find the first page, the cursor ID is returned if there are more pages. """
+        options = dict(options)
+        request_data = RequestData(options, optional=True)
+        for key in ('skip', 'limit', 'page_size'):
+            request_data.validate_opt(key, int)
+
+        skip, limit = options.pop('skip', None) or 0, options.pop('limit', None)
+        if skip < 0:
+            raise InvalidParameterException('Invalid parameter: The value of the key "skip" MUST not be negative.')
+        page_size = self.__get_page_size(options.pop('page_size', None))
+
+        # no limit if the limit is 0 (same as MongoDB) or not specified.
+        remaining = limit if limit and limit > 0 else None
+        return self.__find_page(collection_name, filter_, options, skip, remaining, page_size)
+
+    def query_more(self, cursor_id):
+        """ Get the next page of the find or query by the cursor.
+
+        :param cursor_id: The cursor ID returned by the previous page.
+        :return: The documents of the next page.
+        """
+
+        self.vault_manager.get_vault(g.usr_did)
+
+        while True:
+            cursor = self.query_cursor.get(g.usr_did, g.app_did, cursor_id)
+            skip, remaining, page_size = cursor[COL_QUERY_CURSOR_SKIP], cursor[COL_QUERY_CURSOR_REMAINING], cursor[COL_QUERY_CURSOR_PAGE_SIZE]
+            count = page_size if remaining is None else min(page_size, remaining)
+
+            # take the page before querying, the concurrent requests of the same cursor get the different pages.
+            if self.query_cursor.move(cursor, skip + count, None if remaining is None else remaining - count):
+                break
+
+        return self.__find_page(cursor[COL_QUERY_CURSOR_COLLECTION], cursor[COL_QUERY_CURSOR_FILTER],
+                                cursor[COL_QUERY_CURSOR_OPTIONS], skip, remaining, page_size, cursor_id=cursor_id)
+
+    def close_query(self, cursor_id):
+        """ Remove the cursor if the next pages are not needed any more.
+
+        :param cursor_id: The cursor ID returned by the previous page.
+        """
+
+        self.vault_manager.get_vault(g.usr_did)
+
+        self.query_cursor.delete(g.usr_did, g.app_did, cursor_id)
+
+    def __find_page(self, collection_name, filter_, options, skip, remaining, page_size, cursor_id=None):
         col = self.__get_collection(collection_name)
-        docs = col.find_many(filter_, **options)
         metadata = self.collection_metadata.get(g.usr_did, g.app_did, collection_name)
-        return {
-            'items': [c for c in json.loads(json_util.dumps(docs))],
+
+        # one more document to check whether there is the next page.
+        count = page_size if remaining is None else min(page_size, remaining)
+        items = JsonItems(col.find_cursor(filter_, **options, skip=skip, limit=count + 1), limit=count).prefetch()
+        remaining = None if remaining is None else remaining - count
+        user_did, app_did = g.usr_did, g.app_did
+
+        def get_cursor_id():
+            """ Called after the documents of the page are sent. """
+            if items.has_more and (remaining is None or remaining > 0):
+                if cursor_id:
+                    return cursor_id
+                return self.query_cursor.create(user_did, app_did, collection_name, filter_, options, skip + count, remaining, page_size)
+            elif cursor_id:
+                self.query_cursor.delete(user_did, app_did, cursor_id)
+            return None
+
+        # the documents are encoded while sending the response if streaming.
+        result = {
+            'items': items,
             'is_encrypt': metadata['is_encrypt'] if metadata else False,
             'encrypt_method': metadata['encrypt_method'] if metadata else '',
+            'cursor_id': JsonValue(get_cursor_id),
         }
+        return result if hive_setting.DATABASE_STREAM_RESPONSE else JsonItems.to_list(result)
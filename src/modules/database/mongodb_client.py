@@ -1,15 +1,18 @@
 import hashlib
 import logging
+import threading
 import typing
 from datetime import datetime
 
 from bson import ObjectId
 from pymongo import MongoClient
+from pymongo.cursor import Cursor
 from pymongo.errors import CollectionInvalid
 
 from src.utils.consts import DID_INFO_DB_NAME, COL_IPFS_FILES, SCRIPTING_SCRIPT_COLLECTION, SCRIPTING_SCRIPT_TEMP_TX_COLLECTION, COL_COLLECTION_METADATA, \
     COL_ANONYMOUS_FILES
 from src.utils.http_exception import CollectionNotFoundException, AlreadyExistsException, BadRequestException
+from src.utils.prefork import prefork
 from src import hive_setting
 
 _T = typing.TypeVar('_T', dict, list, tuple)
@@ -116,6 +119,20 @@ class MongodbCollection:
         """ Note: the result documents contain ObjectId or other types
                 which can not directly take as response body. """
 
+        if only_one:
+            result = self.col.find_one(self.convert_oid(filter_) if filter_ else None, **self.__with_max_time(kwargs, 'max_time_ms'))
+            return [] if result is None else [result]
+
+        # the user queries are paged by the database service, see find_cursor() for the large results.
+        return list(self.find_cursor(filter_, **kwargs))
+
+    def find_cursor(self, filter_: dict, **kwargs) -> Cursor:
+        """ Find the documents by the cursor which gets them from the server batch by batch,
+        the batch size is 'batch_size' of the options or the setting 'DATABASE_FIND_BATCH_SIZE'.
+
+        Note: the documents contain ObjectId or other types which can not directly take as response body.
+        """
+
         # kwargs are the options
         options = {k: v for k, v in kwargs.items() if k in ("projection",
                                                             "skip",
@@ -124,7 +141,8 @@ class MongodbCollection:
                                                             "allow_partial_results",
                                                             "return_key",
                                                             "show_record_id",
-                                                            "batch_size")}
+                                                            "batch_size",
+                                                            "max_time_ms")}
 
         # extra sort support
         if 'sort' in options:
@@ -132,17 +150,47 @@ class MongodbCollection:
                 # value example: {'author', -1} => [('author', -1)]
                 options['sort'] = [(k, v) for k, v in options['sort'].items()]
 
-        # BUGBUG: Getting all documents out maybe not well.
-        if only_one:
-            result = self.col.find_one(self.convert_oid(filter_) if filter_ else None, **kwargs)
-            return [] if result is None else [result]
+        if not options.get('batch_size'):
+            options['batch_size'] = hive_setting.DATABASE_FIND_BATCH_SIZE
 
-        return list(self.col.find(self.convert_oid(filter_) if filter_ else None, **options))
+        return self.col.find(self.convert_oid(filter_) if filter_ else None, **self.__with_max_time(options, 'max_time_ms'))
 
     def count(self, filter_, **kwargs):
         options = {k: v for k, v in kwargs.items() if k in ("skip", "limit", "maxTimeMS")}
 
-        return self.col.count_documents(self.convert_oid(filter_) if filter_ else {}, **options)
+        return self.col.count_documents(self.convert_oid(filter_) if filter_ else {}, **self.__with_max_time(options, 'maxTimeMS'))
+
+    def __with_max_time(self, options: dict, key: str) -> dict:
+        """ The queries on the user collections are aborted by MongoDB after DATABASE_QUERY_MAX_TIME_MS. """
+        if not self.is_management and not options.get(key) and hive_setting.DATABASE_QUERY_MAX_TIME_MS > 0:
+            return {**options, key: hive_setting.DATABASE_QUERY_MAX_TIME_MS}
+        return options
+
+    def find_one_and_update(self, filter_, update, **kwargs):
+        """ Update one document atomically and return it (before the update by default). """
+        options = {k: v for k, v in kwargs.items() if k in ("projection", "sort", "upsert", "return_document")}
+        return self.col.find_one_and_update(self.convert_oid(filter_), self.convert_oid(update), **options)
+
+    def aggregate(self, pipeline: list) -> list:
+        return list(self.col.aggregate(pipeline))
+
+    def bulk_write(self, requests: list, ordered=True):
+        """ The requests are the operations of pymongo (InsertOne, UpdateOne, DeleteOne, etc.) which are sent together. """
+        if not requests:
+            return {"acknowledged": True, "inserted_count": 0, "matched_count": 0, "modified_count": 0, "deleted_count": 0, "upserted_count": 0}
+
+        result = self.col.bulk_write(requests, ordered=ordered)
+        return {
+            "acknowledged": result.acknowledged,
+            "inserted_count": result.inserted_count,
+            "matched_count": result.matched_count,
+            "modified_count": result.modified_count,
+            "deleted_count": result.deleted_count,
+            "upserted_count": result.upserted_count
+        }
+
+    def create_index(self, keys, **kwargs):
+        return self.col.create_index(keys, **kwargs)
 
     def delete_one(self, filter_):
         return self.delete_many(filter_, only_one=True)
@@ -199,15 +247,29 @@ class MongodbClient:
                                  COL_COLLECTION_METADATA,
                                  COL_ANONYMOUS_FILES]
 
+    # the connection pool is shared by all instances of the process, it can not be used after fork.
+    __connections = dict()  # mongodb_uri -> MongoClient
+    __lock = threading.Lock()
+
     def __init__(self):
         self.mongodb_uri = hive_setting.MONGODB_URL
         self.connection = None
 
     def __get_connection(self):
         if not self.connection:
-            self.connection = MongoClient(self.mongodb_uri)
+            with MongodbClient.__lock:
+                if self.mongodb_uri not in MongodbClient.__connections:
+                    MongodbClient.__connections[self.mongodb_uri] = MongoClient(self.mongodb_uri)
+                self.connection = MongodbClient.__connections[self.mongodb_uri]
         return self.connection
 
+    @staticmethod
+    def reset_connections():
+        """ Forget the connections created before fork, the sockets are still used by the parent process,
+        so they are not closed here. """
+        MongodbClient.__lock = threading.Lock()
+        MongodbClient.__connections = dict()
+
     def __get_database(self, name):
         """ All databases (manager or user) must exist before call this method.
 
@@ -222,6 +284,10 @@ class MongodbClient:
     def __exists_database(self, name):
         return name in self.__get_connection().list_database_names()
 
+    def get_database_names(self) -> set:
+        """ Get all database names, for the batch checking of the database existence. """
+        return set(self.__get_connection().list_database_names())
+
     def exists_user_database(self, user_did, app_did):
         """ Check if user application database exists. """
         return self.__exists_database(MongodbClient.get_user_database_name(user_did, app_did))
@@ -317,13 +383,31 @@ class MongodbClient:
         if self.__exists_database(name):
             self.__get_connection().drop_database(name)
 
-    def get_user_database_size(self, user_did, app_did) -> int:
-        """ Get the size of the user database, if not exist, return 0 """
+    def get_user_database_size(self, user_did, app_did, database_names: set = None) -> int:
+        """ Get the size of the user database, if not exist, return 0
+
+        :param database_names: All database names from get_database_names() to check the existence.
+        """
         name = self.get_user_database_name(user_did, app_did)
-        if not self.__exists_database(name):
+        if not (name in database_names if database_names is not None else self.__exists_database(name)):
             return 0
 
         database = self.__get_database(name)
 
         # count size by command: https://www.mongodb.com/docs/v4.4/reference/command/dbStats/
         return int(database.command('dbstats')['totalSize'])
+
+    def get_database_hash(self, name) -> typing.Optional[str]:
+        """ Get the md5 of the database content, None if the database not exist or the command not supported. """
+        if not self.__exists_database(name):
+            return None
+
+        try:
+            # https://www.mongodb.com/docs/v4.4/reference/command/dbHash/
+            return self.__get_database(name).command('dbHash')['md5']
+        except Exception as e:
+            logging.info(f'Failed to get the hash of the database {name}: {e}')
+            return None
+
+
+prefork.register_after_fork(MongodbClient.reset_connections)
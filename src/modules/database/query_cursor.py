@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+from bson import ObjectId, json_util
+from bson.errors import InvalidId
+
+from src import hive_setting
+from src.modules.database.mongodb_client import MongodbClient
+from src.utils.consts import COL_QUERY_CURSOR, COL_QUERY_CURSOR_USR_DID, COL_QUERY_CURSOR_APP_DID, COL_QUERY_CURSOR_COLLECTION, \
+    COL_QUERY_CURSOR_FILTER, COL_QUERY_CURSOR_OPTIONS, COL_QUERY_CURSOR_SKIP, COL_QUERY_CURSOR_REMAINING, COL_QUERY_CURSOR_PAGE_SIZE, \
+    COL_QUERY_CURSOR_EXPIRE_AT
+from src.utils.http_exception import CursorNotFoundException
+
+
+class QueryCursor:
+    """ The query cursor keeps the position of the paged find or query to get the next page.
+
+    The cursor is saved in the management database, so any process of the node can continue it. The next page
+    is got by skipping the returned documents, so the documents inserted or deleted between the pages may shift
+    the later pages. The cursor is removed by the TTL index after DATABASE_CURSOR_TTL seconds without access.
+    """
+
+    __index_created = False
+
+    def __init__(self):
+        self.mcli = MongodbClient()
+
+    def __get_collection(self):
+        col = self.mcli.get_management_collection(COL_QUERY_CURSOR)
+        if not QueryCursor.__index_created:
+            col.create_index(COL_QUERY_CURSOR_EXPIRE_AT, expireAfterSeconds=0)
+            QueryCursor.__index_created = True
+        return col
+
+    @staticmethod
+    def __get_expire_at():
+        return datetime.utcnow() + timedelta(seconds=hive_setting.DATABASE_CURSOR_TTL)
+
+    def create(self, user_did, app_did, collection_name, filter_, options: dict, skip, remaining, page_size) -> str:
+        """ Create the cursor after the first page.
+
+        :param options: The options of the query except 'skip' and 'limit'.
+        :param skip: The position of the next page.
+        :param remaining: The count of the documents which can be returned later, None means no limit.
+        :param page_size: The size of every page.
+        :return: the cursor ID.
+        """
+        doc = {
+            COL_QUERY_CURSOR_USR_DID: user_did,
+            COL_QUERY_CURSOR_APP_DID: app_did,
+            COL_QUERY_CURSOR_COLLECTION: collection_name,
+            # the filter and the options may contain the keys with '$' which can not be saved directly.
+            COL_QUERY_CURSOR_FILTER: json_util.dumps(filter_),
+            COL_QUERY_CURSOR_OPTIONS: json_util.dumps(options),
+            COL_QUERY_CURSOR_SKIP: skip,
+            COL_QUERY_CURSOR_REMAINING: remaining,
+            COL_QUERY_CURSOR_PAGE_SIZE: page_size,
+            COL_QUERY_CURSOR_EXPIRE_AT: self.__get_expire_at(),
+        }
+        return self.__get_collection().insert_one(doc)['inserted_id']
+
+    def get(self, user_did, app_did, cursor_id) -> dict:
+        """ Get the cursor with the loaded filter and options.
+
+        :raise: CursorNotFoundException
+        """
+        try:
+            filter_ = {'_id': ObjectId(cursor_id), COL_QUERY_CURSOR_USR_DID: user_did, COL_QUERY_CURSOR_APP_DID: app_did}
+        except (InvalidId, TypeError):
+            raise CursorNotFoundException()
+
+        doc = self.__get_collection().find_one(filter_)
+        # the TTL index does not remove the expired cursors immediately.
+        if not doc or doc[COL_QUERY_CURSOR_EXPIRE_AT] < datetime.utcnow():
+            raise CursorNotFoundException()
+
+        doc[COL_QUERY_CURSOR_FILTER] = json_util.loads(doc[COL_QUERY_CURSOR_FILTER])
+        doc[COL_QUERY_CURSOR_OPTIONS] = json_util.loads(doc[COL_QUERY_CURSOR_OPTIONS])
+        return doc
+
+    def move(self, doc: dict, skip, remaining) -> bool:
+        """ Move the cursor to the next page and renew the expiration.
+
+        :return: False if the cursor has been moved by the concurrent request.
+        """
+        filter_ = {'_id': doc['_id'], COL_QUERY_CURSOR_SKIP: doc[COL_QUERY_CURSOR_SKIP]}
+        update = {'$set': {COL_QUERY_CURSOR_SKIP: skip,
+                           COL_QUERY_CURSOR_REMAINING: remaining,
+                           COL_QUERY_CURSOR_EXPIRE_AT: self.__get_expire_at()}}
+        return self.__get_collection().update_one(filter_, update, contains_extra=False)['modified_count'] > 0
+
+    def delete(self, user_did, app_did, cursor_id):
+        try:
+            filter_ = {'_id': ObjectId(cursor_id), COL_QUERY_CURSOR_USR_DID: user_did, COL_QUERY_CURSOR_APP_DID: app_did}
+        except (InvalidId, TypeError):
+            raise CursorNotFoundException()
+
+        if self.__get_collection().delete_one(filter_)['deleted_count'] <= 0:
+            raise CursorNotFoundException()
@@ -1,3 +1,5 @@
+import re
+
 from src.modules.database.mongodb_client import MongodbClient
 from src.utils.consts import COL_ANONYMOUS_FILES_USR_DID, COL_ANONYMOUS_FILES_APP_DID, COL_ANONYMOUS_FILES_NAME, COL_ANONYMOUS_FILES_CID, COL_ANONYMOUS_FILES
 
@@ -25,3 +27,20 @@ class AnonymousFiles:
             COL_ANONYMOUS_FILES_APP_DID: app_did,
             COL_ANONYMOUS_FILES_NAME: name}
         self.mcli.get_user_collection(user_did, app_did, COL_ANONYMOUS_FILES).delete_one(filter_)
+
+    def delete_many(self, user_did, app_did, names: list):
+        if not names:
+            return
+
+        filter_ = {
+            COL_ANONYMOUS_FILES_USR_DID: user_did,
+            COL_ANONYMOUS_FILES_APP_DID: app_did,
+            COL_ANONYMOUS_FILES_NAME: {'$in': names}}
+        self.mcli.get_user_collection(user_did, app_did, COL_ANONYMOUS_FILES).delete_many(filter_)
+
+    def delete_folder(self, user_did, app_did, folder_dir: str):
+        filter_ = {
+            COL_ANONYMOUS_FILES_USR_DID: user_did,
+            COL_ANONYMOUS_FILES_APP_DID: app_did,
+            COL_ANONYMOUS_FILES_NAME: {'$regex': f'^{re.escape(folder_dir.rstrip("/"))}/'}}
+        self.mcli.get_user_collection(user_did, app_did, COL_ANONYMOUS_FILES).delete_many(filter_)
@@ -1,8 +1,13 @@
 import logging
+import re
+import time
+import typing as t
+import uuid
 
 from src.utils.consts import USR_DID, APP_DID, COL_IPFS_FILES_PATH, COL_IPFS_FILES, COL_IPFS_FILES_SHA256, COL_IPFS_FILES_IS_FILE, SIZE, \
-    COL_IPFS_FILES_IPFS_CID, COL_IPFS_FILES_IS_ENCRYPT, COL_IPFS_FILES_ENCRYPT_METHOD
-from src.utils.http_exception import FileNotFoundException
+    COL_IPFS_FILES_IPFS_CID, COL_IPFS_FILES_IS_ENCRYPT, COL_IPFS_FILES_ENCRYPT_METHOD, \
+    COL_IPFS_FILES_DELETING
+from src.utils.http_exception import FileNotFoundException, AlreadyExistsException
 from src.utils.customize_dict import Dotdict
 from src.modules.auth.user import UserManager
 from src.modules.files.ipfs_cid_ref import IpfsCidRef
@@ -28,13 +33,8 @@ class FileMetadataManager:
         raise FileNotFoundException if no files under sub-folder which means sub-folder does not exist.
         """
 
-        filter_ = {USR_DID: user_did, APP_DID: app_did}
-        if folder_dir:
-            # if specify the path, it will find the files start with folder name
-            folder_path = folder_dir if folder_dir[len(folder_dir) - 1] == '/' else f'{folder_dir}/'
-            filter_[COL_IPFS_FILES_PATH] = {
-                '$regex': f'^{folder_path}'
-            }
+        # if specify the path, it will find the files start with folder name
+        filter_ = self.__get_folder_filter(user_did, app_did, folder_dir) if folder_dir else {USR_DID: user_did, APP_DID: app_did}
 
         docs = self.__get_col(user_did, app_did).find_many(filter_)
         if not docs and folder_dir:
@@ -43,6 +43,11 @@ class FileMetadataManager:
 
         return list(map(lambda d: FileMetadata(**d), docs))
 
+    @staticmethod
+    def __get_folder_filter(user_did, app_did, folder_dir: str):
+        """ The filter of all files under the folder (includes the sub-folders). """
+        return {USR_DID: user_did, APP_DID: app_did, COL_IPFS_FILES_PATH: {'$regex': f'^{re.escape(folder_dir.rstrip("/"))}/'}}
+
     def get_metadata(self, user_did, app_did, rel_path):
         filter_ = {USR_DID: user_did, APP_DID: app_did, COL_IPFS_FILES_PATH: rel_path}
         doc = self.__get_col(user_did, app_did).find_one(filter_)
@@ -51,6 +56,16 @@ class FileMetadataManager:
 
         return FileMetadata(**doc)
 
+    def get_metadatas_by_paths(self, user_did, app_did, paths: list) -> dict:
+        """ Get the metadata of the files by one query: path -> metadata, the path not found is not in the result. """
+        filter_ = {USR_DID: user_did, APP_DID: app_did, COL_IPFS_FILES_PATH: {'$in': list(set(paths))}}
+        docs = self.__get_col(user_did, app_did).find_many(filter_)
+        return {d[COL_IPFS_FILES_PATH]: FileMetadata(**d) for d in docs}
+
+    def bulk_write(self, user_did, app_did, requests: list):
+        """ Write the changes of the metadata together, the requests are pymongo operations (UpdateOne, DeleteOne, etc.) """
+        return self.__get_col(user_did, app_did).bulk_write(requests)
+
     def add_metadata(self, user_did, app_did, rel_path: str, sha256: str, size: int, cid: str, is_encrypt: bool, encrypt_method: str):
         """ add or update the file metadata """
         filter_ = {USR_DID: user_did, APP_DID: app_did, COL_IPFS_FILES_PATH: rel_path}
@@ -71,6 +86,68 @@ class FileMetadataManager:
         update = {'$set': {COL_IPFS_FILES_PATH: dst_path}}
         self.__get_col(user_did, app_did).update_one(filter_, update)
 
+    def move_folder_metadatas(self, user_did, app_did, src_dir: str, dst_dir: str) -> int:
+        """ Move all files under the folder 'src_dir' to the folder 'dst_dir' by one updating on the server side,
+        the paths are rewritten by the aggregation pipeline, return the count of the moved files.
+
+        Only the files which have the same names under 'dst_dir' are treated as the conflicts, so the moving
+        which is interrupted can be resumed by running again: the moved files are no longer under 'src_dir'.
+        """
+        src_dir, dst_dir, col = src_dir.rstrip('/'), dst_dir.rstrip('/'), self.__get_col(user_did, app_did)
+
+        filter_ = self.__get_folder_filter(user_did, app_did, src_dir)
+        src_paths = [d[COL_IPFS_FILES_PATH] for d in col.find_many(filter_, projection={COL_IPFS_FILES_PATH: True})]
+        if not src_paths:
+            raise FileNotFoundException(f'The directory {src_dir} does not exist.')
+
+        dst_paths = [f'{dst_dir}/{p[len(src_dir) + 1:]}' for p in src_paths]
+        conflict = col.find_one({USR_DID: user_did, APP_DID: app_did, COL_IPFS_FILES_PATH: {'$in': dst_paths}})
+        if conflict:
+            raise AlreadyExistsException(f'The destination file {conflict[COL_IPFS_FILES_PATH]} already exists, impossible to move.')
+
+        path_field = f'${COL_IPFS_FILES_PATH}'
+        update = [{'$set': {
+            COL_IPFS_FILES_PATH: {'$concat': [f'{dst_dir}/', {'$substrCP': [path_field, len(src_dir) + 1, {'$strLenCP': path_field}]}]},
+            'modified': int(time.time())
+        }}]
+        return col.update_many(filter_, update, contains_extra=False)['matched_count']
+
+    def get_folder_deleting(self, user_did, app_did, folder_dir: str) -> t.Optional[str]:
+        """ Get the id of the interrupted deletion which marked the files under the folder, see mark_folder_deleting(). """
+        filter_ = {**self.__get_folder_filter(user_did, app_did, folder_dir), COL_IPFS_FILES_DELETING: {'$exists': True}}
+        marked = self.__get_col(user_did, app_did).find_one(filter_, projection={COL_IPFS_FILES_DELETING: True})
+        return marked[COL_IPFS_FILES_DELETING] if marked else None
+
+    def mark_folder_deleting(self, user_did, app_did, folder_dir: str) -> t.Optional[str]:
+        """ Mark the files under the folder with the id of a new deletion and return it, None if no file to mark.
+        The steps of the deletion:
+
+        1. mark the files by mark_folder_deleting();
+        2. decrease the references of the cids and the storage usage with the id by count_deleting_metadatas();
+        3. delete the marked files by delete_deleting_metadatas().
+
+        If the deletion is interrupted, the next one finishes the files marked with the id found by get_folder_deleting(),
+        the references and the usage which are changed with the same id are not changed again.
+        The files added after the interruption are only marked by the new deletion.
+        """
+        op_id = uuid.uuid4().hex
+        filter_ = {**self.__get_folder_filter(user_did, app_did, folder_dir), COL_IPFS_FILES_DELETING: {'$exists': False}}
+        if self.__get_col(user_did, app_did).update_many(filter_, {'$set': {COL_IPFS_FILES_DELETING: op_id}}, contains_extra=False)['matched_count'] == 0:
+            return None
+        return op_id
+
+    def count_deleting_metadatas(self, user_did, app_did, op_id: str) -> (int, dict):
+        """ Get the total size and the counts of the cids (cid -> count) of the files marked by the deletion. """
+        filter_ = {USR_DID: user_did, APP_DID: app_did, COL_IPFS_FILES_DELETING: op_id}
+        groups = self.__get_col(user_did, app_did).aggregate([
+            {'$match': filter_},
+            {'$group': {'_id': f'${COL_IPFS_FILES_IPFS_CID}', 'count': {'$sum': 1}, 'size': {'$sum': f'${SIZE}'}}}])
+        return sum(g['size'] for g in groups), {g['_id']: g['count'] for g in groups}
+
+    def delete_deleting_metadatas(self, user_did, app_did, op_id: str):
+        filter_ = {USR_DID: user_did, APP_DID: app_did, COL_IPFS_FILES_DELETING: op_id}
+        self.__get_col(user_did, app_did).delete_many(filter_)
+
     def delete_metadata(self, user_did, app_did, rel_path, cid):
         filter_ = {USR_DID: user_did, APP_DID: app_did, COL_IPFS_FILES_PATH: rel_path}
         result = self.__get_col(user_did, app_did).delete_one(filter_)
@@ -83,30 +160,22 @@ class FileMetadataManager:
         The result shows the files content (cid) information.
         """
 
-        app_dids, total_size, cids = self.user_manager.get_apps(user_did), 0, list()
-
-        def get_cid_metadata_from_list(cid_mts, file_mt):
-            if not cid_mts:
-                return None
-            for mt in cid_mts:
-                if mt['cid'] == file_mt[COL_IPFS_FILES_IPFS_CID]:
-                    if mt['sha256'] != file_mt[COL_IPFS_FILES_SHA256] or mt['size'] != int(file_mt[SIZE]):
-                        logging.error(f'Found an unexpected file {file_mt[COL_IPFS_FILES_PATH]} with same CID, '
-                                      f'but different sha256 or size.')
-                    return mt
-            return None
+        app_dids, total_size, cids = self.user_manager.get_apps(user_did), 0, dict()
 
         for app_did in app_dids:
             metadatas = self.get_all_metadatas(user_did, app_did)
             for doc in metadatas:
-                mt = get_cid_metadata_from_list(cids, doc)
+                mt = cids.get(doc[COL_IPFS_FILES_IPFS_CID])
                 if mt:
+                    if mt['sha256'] != doc[COL_IPFS_FILES_SHA256] or mt['size'] != int(doc[SIZE]):
+                        logging.error(f'Found an unexpected file {doc[COL_IPFS_FILES_PATH]} with same CID, '
+                                      f'but different sha256 or size.')
                     mt['count'] += 1
                 else:
-                    cids.append({'cid': doc[COL_IPFS_FILES_IPFS_CID],
-                                 'sha256': doc[COL_IPFS_FILES_SHA256],
-                                 'size': int(doc[SIZE]),
-                                 'count': 1})
+                    cids[doc[COL_IPFS_FILES_IPFS_CID]] = {'cid': doc[COL_IPFS_FILES_IPFS_CID],
+                                                          'sha256': doc[COL_IPFS_FILES_SHA256],
+                                                          'size': int(doc[SIZE]),
+                                                          'count': 1}
             total_size += sum([doc[SIZE] for doc in metadatas])
 
-        return total_size, cids
+        return total_size, list(cids.values())
@@ -5,17 +5,21 @@ The entrance for ipfs module.
 """
 import logging
 import shutil
+import time
 from pathlib import Path
 
 from flask import g
+from pymongo import DeleteOne, UpdateOne
 
-from src.utils.consts import COL_IPFS_FILES_PATH, COL_IPFS_FILES_SHA256, COL_IPFS_FILES_IS_FILE, SIZE, COL_IPFS_FILES_IPFS_CID, COL_IPFS_FILES_IS_ENCRYPT, \
-    COL_IPFS_FILES_ENCRYPT_METHOD
-from src.utils.http_exception import FileNotFoundException, AlreadyExistsException
+from src import hive_setting
+from src.utils.consts import USR_DID, APP_DID, COL_IPFS_FILES_PATH, COL_IPFS_FILES_SHA256, COL_IPFS_FILES_IS_FILE, SIZE, COL_IPFS_FILES_IPFS_CID, COL_IPFS_FILES_IS_ENCRYPT, \
+    COL_IPFS_FILES_ENCRYPT_METHOD, COL_IPFS_FILES_DELETING
+from src.utils.http_exception import FileNotFoundException, AlreadyExistsException, InvalidParameterException, HiveException
 from src.modules.subscription.vault import VaultManager
-from src.modules.files.file_metadata import FileMetadataManager
+from src.modules.files.file_metadata import FileMetadataManager, FileMetadata
 from src.modules.files.ipfs_client import IpfsClient
 from src.modules.files.local_file import LocalFile
+from src.utils.temp_files import temp_files
 from src.modules.files.ipfs_cid_ref import IpfsCidRef
 from src.modules.files.anonymous_files import AnonymousFiles
 
@@ -109,6 +113,66 @@ class FilesService:
 
         return self.v1_move_copy_file(g.usr_did, g.app_did, src_path, dst_path, is_copy=True)
 
+    def delete_folder(self, path):
+        """ Delete the folder with all files under it (includes the sub-folders).
+
+        The files are marked by the id of the deletion first, then the references of the cids are decreased
+        and the storage usage of the vault is updated once by the groups of the marked files, at last the marked files
+        are removed by one deletion. The interrupted deletion is resumed by deleting the folder again,
+        see FileMetadataManager.mark_folder_deleting().
+
+        :param path: The folder path.
+        :return: None
+        """
+
+        self.vault_manager.get_vault(g.usr_did).check_write_permission()
+
+        self.anonymous_files.delete_folder(g.usr_did, g.app_did, path)
+
+        # finish the interrupted deletions first, then the files added after them.
+        resumed = False
+        op_id = self.file_manager.get_folder_deleting(g.usr_did, g.app_did, path)
+        while op_id:
+            self.__delete_marked_files(op_id)
+            resumed, op_id = True, self.file_manager.get_folder_deleting(g.usr_did, g.app_did, path)
+
+        op_id = self.file_manager.mark_folder_deleting(g.usr_did, g.app_did, path)
+        if op_id:
+            self.__delete_marked_files(op_id)
+        elif not resumed:
+            raise FileNotFoundException(f'The directory {path} does not exist.')
+
+    def __delete_marked_files(self, op_id):
+        size, cid_counts = self.file_manager.count_deleting_metadatas(g.usr_did, g.app_did, op_id)
+        IpfsCidRef.update_counts({cid: -count for cid, count in cid_counts.items()}, op_id=op_id)
+        self.vault_manager.update_user_files_size(g.usr_did, 0 - size, op_id=op_id)
+        self.file_manager.delete_deleting_metadatas(g.usr_did, g.app_did, op_id)
+
+        IpfsCidRef.finish_operation(op_id, list(cid_counts.keys()))
+        self.vault_manager.finish_operation(g.usr_did, op_id)
+        for cid in cid_counts.keys():
+            LocalFile.remove_ipfs_cache_file(g.usr_did, cid)
+
+    def move_folder(self, src_path, dst_path):
+        """ Move the folder with all files under it (includes the sub-folders) to the other place.
+
+        :param src_path: The source folder path.
+        :param dst_path: The destination folder path.
+        :return: The destination folder path.
+        """
+
+        src_dir, dst_dir = src_path.rstrip('/'), dst_path.rstrip('/')
+        if not dst_dir or dst_dir == src_dir or dst_dir.startswith(f'{src_dir}/'):
+            raise InvalidParameterException(f'The folder {src_path} can not be moved to {dst_path}.')
+
+        self.vault_manager.get_vault(g.usr_did).check_write_permission()
+
+        self.anonymous_files.delete_folder(g.usr_did, g.app_did, src_dir)
+        self.file_manager.move_folder_metadatas(g.usr_did, g.app_did, src_dir, dst_dir)
+        return {
+            'name': dst_path
+        }
+
     def list_folder(self, path):
         """ List the files (includes sub-folders) under the specific directory.
 
@@ -141,15 +205,7 @@ class FilesService:
         self.vault_manager.get_vault(g.usr_did)
 
         metadata = self.v1_get_file_metadata(g.usr_did, g.app_did, path)
-        return {
-            'name': metadata[COL_IPFS_FILES_PATH],
-            'is_file': metadata[COL_IPFS_FILES_IS_FILE],
-            'size': int(metadata[SIZE]),
-            'is_encrypt': metadata.get(COL_IPFS_FILES_IS_ENCRYPT, False),
-            'encrypt_method': metadata.get(COL_IPFS_FILES_ENCRYPT_METHOD, ''),
-            'created': int(metadata['created']),
-            'updated': int(metadata['modified']),
-        }
+        return FilesService.get_file_properties(metadata)
 
     def get_hash(self, path):
         """ Get the hash of the file content.
@@ -167,6 +223,67 @@ class FilesService:
             'hash': metadata[COL_IPFS_FILES_SHA256]
         }
 
+    def batch(self, operations: list):
+        """ Run the operations (delete, move, copy, properties) of the files by order in one request.
+
+        The operations are checked on the metadata loaded by one query, the changes of the metadata are written
+        by one bulk writing, then the references of the cids and the storage usage of the vault are updated once.
+
+        :param operations: The list of {'op': <operation>, 'path': <path>, 'dest': <destination path for move and copy>}.
+        :return: The result of every operation: {'status': <http code>, ...}, and 'error' if failed.
+        """
+
+        if len(operations) > hive_setting.FILES_BATCH_MAX_OPERATIONS:
+            raise InvalidParameterException(f'The count of the operations exceeds {hive_setting.FILES_BATCH_MAX_OPERATIONS}.')
+
+        ops = set(op['op'] for op in operations if isinstance(op, dict) and isinstance(op.get('op'), str))
+        vault = self.vault_manager.get_vault(g.usr_did)
+        if ops & {'delete', 'move', 'copy'}:
+            vault.check_write_permission()
+        if 'copy' in ops:
+            vault.check_storage_full()
+
+        paths = [op.get(k) for op in operations if isinstance(op, dict) for k in ('path', 'dest') if isinstance(op.get(k), str)]
+        batch = _FilesBatch(g.usr_did, g.app_did, self.file_manager.get_metadatas_by_paths(g.usr_did, g.app_did, paths))
+
+        results = list()
+        for op in operations:
+            try:
+                code, body = batch.run(op)
+                results.append({'status': code, **body})
+            except HiveException as e:
+                results.append({'status': e.code, **e.get_error_dict()})
+
+        result = self.file_manager.bulk_write(g.usr_did, g.app_did, batch.requests)
+        self.anonymous_files.delete_many(g.usr_did, g.app_did, batch.unshared_paths)
+        if batch.is_written(result):
+            IpfsCidRef.update_counts(batch.get_cid_deltas())
+            self.vault_manager.update_user_files_size(g.usr_did, batch.added_size - batch.removed_size)
+        else:
+            # the files are changed by another request at the same time, then the decreasing is skipped to avoid
+            # decreasing twice, the storage usage is corrected by the recount of the vault.
+            logging.error(f'[FilesService] The files are changed during the batch of {g.usr_did}, {result}, skip the decreasing.')
+            IpfsCidRef.update_counts(batch.cid_increases)
+            self.vault_manager.update_user_files_size(g.usr_did, batch.added_size)
+        for cid in batch.removed_cids:
+            LocalFile.remove_ipfs_cache_file(g.usr_did, cid)
+
+        return {
+            'results': results
+        }
+
+    @staticmethod
+    def get_file_properties(metadata):
+        return {
+            'name': metadata[COL_IPFS_FILES_PATH],
+            'is_file': metadata[COL_IPFS_FILES_IS_FILE],
+            'size': int(metadata[SIZE]),
+            'is_encrypt': metadata.get(COL_IPFS_FILES_IS_ENCRYPT, False),
+            'encrypt_method': metadata.get(COL_IPFS_FILES_ENCRYPT_METHOD, ''),
+            'created': int(metadata['created']),
+            'updated': int(metadata['modified']),
+        }
+
     def v1_upload_file(self, user_did, app_did, file_path: str, is_encrypt=False, encrypt_method=''):
         """ The routine to process the file uploading:
         1. Receive the content of uploaded file and cache it a temp file;
@@ -182,10 +299,11 @@ class FilesService:
         :return: The cid of the file.
         """
 
-        # upload to the temporary file and then to IPFS node.
-        temp_file = LocalFile.generate_tmp_file_path()
-        LocalFile.write_file_by_request_stream(temp_file)
-        return self.tov2_upload_file_from_local(user_did, app_did, file_path, temp_file, is_encrypt, encrypt_method)
+        # upload to the temporary file and then to IPFS node, the temporary file is removed if failed.
+        with temp_files.scope() as scope:
+            temp_file = scope.new_path()
+            LocalFile.write_file_by_request_stream(temp_file)
+            return self.tov2_upload_file_from_local(user_did, app_did, file_path, temp_file, is_encrypt, encrypt_method)
 
     def v1_download_file(self, user_did, app_did, path: str):
         """ Download the target file with the following steps:
@@ -327,8 +445,7 @@ class FilesService:
             IpfsCidRef(new_cid).increase()
             increased_size = size
         elif old_metadata[COL_IPFS_FILES_IPFS_CID] != new_cid:
-            IpfsCidRef(new_cid).increase()
-            IpfsCidRef(old_metadata[COL_IPFS_FILES_IPFS_CID]).decrease()
+            IpfsCidRef.update_counts({new_cid: 1, old_metadata[COL_IPFS_FILES_IPFS_CID]: -1})
             increased_size = new_metadata[SIZE] - old_metadata[SIZE]
 
         if increased_size and not only_import:
@@ -341,6 +458,7 @@ class FilesService:
                 shutil.copy(local_path.as_posix(), cache_file.as_posix())
             else:
                 shutil.move(local_path.as_posix(), cache_file.as_posix())
+                temp_files.release(local_path, remove=False)
 
         return new_cid
 
@@ -356,3 +474,96 @@ class FilesService:
 
         self.file_manager.delete_metadata(user_did, app_did, path, cid)
         logging.info(f'[ipfs-files] Remove an existing file {path}')
+
+
+class _FilesBatch:
+    """ The state of the files when running the operations of the batch one by one.
+
+    The metadata of the paths are changed in memory, the changes to write (pymongo operations), the changes of
+    the references of the cids and the storage usage are collected for writing once after all operations.
+    """
+
+    def __init__(self, user_did, app_did, metadatas: dict):
+        self.user_did, self.app_did = user_did, app_did
+        self.metadatas = metadatas  # path -> metadata, None means removed.
+        self.requests = list()
+        self.expected_deleted, self.expected_updated = 0, 0
+        self.cid_increases, self.cid_decreases = dict(), dict()
+        self.removed_cids = set()
+        self.unshared_paths = list()
+        self.added_size, self.removed_size = 0, 0
+
+    def is_written(self, result: dict) -> bool:
+        """ Whether all requests matched the metadata loaded before, see bulk_write() of the collection. """
+        return result['deleted_count'] == self.expected_deleted \
+            and result['matched_count'] + result['upserted_count'] == self.expected_updated
+
+    def get_cid_deltas(self) -> dict:
+        return {cid: self.cid_increases.get(cid, 0) - self.cid_decreases.get(cid, 0)
+                for cid in set(self.cid_increases) | set(self.cid_decreases)}
+
+    def run(self, op) -> (int, dict):
+        """ Run one operation and return the http code and the result. """
+        if not isinstance(op, dict) or not isinstance(op.get('op'), str) or not isinstance(op.get('path'), str) or not op['path']:
+            raise InvalidParameterException('The operation MUST be a dictionary with the string "op" and "path".')
+
+        path = op['path']
+        if op['op'] == 'properties':
+            return 200, FilesService.get_file_properties(self.__get(path))
+        elif op['op'] == 'delete':
+            self.__delete(path)
+            return 204, {}
+        elif op['op'] in ('move', 'copy'):
+            dst_path = op.get('dest')
+            if not isinstance(dst_path, str) or not dst_path or dst_path == path:
+                raise InvalidParameterException(f'The "dest" of the operation {op["op"]} MUST be a path different from the source file {path}.')
+            self.__move_copy(path, dst_path, op['op'] == 'copy')
+            return 200, {'name': dst_path}
+        else:
+            raise InvalidParameterException(f'Unsupported operation {op["op"]}')
+
+    def __get(self, path):
+        metadata = self.metadatas.get(path)
+        if not metadata:
+            raise FileNotFoundException(f'The file {path} does not exist.')
+        return metadata
+
+    def __get_filter(self, path, metadata=None):
+        """ The loaded metadata is also matched by '_id' to not change the one replaced by others, the one
+        copied by the batch has no '_id'. """
+        filter_ = {USR_DID: self.user_did, APP_DID: self.app_did, COL_IPFS_FILES_PATH: path}
+        if metadata and '_id' in metadata:
+            filter_['_id'] = metadata['_id']
+        return filter_
+
+    def __delete(self, path):
+        metadata = self.__get(path)
+        self.metadatas[path] = None
+        self.requests.append(DeleteOne(self.__get_filter(path, metadata)))
+        self.expected_deleted += 1
+        self.unshared_paths.append(path)
+        cid = metadata[COL_IPFS_FILES_IPFS_CID]
+        self.cid_decreases[cid] = self.cid_decreases.get(cid, 0) + 1
+        self.removed_cids.add(cid)
+        self.removed_size += metadata[SIZE]
+
+    def __move_copy(self, src_path, dst_path, is_copy):
+        src_metadata = self.__get(src_path)
+        if self.metadatas.get(dst_path):
+            raise AlreadyExistsException(f'The destination file {dst_path} already exists, impossible to {"copy" if is_copy else "move"}.')
+
+        now = int(time.time())
+        if is_copy:
+            fields = {k: v for k, v in src_metadata.items() if k not in ('_id', COL_IPFS_FILES_PATH, COL_IPFS_FILES_DELETING, 'created', 'modified')}
+            self.metadatas[dst_path] = FileMetadata(**fields, **{COL_IPFS_FILES_PATH: dst_path, 'created': now, 'modified': now})
+            self.requests.append(UpdateOne(self.__get_filter(dst_path),
+                                           {'$set': {**fields, 'modified': now}, '$setOnInsert': {'created': now}}, upsert=True))
+            cid = src_metadata[COL_IPFS_FILES_IPFS_CID]
+            self.cid_increases[cid] = self.cid_increases.get(cid, 0) + 1
+            self.added_size += src_metadata[SIZE]
+        else:
+            self.metadatas[src_path] = None
+            self.metadatas[dst_path] = FileMetadata(**{**src_metadata, COL_IPFS_FILES_PATH: dst_path, 'modified': now})
+            self.requests.append(UpdateOne(self.__get_filter(src_path, src_metadata), {'$set': {COL_IPFS_FILES_PATH: dst_path, 'modified': now}}))
+            self.unshared_paths.append(src_path)
+        self.expected_updated += 1
@@ -1,5 +1,9 @@
+import typing as t
+
+from pymongo import UpdateOne, DeleteOne
+
 from src.modules.database.mongodb_client import MongodbClient
-from src.utils.consts import COL_IPFS_CID_REF, CID, COUNT
+from src.utils.consts import CID, COUNT, COL_IPFS_CID_REF, COL_IPFS_CID_REF_OPERATIONS
 
 
 class IpfsCidRef:
@@ -22,17 +26,38 @@ class IpfsCidRef:
     def decrease(self, count=1):
         """ decrease count if not to zero, else to remove cid info """
 
-        filter_ = {CID: self.cid}
-
-        # check if exists
-        col = self.mcli.get_management_collection(COL_IPFS_CID_REF)
-        doc = col.find_one(filter_)
-        if not doc:
-            return
-
-        # delete or decrease
-        if doc[COUNT] <= count:
-            col.delete_one(filter_)
-        else:
-            update = {'$inc': {COUNT: -count}}
-            col.update_one(filter_, update)
+        IpfsCidRef.update_counts({self.cid: -count})
+
+    @staticmethod
+    def update_counts(deltas: t.Dict[str, int], op_id=None):
+        """ Apply the changes of the counts of many cids by one bulk writing: cid -> increased count (negative means decreased).
+
+        The count of every cid is changed atomically by '$inc', then the cid info is removed by the conditional deletion
+        if the count is not more than zero. The decreased cid which does not exist is not created.
+        The requests are ordered, so the deletion always runs after the changing of the count.
+
+        :param deltas: cid -> increased count.
+        :param op_id: The id of the resumable operation, the decreasing with the same op_id is only applied once,
+            then the operation can run again after interrupted. The op_id is kept until finish_operation().
+        """
+
+        requests = list()
+        for cid, delta in deltas.items():
+            if delta > 0:
+                requests.append(UpdateOne({CID: cid}, {'$inc': {COUNT: delta}}, upsert=True))
+            elif delta < 0:
+                if op_id:
+                    requests.append(UpdateOne({CID: cid, COL_IPFS_CID_REF_OPERATIONS: {'$ne': op_id}},
+                                              {'$inc': {COUNT: delta}, '$addToSet': {COL_IPFS_CID_REF_OPERATIONS: op_id}}))
+                else:
+                    requests.append(UpdateOne({CID: cid}, {'$inc': {COUNT: delta}}))
+                requests.append(DeleteOne({CID: cid, COUNT: {'$lte': 0}}))
+
+        MongodbClient().get_management_collection(COL_IPFS_CID_REF).bulk_write(requests)
+
+    @staticmethod
+    def finish_operation(op_id, cids: t.List[str]):
+        """ Forget the resumable operation which is done on the cids, see update_counts(). """
+        col = MongodbClient().get_management_collection(COL_IPFS_CID_REF)
+        filter_ = {CID: {'$in': cids}, COL_IPFS_CID_REF_OPERATIONS: op_id}
+        col.update_many(filter_, {'$pull': {COL_IPFS_CID_REF_OPERATIONS: op_id}}, contains_extra=False)
@@ -1,11 +1,13 @@
 import json
 import logging
 import typing as t
+import uuid
 from pathlib import Path
 
 from src import hive_setting
 from src.utils.http_exception import BadRequestException
 from src.modules.files.local_file import LocalFile
+from src.utils.temp_files import temp_files
 
 
 def try_three_times(f: t.Callable[..., t.Any]) -> t.Callable[..., t.Any]:
@@ -38,10 +40,35 @@ class IpfsClient:
         json_data = self.http.post(self.ipfs_url + '/api/v0/add', None, None, is_json=False, files=files, success_code=200)
         return json_data['Hash']
 
+    def upload_stream(self, chunks: t.Iterable[bytes]):
+        """ Upload the data chunk by chunk without the local file.
+
+        The request body is the multipart form data with the chunked transfer encoding.
+        """
+        boundary = uuid.uuid4().hex
+
+        def multipart_body():
+            yield f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="file"\r\n' \
+                  f'Content-Type: application/octet-stream\r\n\r\n'.encode()
+            for chunk in chunks:
+                yield chunk
+            yield f'\r\n--{boundary}--\r\n'.encode()
+
+        headers = {'Content-Type': f'multipart/form-data; boundary={boundary}'}
+        json_data = self.http.post(self.ipfs_url + '/api/v0/add', None, multipart_body(), is_json=False, success_code=200, headers=headers)
+        return json_data['Hash']
+
+    def download_stream(self, cid, is_proxy=False):
+        """ Get the response of the content of the cid, the content can be read from 'response.raw'. """
+        url = self.ipfs_gateway_url if is_proxy else self.ipfs_url
+        response = self.http.post(f'{url}/api/v0/cat?arg={cid}', None, None, is_body=False, success_code=200, stream=True)
+        response.raw.decode_content = True
+        return response
+
     @try_three_times
     def download_file(self, cid, file_path: Path, is_proxy=False, sha256=None, size=None):
         url = self.ipfs_gateway_url if is_proxy else self.ipfs_url
-        response = self.http.post(f'{url}/api/v0/cat?arg={cid}', None, None, is_body=False, success_code=200)
+        response = self.http.post(f'{url}/api/v0/cat?arg={cid}', None, None, is_body=False, success_code=200, stream=True)
         LocalFile.write_file_by_response(response, file_path)
 
         if size is not None:
@@ -55,15 +82,13 @@ class IpfsClient:
                 return f'Failed to get file content with cid {cid}, sha256 {sha256, cid_sha256}'
 
     def download_file_json_content(self, cid, is_proxy=False, sha256=None, size=None) -> dict:
-        temp_file = LocalFile.generate_tmp_file_path()
-        msg = self.download_file(cid, temp_file, is_proxy=is_proxy, sha256=sha256, size=size)
-        if msg:
-            temp_file.unlink()
-            raise BadRequestException(msg)
-        with temp_file.open() as f:
-            metadata = json.load(f)
-        temp_file.unlink()
-        return metadata
+        with temp_files.scope() as scope:
+            temp_file = scope.new_path()
+            msg = self.download_file(cid, temp_file, is_proxy=is_proxy, sha256=sha256, size=size)
+            if msg:
+                raise BadRequestException(msg)
+            with temp_file.open() as f:
+                return json.load(f)
 
     def cid_pin(self, cid):
         """ Pin file from ipfs proxy to the local node. """
@@ -71,21 +96,18 @@ class IpfsClient:
         # INFO: IPFS does not support that one node directly pin file from other node.
         logging.info(f'[IpfsClient.cid_pin] Try to pin {cid} to the local IPFS node.')
 
-        # download the file to local
-        temp_file = LocalFile.generate_tmp_file_path()
-        self.download_file(cid, temp_file, is_proxy=True)
-
-        logging.info(f'[IpfsClient.cid_pin] Download file OK.')
+        # download the file to local, it is removed even if failed.
+        with temp_files.scope() as scope:
+            temp_file = scope.new_path()
+            self.download_file(cid, temp_file, is_proxy=True)
 
-        # then upload the file to local IPFS node.
-        self.upload_file(temp_file)
+            logging.info(f'[IpfsClient.cid_pin] Download file OK.')
 
-        logging.info(f'[IpfsClient.cid_pin] Upload file OK.')
+            # then upload the file to local IPFS node.
+            self.upload_file(temp_file)
 
-        # clean the local file.
-        size = temp_file.stat().st_size
-        temp_file.unlink()
-        return size
+            logging.info(f'[IpfsClient.cid_pin] Upload file OK.')
+            return temp_file.stat().st_size
 
     def cid_unpin(self, cid):
         logging.info(f'[IpfsClient.cid_unpin] Try to unpin {cid} in backup node.')
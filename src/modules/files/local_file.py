@@ -1,40 +1,26 @@
 import hashlib
 import os
 import platform
-import random
 import shutil
 import subprocess
+import tempfile
 import typing
 from datetime import datetime
 from pathlib import Path
 
 from flask import request
-from flask_rangerequest import RangeRequest
 
 from src import hive_setting
+from src.utils.io_tuning import IOTuning
+from src.utils.range_request import RangeRequest
+from src.utils.temp_files import temp_files
 from src.utils.http_exception import BadRequestException
-from src.utils.consts import CHUNK_SIZE
 
 
 class LocalFile:
     def __init__(self):
         ...
 
-    @staticmethod
-    def generate_tmp_file_path() -> Path:
-        """ get temp file path which not exists """
-
-        tmp_dir = Path(hive_setting.get_temp_dir())
-        LocalFile.create_dir_if_not_exists(tmp_dir)
-
-        def random_string(num):
-            return "".join(random.sample('zyxwvutsrqponmlkjihgfedcba', num))
-
-        while True:
-            patch_delta_file = tmp_dir / random_string(10)
-            if not patch_delta_file.exists():
-                return patch_delta_file
-
     @staticmethod
     def create_dir_if_not_exists(dir_path: Path):
         if not dir_path.exists():
@@ -59,27 +45,15 @@ class LocalFile:
     def get_sha256(file_path: str) -> str:
         """ get sha256 of the local file content """
 
-        buf_size = 65536  # lets read stuff in 64kb chunks!
-        sha = hashlib.sha256()
-        with open(file_path, 'rb') as f:
-            while True:
-                data = f.read(buf_size)
-                if not data:
-                    break
-                sha.update(data)
-        return sha.hexdigest()
+        return IOTuning.update_hash(hashlib.sha256(), file_path).hexdigest()
 
     @staticmethod
     def write_file_by_request_stream(file_path: Path, use_temp=False):
         """ used when download file """
 
         def receiving_data(path: Path):
-            with open(path.as_posix(), "bw") as f:
-                while True:
-                    chunk = request.stream.read(CHUNK_SIZE)
-                    if len(chunk) == 0:
-                        break
-                    f.write(chunk)
+            with IOTuning.open_for_write(path.as_posix()) as f:
+                IOTuning.copy_stream(request.stream, f)
 
         LocalFile.__write_to_file(file_path, receiving_data, use_temp=use_temp)
 
@@ -88,9 +62,9 @@ class LocalFile:
         """ used when download file by url """
 
         def receiving_data(path: Path):
-            with open(path.as_posix(), 'bw') as f:
+            with IOTuning.open_for_write(path.as_posix()) as f:
                 f.seek(0)
-                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                for chunk in response.iter_content(chunk_size=IOTuning.get_size(IOTuning.RECEIVE)):
                     if chunk:
                         f.write(chunk)
 
@@ -103,11 +77,13 @@ class LocalFile:
 
         # download file.
         if use_temp:
-            temp_file = LocalFile.generate_tmp_file_path()
-            on_receiving_data(temp_file)
-            if file_path.exists():
-                file_path.unlink()
-            shutil.move(temp_file.as_posix(), file_path.as_posix())
+            with temp_files.scope() as scope:
+                temp_file = scope.new_path()
+                on_receiving_data(temp_file)
+                if file_path.exists():
+                    file_path.unlink()
+                shutil.move(temp_file.as_posix(), file_path.as_posix())
+                scope.keep(temp_file)
         else:
             on_receiving_data(file_path)
 
@@ -130,6 +106,18 @@ class LocalFile:
         except subprocess.CalledProcessError as e:
             raise BadRequestException(f'Failed to dump database {db_name}: {e.output}')
 
+    @staticmethod
+    def dump_mongodb_to_pipe(db_name) -> 'MongodbPipe':
+        """ 'mongodump' writes the archive to the stream of the pipe. """
+        args = ['mongodump', f'--uri={hive_setting.MONGODB_URL}', '-d', db_name, '--archive', '--quiet']
+        return MongodbPipe(args, f'dump database {db_name}', is_dump=True)
+
+    @staticmethod
+    def restore_mongodb_from_pipe(db_name) -> 'MongodbPipe':
+        """ 'mongorestore' reads the archive from the stream of the pipe. """
+        args = ['mongorestore', f'--uri={hive_setting.MONGODB_URL}', '--drop', '--archive', '--quiet']
+        return MongodbPipe(args, f'restore database {db_name}', is_dump=False)
+
     @staticmethod
     def restore_mongodb_from_full_path(full_path: Path):
         if not full_path.exists():
@@ -174,3 +162,53 @@ class LocalFile:
                 # We're probably on Linux. No easy way to get creation dates here,
                 # so we'll settle for when its content was last modified.
                 return stat.st_mtime
+
+
+class MongodbPipe:
+    """ Run 'mongodump' or 'mongorestore' with the archive on the stdout or stdin instead of the local file.
+
+    example:
+
+        with LocalFile.dump_mongodb_to_pipe(db_name) as pipe:
+            data = pipe.stream.read()
+
+    """
+
+    def __init__(self, args: list, action: str, is_dump: bool):
+        self.action = action
+        self.error_output = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(args,
+                                        stdin=None if is_dump else subprocess.PIPE,
+                                        stdout=subprocess.PIPE if is_dump else subprocess.DEVNULL,
+                                        stderr=self.error_output)
+        self.stream = self.process.stdout if is_dump else self.process.stdin
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None and issubclass(exc_type, BrokenPipeError):
+            # the process exited before reading all the archive, such as the invalid archive.
+            _, output = self.__wait()
+            raise BadRequestException(f'Failed to {self.action}: {output}') from exc_val
+
+        if exc_type is not None:
+            self.process.kill()
+        self.close(check=exc_type is None)
+
+    def close(self, check=True):
+        """ Wait the process to the end, raise BadRequestException with the error output if failed. """
+        return_code, output = self.__wait()
+        if check and return_code != 0:
+            raise BadRequestException(f'Failed to {self.action}: {output}')
+
+    def __wait(self):
+        try:
+            self.stream.close()
+        except BrokenPipeError:
+            pass  # the buffered data can not be written to the exited process.
+        return_code = self.process.wait()
+        self.error_output.seek(0)
+        output = self.error_output.read()
+        self.error_output.close()
+        return return_code, output
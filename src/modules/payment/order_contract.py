@@ -3,8 +3,6 @@ import os
 import json
 import typing as t
 
-from web3 import Web3
-
 from src import hive_setting
 from src.utils.http_exception import BadRequestException
 
@@ -12,7 +10,11 @@ BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)))
 
 
 class OrderContract:
+    """ web3 is imported when used, it is slow to import and not needed if the payment is disabled. """
+
     def __init__(self):
+        from web3 import Web3
+
         self.url = hive_setting.ESC_RESOLVER_URL
         self.address = Web3.toChecksumAddress(hive_setting.PAYMENT_CONTRACT_ADDRESS)
         assert self.url and self.address and 'Please set payment url and address on the .env file.'
@@ -21,10 +23,14 @@ class OrderContract:
             self.abi = json.load(f)
 
     def __get_contract(self):
+        from web3 import Web3
+
         web3 = Web3(Web3.HTTPProvider(self.url))
         return web3.eth.contract(address=self.address, abi=self.abi)
 
     def get_order(self, order_id: int) -> t.Optional[dict]:
+        from web3 import Web3
+
         order = self.__get_contract().functions.getOrder(order_id).call()
         if not order or len(order) < 4:
             raise BadRequestException(f'Invalid contract order info: {order}')
@@ -20,6 +20,7 @@ from src.utils.consts import USR_DID, VAULT_SERVICE_DID, VAULT_SERVICE_PRICING_U
     VAULT_BACKUP_SERVICE_MAX_STORAGE, VAULT_BACKUP_SERVICE_USE_STORAGE
 from src.utils.http_exception import ForbiddenException, ReceiptNotFoundException
 from src.modules.payment.order import OrderManager
+from src.utils.job_lease import JobStatus
 
 
 class Provider:
@@ -92,6 +93,18 @@ class Provider:
             'orders': [o.to_get_receipts() for o in receipts]
         }
 
+    def get_jobs(self):
+        """ Get the last run of the scheduler jobs of all nodes sharing the MongoDB.
+
+        :v2 API:
+        """
+
+        self.__check_auth_owner_id()
+
+        return {
+            'jobs': JobStatus().get_all()
+        }
+
     def __check_auth_owner_id(self):
         if g.usr_did != self.owner_did:
             raise ForbiddenException('No permission for accessing node information.')
@@ -1,7 +1,5 @@
-import json
-
-from bson import json_util
-
+from src import hive_setting
+from src.utils.json_stream import JsonItems
 from src.modules.scripting.executable import Executable, get_populated_value_with_params
 from src.modules.scripting.scripting import Script
 
@@ -41,11 +39,14 @@ class FindExecutable(DatabaseExecutable):
 
         filter_, options = self.get_populated_filter(), self.get_populated_options()
         col = self.get_target_user_collection()
-        items = col.find_many(filter_, **options)
-        total = col.count(filter_)
+        if not self.output:
+            return None
 
-        # json decode&encode is used for ObjectId or other mongo data types.
-        return self.get_result_data({'total': total, 'items': json.loads(json_util.dumps(items))})
+        total = col.count(filter_)
+        # the documents are encoded to the extended JSON (ObjectId or other mongo data types) while sending,
+        # the first one is fetched now to raise the query errors before the response.
+        items = JsonItems(col.find_cursor(filter_, **options)).prefetch()
+        return self.get_result_data({'total': total, 'items': items if hive_setting.DATABASE_STREAM_RESPONSE else JsonItems.to_list(items)})
 
 
 class CountExecutable(DatabaseExecutable):
@@ -12,6 +12,7 @@ from bson import ObjectId
 from src import hive_setting
 from src.utils.consts import SCRIPTING_SCRIPT_COLLECTION, SCRIPTING_SCRIPT_TEMP_TX_COLLECTION, COL_ANONYMOUS_FILES, SCRIPT_ANONYMOUS_FILE
 from src.utils.http_exception import BadRequestException, ScriptNotFoundException, UnauthorizedException, InvalidParameterException
+from src.utils.json_stream import JsonItems
 from src.modules.database.mongodb_client import MongodbClient
 from src.modules.files.files_service import FilesService
 from src.modules.subscription.vault import VaultManager
@@ -292,7 +293,14 @@ class Script:
         # run executables and get the results
         executables: [Executable] = Executable.create_executables(self, script_data['executable'])
         # executable_name: executable_result ( MUST not None ), this is for the executable option 'is_out'
-        return {k: v for k, v in {e.name: e.execute() for e in executables}.items() if v is not None}
+        results = dict()
+        for i, e in enumerate(executables):
+            result = e.execute()
+            if result is None:
+                continue
+            # the documents can only be sent lazily by the last executable, the later ones may change them.
+            results[e.name] = result if i == len(executables) - 1 else JsonItems.to_list(result)
+        return results
 
 
 class Scripting:
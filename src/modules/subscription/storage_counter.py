@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""
+The batch engine to recount the storage usage of all vaults.
+"""
+import logging
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from src import hive_setting
+from src.modules.auth.user import UserManager
+from src.modules.database.mongodb_client import MongodbClient
+from src.modules.subscription.vault import VaultManager
+from src.utils.consts import VAULT_SERVICE_COL, VAULT_SERVICE_DID, VAULT_SERVICE_FILE_USE_STORAGE, VAULT_SERVICE_DB_USE_STORAGE, \
+    VAULT_SERVICE_MODIFY_TIME, VAULT_SERVICE_STORAGE_COUNT_TIME
+from src.utils.job_lease import JobLease, JobStatus, run_shards, get_shard
+
+
+class StorageCounter:
+    """ Recount the files size and the databases size of the vaults.
+
+    The vaults are split into the shards (see run_shards), the vaults of the shard are got page by page
+    (STORAGE_COUNT_PAGE_SIZE) and counted by the worker threads (STORAGE_COUNT_WORKERS). The checkpoint is saved
+    after every page, so the shard is continued from it after the process exits.
+
+    The vault is skipped if it is not modified after the latest recount: the storage usage of the vault is updated
+    with the modify time on every writing, the recount only fixes the drift.
+    """
+
+    JOB_NAME = 'count_vault_storage_job'
+
+    def __init__(self, page_size: int = None, workers: int = None, min_interval: int = 12 * 3600):
+        """
+        :param min_interval: The shard recounted in the seconds is skipped.
+        """
+        self.page_size = page_size if page_size else hive_setting.STORAGE_COUNT_PAGE_SIZE
+        self.workers = workers if workers else hive_setting.STORAGE_COUNT_WORKERS
+        self.min_interval = min_interval
+        self.mcli, self.user_manager, self.vault_manager = MongodbClient(), UserManager(), VaultManager()
+        self.status = JobStatus()
+
+    def run(self) -> int:
+        """ Recount the vaults of the shards which are not taken by the other processes, return the count of
+        the recounted vaults. """
+        return run_shards('count_vault_storage', self.count_shard, min_interval=self.min_interval)
+
+    def count_shard(self, shard, shards, lease: JobLease) -> int:
+        col = self.mcli.get_management_collection(VAULT_SERVICE_COL)
+        checkpoint, counted, skipped = lease.get_checkpoint(), 0, 0
+
+        with ThreadPoolExecutor(self.workers) as pool:
+            while not lease.lost:
+                filter_ = {VAULT_SERVICE_DID: {'$exists': True}}
+                if checkpoint:
+                    filter_['_id'] = {'$gt': checkpoint}
+                page = col.find_many(filter_, sort=[('_id', 1)], limit=self.page_size,
+                                     projection={VAULT_SERVICE_DID: True, VAULT_SERVICE_MODIFY_TIME: True, VAULT_SERVICE_STORAGE_COUNT_TIME: True})
+                if not page:
+                    break
+
+                vaults = [v for v in page if get_shard(v[VAULT_SERVICE_DID], shards) == shard]
+                modified = [v for v in vaults if StorageCounter.__is_modified(v)]
+
+                # the existence of the user databases is checked by the names got once for the page.
+                database_names = self.mcli.get_database_names()
+                counted += sum(pool.map(lambda v: self.count_vault(v, database_names), modified))
+                skipped += len(vaults) - len(modified)
+
+                checkpoint = page[-1]['_id']
+                lease.set_checkpoint(checkpoint)
+                self.status.update_progress(StorageCounter.JOB_NAME, {
+                    'shard': shard, 'shards': shards, 'counted': counted, 'skipped': skipped, 'checkpoint': str(checkpoint)})
+
+        logging.info(f'[StorageCounter] The shard {shard}/{shards} is done: counted {counted}, skipped {skipped}.')
+        return counted
+
+    @staticmethod
+    def __is_modified(vault: dict) -> bool:
+        # the modify time in the same second of the recount is treated as modified.
+        count_time = vault.get(VAULT_SERVICE_STORAGE_COUNT_TIME)
+        return count_time is None or vault.get(VAULT_SERVICE_MODIFY_TIME, count_time) >= count_time
+
+    def count_vault(self, vault: dict, database_names: t.Optional[set] = None) -> int:
+        """ Recount the storage usage of the vault, return 1 if done. """
+        user_did, start = vault[VAULT_SERVICE_DID], int(datetime.now().timestamp())
+        try:
+            app_dids = self.user_manager.get_apps(user_did)
+            files_size = sum(map(lambda app_did: self.vault_manager.count_app_files_total_size(user_did, app_did, database_names), app_dids))
+            dbs_size = sum(map(lambda app_did: self.mcli.get_user_database_size(user_did, app_did, database_names), app_dids))
+        except Exception as e:
+            logging.error(f'[StorageCounter] Failed to count the storage of the vault {user_did}: {str(e)}')
+            return 0
+
+        # the modify time is not changed, then the writing during the recount makes the vault recounted next time.
+        update = {"$set": {
+            VAULT_SERVICE_FILE_USE_STORAGE: files_size,
+            VAULT_SERVICE_DB_USE_STORAGE: dbs_size,
+            VAULT_SERVICE_STORAGE_COUNT_TIME: start}}
+        self.mcli.get_management_collection(VAULT_SERVICE_COL).update_one({"_id": vault["_id"]}, update, contains_extra=False)
+        return 1
@@ -7,7 +7,7 @@ from src.utils.http_exception import VaultNotFoundException, CollectionNotFoundE
 from src.utils.consts import COL_IPFS_FILES, IS_UPGRADED, VAULT_SERVICE_MAX_STORAGE, VAULT_SERVICE_DB_USE_STORAGE, VAULT_SERVICE_COL, \
     VAULT_SERVICE_DID, VAULT_SERVICE_PRICING_USING, VAULT_SERVICE_START_TIME, VAULT_SERVICE_END_TIME, VAULT_SERVICE_MODIFY_TIME, \
     VAULT_SERVICE_FILE_USE_STORAGE, VAULT_SERVICE_STATE_FREEZE, VAULT_SERVICE_STATE, VAULT_SERVICE_STATE_RUNNING, VAULT_SERVICE_LATEST_ACCESS_TIME, \
-    VAULT_SERVICE_STATE_REMOVED
+    VAULT_SERVICE_STATE_REMOVED, VAULT_SERVICE_OPERATIONS
 from src import hive_setting
 from src.modules.auth.user import UserManager
 from src.modules.database.mongodb_client import MongodbClient
@@ -224,16 +224,22 @@ class VaultManager:
     def update_user_databases_size(self, user_did, size: int, is_reset=False):
         self.__update_storage_size(user_did, size, False, is_reset=is_reset)
 
-    def update_user_files_size(self, user_did, size: int, is_reset=False):
-        self.__update_storage_size(user_did, size, True, is_reset=is_reset)
+    def update_user_files_size(self, user_did, size: int, is_reset=False, op_id=None):
+        self.__update_storage_size(user_did, size, True, is_reset=is_reset, op_id=op_id)
 
-    def __update_storage_size(self, user_did, size, is_files: bool, is_reset=False):
+    def finish_operation(self, user_did, op_id):
+        """ Forget the resumable operation which is done, see __update_storage_size(). """
+        col = self.mcli.get_management_collection(VAULT_SERVICE_COL)
+        col.update_one({VAULT_SERVICE_DID: user_did}, {'$pull': {VAULT_SERVICE_OPERATIONS: op_id}}, contains_extra=False)
+
+    def __update_storage_size(self, user_did, size, is_files: bool, is_reset=False, op_id=None):
         """ update files or databases usage of the vault
 
         :param user_did user DID
         :param size files&databases total size or increased size
         :param is_files files or databases storage usage
         :param is_reset: True means reset by size, else increase with size
+        :param op_id: The id of the resumable operation, the increasing with the same op_id is only applied once.
         """
 
         if not is_reset and size == 0:
@@ -252,6 +258,10 @@ class VaultManager:
                 '$set': {VAULT_SERVICE_MODIFY_TIME: now}
             }
 
+        if op_id and not is_reset:
+            filter_[VAULT_SERVICE_OPERATIONS] = {'$ne': op_id}
+            update['$addToSet'] = {VAULT_SERVICE_OPERATIONS: op_id}
+
         col = self.mcli.get_management_collection(VAULT_SERVICE_COL)
         col.update_one(filter_, update, contains_extra=False)
 
@@ -287,15 +297,21 @@ class VaultManager:
             for app_did in app_dids:
                 self.mcli.drop_user_database(user_did, app_did)
 
-    def count_app_files_total_size(self, user_did, app_did) -> int:
-        """ for batch 'count_vault_storage_job' and count files occupation """
-        if not self.mcli.exists_user_database(user_did, app_did):
+    def count_app_files_total_size(self, user_did, app_did, database_names: set = None) -> int:
+        """ for batch 'count_vault_storage_job' and count files occupation
+
+        :param database_names: All database names to check the existence of the user database.
+        """
+        exists = MongodbClient.get_user_database_name(user_did, app_did) in database_names if database_names is not None \
+            else self.mcli.exists_user_database(user_did, app_did)
+        if not exists:
             return 0
 
+        # get total size of all user's application files by the database server.
         col = self.mcli.get_user_collection(user_did, app_did, COL_IPFS_FILES)
-        files = col.find_many({"user_did": user_did, "app_did": app_did})
-        # get total size of all user's application files
-        return int(sum(map(lambda o: o["size"], files)))
+        result = col.aggregate([{'$match': {"user_did": user_did, "app_did": app_did}},
+                                {'$group': {'_id': None, 'size': {'$sum': '$size'}}}])
+        return int(result[0]['size']) if result else 0
 
     def get_access_statistics(self, user_did):
         access_count, access_amount, access_last_time = 0, 0, -1
@@ -168,5 +168,89 @@ class HiveSetting:
     def BACKUP_IS_SYNC(self):
         return self.env_config('BACKUP_IS_SYNC', default='False', cast=bool)
 
+    @property
+    def BACKUP_INCREMENTAL(self):
+        return self.env_config('BACKUP_INCREMENTAL', default='True', cast=bool)
+
+    @property
+    def IO_RECEIVE_CHUNK_SIZE(self):
+        return self.env_config('IO_RECEIVE_CHUNK_SIZE', default=256 * 1024, cast=int)
+
+    @property
+    def IO_WRITE_BUFFER_SIZE(self):
+        return self.env_config('IO_WRITE_BUFFER_SIZE', default=256 * 1024, cast=int)
+
+    @property
+    def IO_HASH_CHUNK_SIZE(self):
+        return self.env_config('IO_HASH_CHUNK_SIZE', default=256 * 1024, cast=int)
+
+    @property
+    def IO_RESPONSE_CHUNK_SIZE(self):
+        return self.env_config('IO_RESPONSE_CHUNK_SIZE', default=256 * 1024, cast=int)
+
+    @property
+    def DATABASE_FIND_BATCH_SIZE(self):
+        return self.env_config('DATABASE_FIND_BATCH_SIZE', default=1000, cast=int)
+
+    @property
+    def DATABASE_STREAM_RESPONSE(self):
+        return self.env_config('DATABASE_STREAM_RESPONSE', default='True', cast=bool)
+
+    @property
+    def DATABASE_PAGE_SIZE(self):
+        return self.env_config('DATABASE_PAGE_SIZE', default=1000, cast=int)
+
+    @property
+    def DATABASE_MAX_PAGE_SIZE(self):
+        return self.env_config('DATABASE_MAX_PAGE_SIZE', default=10000, cast=int)
+
+    @property
+    def DATABASE_CURSOR_TTL(self):
+        return self.env_config('DATABASE_CURSOR_TTL', default=600, cast=int)
+
+    @property
+    def DATABASE_QUERY_MAX_TIME_MS(self):
+        return self.env_config('DATABASE_QUERY_MAX_TIME_MS', default=30000, cast=int)
+
+    @property
+    def LEADER_LEASE_TTL(self):
+        return self.env_config('LEADER_LEASE_TTL', default=60, cast=int)
+
+    @property
+    def JOB_LEASE_TTL(self):
+        return self.env_config('JOB_LEASE_TTL', default=60, cast=int)
+
+    @property
+    def JOB_SHARDS(self):
+        return self.env_config('JOB_SHARDS', default=16, cast=int)
+
+    @property
+    def STORAGE_COUNT_PAGE_SIZE(self):
+        return self.env_config('STORAGE_COUNT_PAGE_SIZE', default=100, cast=int)
+
+    @property
+    def STORAGE_COUNT_WORKERS(self):
+        return self.env_config('STORAGE_COUNT_WORKERS', default=4, cast=int)
+
+    @property
+    def STARTUP_WORKERS(self):
+        return self.env_config('STARTUP_WORKERS', default=2, cast=int)
+
+    @property
+    def FILES_BATCH_MAX_OPERATIONS(self):
+        return self.env_config('FILES_BATCH_MAX_OPERATIONS', default=1000, cast=int)
+
+    @property
+    def BACKUP_ENCRYPTION_CHUNK_SIZE(self):
+        return self.env_config('BACKUP_ENCRYPTION_CHUNK_SIZE', default=1024 * 1024, cast=int)
+
+    @property
+    def BACKUP_PIPELINE_WORKERS(self):
+        return self.env_config('BACKUP_PIPELINE_WORKERS', default=4, cast=int)
+
+    @property
+    def BACKUP_COMPRESSION(self):
+        return self.env_config('BACKUP_COMPRESSION', default='zstd', cast=str)
+
 
 hive_setting = HiveSetting()
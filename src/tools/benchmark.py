@@ -0,0 +1,578 @@
+"""
+Benchmark tools for the hive node
+
+$ HIVE_CONFIG=.env python -m src.tools.benchmark backup-manifest --user-did did:elastos:xxx --runs 3
+$ python -m src.tools.benchmark encryption --size 512
+$ HIVE_CONFIG=.env python -m src.tools.benchmark backup-pipeline --databases 20 --workers 4
+$ python -m src.tools.benchmark compression --documents 200000 --bandwidth 10
+$ python -m src.tools.benchmark rsync-delta --sizes 10,100,1024
+$ python -m src.tools.benchmark v1-transfer --files 1000 --latency 20 --workers 8
+$ HIVE_CONFIG=.env python -m src.tools.benchmark pubsub-publish --subscribers 10,100,1000,10000
+$ HIVE_CONFIG=.env python -m src.tools.benchmark pubsub-pop --consumers 1,4,16 --messages 10000
+$ python -m src.tools.benchmark io-chunks --sizes 4096,65536,262144,1048576,4194304 --file-size 256
+$ python -m src.tools.benchmark server-throughput --url http://localhost:5000/api/v2/node/version --concurrency 1,16,64
+$ HIVE_CONFIG=.env python -m src.tools.benchmark import-time --module wsgi --top 30
+$ HIVE_CONFIG=.env python -m src.tools.benchmark startup-time --runs 5 --budget 5.0
+"""
+import collections
+import filecmp
+import os
+import random
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+import click
+
+CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option('--user-did', required=True, help='the user who did the backup by the API before, the same backup node is used')
+@click.option('--runs', default=3, help='the count of the backups, the first one is full and the others are incremental')
+def backup_manifest(user_did, runs):
+    """ duration and transferred size of the full backup and the incremental ones, needs MongoDB, IPFS and the backup node """
+    from src import hive_setting
+    from src.modules.backup.backup_client import BackupClient
+    from src.modules.backup.backup_executor import BackupClientExecutor
+    from src.modules.database.mongodb_client import MongodbClient
+    from src.utils.consts import COL_IPFS_BACKUP_CLIENT, USR_DID, BACKUP_TARGET_TYPE, BACKUP_TARGET_TYPE_HIVE_NODE, \
+        BACKUP_REQUEST_STATS, BACKUP_REQUEST_STATE_MSG
+
+    hive_setting.init_config()
+    col = MongodbClient().get_management_collection(COL_IPFS_BACKUP_CLIENT)
+    filter_ = {USR_DID: user_did, BACKUP_TARGET_TYPE: BACKUP_TARGET_TYPE_HIVE_NODE}
+    req = col.find_one(filter_)
+    if not req:
+        raise click.ClickException(f'No backup request of {user_did}, please backup by the API first.')
+
+    client = BackupClient()
+    for i in range(runs):
+        client.update_backup_stats(user_did, None)
+
+        # run in the current thread, the force one is always full.
+        BackupClientExecutor(user_did, client, req, is_force=i == 0).run()
+
+        doc = col.find_one(filter_)
+        stats = doc.get(BACKUP_REQUEST_STATS)
+        if not stats:
+            raise click.ClickException(f'Failed to backup: {doc.get(BACKUP_REQUEST_STATE_MSG)}')
+
+        print(f'{"incremental" if stats["incremental"] else "full"} backup: {stats["duration"]:.1f} seconds, '
+              f'transferred {stats["transferred"]} of {stats["backup_size"]} bytes')
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option('--size', default=512, help='the size (MB) of the plain file')
+@click.option('--chunk-size', default=1024 * 1024, help='the chunk size of the stream encryption')
+@click.option('--legacy', is_flag=True, help='encrypt the whole file in memory as before')
+def encryption(size, chunk_size, legacy):
+    """ peak RSS and speed of encrypting and decrypting the database dump file """
+    from src.modules.backup.encryption import Encryption
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        plain_path = Path(tmp_dir) / 'plain'
+        with plain_path.open('wb') as f:
+            for _ in range(size):
+                f.write(os.urandom(1024 * 1024))
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        e = Encryption(chunk_size=chunk_size, format_=Encryption.SECRET_BOX if legacy else Encryption.SECRET_STREAM)
+
+        start = time.time()
+        cipher_path = e.encrypt_file(plain_path)
+        encrypt_time = time.time() - start
+
+        start = time.time()
+        decrypt_path = e.decrypt_file(cipher_path)
+        decrypt_time = time.time() - start
+
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f'mode: {"legacy" if legacy else "stream"}, size: {size} MB, chunk size: {chunk_size}')
+        print(f'encrypt: {size / encrypt_time:.1f} MB/s, decrypt: {size / decrypt_time:.1f} MB/s')
+        print(f'peak RSS: {rss_after // 1024} MB (increased {(rss_after - rss_before) // 1024} MB)')
+        assert decrypt_path.stat().st_size == plain_path.stat().st_size
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option('--databases', default=20, help='the count of the application databases')
+@click.option('--documents', default=20000, help='the count of the documents in every database')
+@click.option('--workers', default=4, help='the size of the pool of the pipeline')
+def backup_pipeline(databases, documents, workers):
+    """ wall-clock time of dumping the databases by one worker and by the pool, needs MongoDB and IPFS node """
+    from src import hive_setting
+    from src.modules.backup.backup_pipeline import DatabasePipeline
+    from src.modules.backup.encryption import Encryption
+    from pymongo import MongoClient
+
+    hive_setting.init_config()
+    names = [f'hive_benchmark_db_{i}' for i in range(databases)]
+    connection = MongoClient(hive_setting.MONGODB_URL)
+    for name in names:
+        connection[name]['docs'].insert_many([{'index': i, 'content': os.urandom(512)} for i in range(documents)])
+
+    try:
+        encryption = Encryption()
+        for count in sorted({1, workers}):
+            pipeline = DatabasePipeline(workers=count)
+            start = time.time()
+            results = pipeline.run(lambda name: pipeline.dump_database(name, encryption), names)
+            print(f'workers: {count}, databases: {databases}, '
+                  f'size: {sum([d["size"] for d in results])} bytes, time: {time.time() - start:.1f} seconds')
+    finally:
+        for name in names:
+            connection.drop_database(name)
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option('--documents', default=200000, help='the count of the documents in the synthetic dump file')
+@click.option('--bandwidth', default=10.0, help='the transfer speed (MB/s) between the IPFS nodes for the estimated duration')
+def compression(documents, bandwidth):
+    """ ratio and speed of the codecs on the synthetic database dump file """
+    import io
+    import bson
+    from src.modules.backup.compression import Compression
+
+    words = ['hive', 'vault', 'backup', 'node', 'file', 'script', 'database', 'elastos', 'did', 'ipfs']
+    data = b''.join([bson.encode({'index': i,
+                                  'author': random.choice(words),
+                                  'title': ' '.join(random.choices(words, k=8)),
+                                  'created': 1600000000 + i,
+                                  'tags': random.choices(words, k=3)}) for i in range(documents)])
+    speed = bandwidth * 1024 * 1024
+    print(f'size: {len(data)} bytes, bandwidth: {bandwidth} MB/s, transfer without compression: {len(data) / speed:.2f} seconds')
+
+    for codec in [Compression.NONE] + Compression.get_supported():
+        c = Compression(codec)
+        start = time.time()
+        compressed = c.compress_reader(io.BytesIO(data)).read()
+        compress_time = time.time() - start
+
+        start = time.time()
+        output = io.BytesIO()
+        writer = Compression.decompress_writer(output)
+        writer.write(compressed)
+        writer.flush()
+        decompress_time = time.time() - start
+        assert output.getvalue() == data
+
+        mb = len(data) / 1024 / 1024
+        print(f'{codec}: ratio {len(data) / len(compressed):.2f}, '
+              f'compress {mb / max(compress_time, 1e-6):.1f} MB/s, decompress {mb / max(decompress_time, 1e-6):.1f} MB/s, '
+              f'compress + transfer {compress_time + len(compressed) / speed:.2f} seconds')
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option('--sizes', default='10,100,1024', help='the sizes (MB) of the files, separated by comma')
+@click.option('--changes', default=100, help='the count of the changed places in the new file')
+def rsync_delta(sizes, changes):
+    """ speed of the signatures, delta and patch of the v1 backup (hive.util.pyrsync) """
+    from hive.util.pyrsync import blockchecksums, rsyncdelta, patchstream
+    from hive.util.constants import CHUNK_SIZE
+
+    for size in [int(s) for s in sizes.split(',')]:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            old_path, new_path, patched_path = Path(tmp_dir) / 'old', Path(tmp_dir) / 'new', Path(tmp_dir) / 'patched'
+            changed = collections.Counter([random.randrange(size) for _ in range(changes)])
+            with old_path.open('wb') as old_f, new_path.open('wb') as new_f:
+                for mb in range(size):
+                    data = os.urandom(1024 * 1024)
+                    old_f.write(data)
+                    for _ in range(changed[mb]):
+                        i = random.randint(0, len(data))
+                        data = data[:i] + os.urandom(random.randint(1, 100)) + data[i + random.randint(0, 100):]
+                    new_f.write(data)
+
+            start = time.time()
+            with old_path.open('rb') as f:
+                hashes = list(zip(*blockchecksums(f, blocksize=CHUNK_SIZE)))
+            signature_time = time.time() - start
+
+            start = time.time()
+            with new_path.open('rb') as f:
+                delta = rsyncdelta(f, hashes, blocksize=CHUNK_SIZE)
+            delta_time = time.time() - start
+
+            start = time.time()
+            with old_path.open('rb') as unpatched, patched_path.open('wb') as save_to:
+                patchstream(unpatched, save_to, delta)
+            patch_time = time.time() - start
+
+            assert filecmp.cmp(patched_path, new_path, shallow=False)
+            literal = sum([len(e) for e in delta[1:] if isinstance(e, bytes)])
+            print(f'size: {size} MB, signatures: {size / signature_time:.1f} MB/s, delta: {size / delta_time:.1f} MB/s, '
+                  f'patch: {size / patch_time:.1f} MB/s, delta data: {literal} bytes')
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option('--files', default=1000, help='the count of the small files')
+@click.option('--file-size', default=4096, help='the size of every file')
+@click.option('--latency', default=20, help='the latency (ms) of every request on the stub backup node')
+@click.option('--workers', default=8, help='the count of the concurrent transfers')
+def v1_transfer(files, file_size, latency, workers):
+    """ files/s of putting the small files of the v1 backup by one worker and by the pool, with a stub backup node """
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from hive.main.hive_backup import HiveBackup
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_PUT(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(latency / 1000)
+            self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+    server = Server(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = f'http://127.0.0.1:{server.server_port}'
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_list = []
+        for i in range(files):
+            path = Path(tmp_dir) / f'file_{i}'
+            path.write_bytes(os.urandom(file_size))
+            file_list.append([path.as_posix(), f'file_{i}'])
+
+        from hive.util.file_transfer import FileTransfer
+        for count in sorted({1, workers}):
+            transfer = FileTransfer(host, 'token', workers=count, retries=0)
+            start = time.time()
+            failed = transfer.run('v1-transfer', file_list, HiveBackup.put_file)
+            elapsed = time.time() - start
+            print(f'workers: {count}, files: {files}, latency: {latency} ms, '
+                  f'{(files - len(failed)) / elapsed:.1f} files/s, failed: {len(failed)}')
+    server.shutdown()
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option('--subscribers', default='10,100,1000,10000', help='the counts of the subscribers, separated by comma')
+@click.option('--messages', default=20, help='the count of the published messages for every count of the subscribers')
+def pubsub_publish(subscribers, messages):
+    """ publish latency of the v1 pubsub by the count of the subscribers, the message log against one copy per subscriber, needs MongoDB """
+    import hive.settings
+    from hive.util.constants import PUB_CHANNEL_COLLECTION, SUB_MESSAGE_COLLECTION, SUB_MESSAGE_SUBSCRIBE_ID
+    from hive.util.pubsub.pb_exchanger import pubsub_push_message
+    from hive.util.pubsub.publisher import pubsub_get_col, pub_setup_channel, pub_remove_channel, \
+        pubsub_get_subscribe_id, pub_init_message_log, pub_get_subscriber_list
+
+    hive.settings.hive_setting.init_config()
+    pub_init_message_log()
+    pub_did, pub_appid = 'did:elastos:benchmark', 'benchmark'
+    for count in [int(s) for s in subscribers.split(',')]:
+        channel = f'benchmark_channel_{count}'
+        pub_setup_channel(pub_did, pub_appid, channel)
+        pubsub_get_col(PUB_CHANNEL_COLLECTION).insert_many([{
+            '_id': pubsub_get_subscribe_id(pub_did, pub_appid, channel, f'did:elastos:sub{i}', 'benchmark'),
+            'pub_did': pub_did, 'pub_appid': pub_appid, 'channel_name': channel,
+            'sub_did': f'did:elastos:sub{i}', 'sub_appid': 'benchmark', 'last_seq': 0} for i in range(count)])
+        try:
+            start = time.time()
+            for i in range(messages):
+                pubsub_push_message(pub_did, pub_appid, channel, f'message_{i}', time.time())
+            log_time = (time.time() - start) / messages
+
+            # the previous way: one message document for every subscriber.
+            start = time.time()
+            legacy_messages = max(messages // 10, 1)
+            for i in range(legacy_messages):
+                for sub in pub_get_subscriber_list(pub_did, pub_appid, channel):
+                    pubsub_get_col(SUB_MESSAGE_COLLECTION).insert_one({SUB_MESSAGE_SUBSCRIBE_ID: sub['_id'],
+                                                                       'message_data': f'message_{i}'})
+            copy_time = (time.time() - start) / legacy_messages
+            print(f'subscribers: {count}, publish latency: message log {log_time * 1000:.2f} ms, '
+                  f'copy per subscriber {copy_time * 1000:.2f} ms')
+        finally:
+            pub_remove_channel(pub_did, pub_appid, channel)
+            ids = [pubsub_get_subscribe_id(pub_did, pub_appid, channel, f'did:elastos:sub{i}', 'benchmark')
+                   for i in range(count)]
+            pubsub_get_col(SUB_MESSAGE_COLLECTION).delete_many({SUB_MESSAGE_SUBSCRIBE_ID: {'$in': ids}})
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option('--consumers', default='1,4,16', help='the counts of the concurrent consumers, separated by comma')
+@click.option('--messages', default=10000, help='the count of the messages to pop')
+@click.option('--limit', default=10, help='the count of the messages of every pop')
+@click.option('--legacy', is_flag=True, help='pop the messages stored for every subscriber by the previous versions')
+def pubsub_pop(consumers, messages, limit, legacy):
+    """ throughput of the concurrent consumers popping the same v1 pubsub subscription, needs MongoDB """
+    import threading
+    import hive.settings
+    from hive.util.constants import PUB_CHANNEL_COLLECTION, SUB_MESSAGE_COLLECTION, SUB_MESSAGE_SUBSCRIBE_ID, \
+        SUB_MESSAGE_DATA, SUB_MESSAGE_TIME, PUB_CHANNEL_LEGACY_MESSAGES
+    from hive.util.pubsub.publisher import pubsub_get_col, pub_setup_channel, pub_remove_channel, pub_add_subscriber, \
+        pub_append_message, pubsub_get_channel_id, pubsub_get_subscribe_id
+    from hive.util.pubsub.subscriber import sub_pop_messages, sub_migrate_messages
+
+    hive.settings.hive_setting.init_config()
+    sub_migrate_messages()
+    pub_did, pub_appid, channel, sub_did = 'did:elastos:benchmark', 'benchmark', 'benchmark_pop', 'did:elastos:sub'
+    subscribe_id = pubsub_get_subscribe_id(pub_did, pub_appid, channel, sub_did, 'benchmark')
+    for count in [int(s) for s in consumers.split(',')]:
+        pub_setup_channel(pub_did, pub_appid, channel)
+        pub_add_subscriber(pub_did, pub_appid, channel, sub_did, 'benchmark')
+        if legacy:
+            pubsub_get_col(SUB_MESSAGE_COLLECTION).insert_many([{
+                SUB_MESSAGE_SUBSCRIBE_ID: subscribe_id, SUB_MESSAGE_DATA: i, SUB_MESSAGE_TIME: i} for i in range(messages)])
+            pubsub_get_col(PUB_CHANNEL_COLLECTION).update_one({'_id': subscribe_id},
+                                                              {'$set': {PUB_CHANNEL_LEGACY_MESSAGES: True}})
+        else:
+            for i in range(messages):
+                pub_append_message(pubsub_get_channel_id(pub_did, pub_appid, channel), i, i)
+
+        popped = []
+
+        def consume():
+            while True:
+                message_list = sub_pop_messages(pub_did, pub_appid, channel, sub_did, 'benchmark', limit)
+                if not message_list:
+                    break
+                popped.extend([m['message'] for m in message_list])
+
+        try:
+            threads = [threading.Thread(target=consume) for _ in range(count)]
+            start = time.time()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.time() - start
+            print(f'consumers: {count}, {"legacy" if legacy else "message log"}, {len(popped) / elapsed:.0f} messages/s, '
+                  f'popped: {len(popped)}, duplicated: {len(popped) - len(set(popped))}, missed: {messages - len(set(popped))}')
+        finally:
+            pub_remove_channel(pub_did, pub_appid, channel)
+            pubsub_get_col(SUB_MESSAGE_COLLECTION).delete_many({SUB_MESSAGE_SUBSCRIBE_ID: subscribe_id})
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option('--sizes', default='4096,65536,262144,1048576,4194304', help='the buffer sizes (bytes), separated by comma')
+@click.option('--file-size', default=256, help='the size (MB) of the data of every operation')
+def io_chunks(sizes, file_size):
+    """ speed matrix of the buffer sizes for every kind of I/O operation and the best ones on this hardware """
+    import hashlib
+    import socket
+    import threading
+    from src.utils.io_tuning import IOTuning
+
+    class NullWriter:
+        def write(self, data):
+            return len(data)
+
+    def receive(size, path):
+        # the data comes from the local socket.
+        server, client = socket.socketpair()
+        with server, client:
+            def send():
+                block = os.urandom(1024 * 1024)
+                for _ in range(file_size):
+                    client.sendall(block)
+                client.shutdown(socket.SHUT_WR)
+            sender = threading.Thread(target=send)
+            sender.start()
+            IOTuning.copy_stream(server.makefile('rb', buffering=0), NullWriter(), chunk_size=size)
+            sender.join()
+
+    def write(size, path):
+        # the source file is in the page cache after the first run.
+        with open(src_path, 'rb') as data, IOTuning.open_for_write(path, buffer_size=size) as f:
+            IOTuning.copy_stream(data, f, chunk_size=size)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def hash_file(size, path):
+        IOTuning.update_hash(hashlib.sha256(), path, chunk_size=size)
+
+    def response(size, path):
+        with open(path, 'rb') as f:
+            for _ in IOTuning.read_chunks(f, chunk_size=size):
+                pass
+
+    size_list = [int(s) for s in sizes.split(',')]
+    operations = [(IOTuning.RECEIVE, receive), (IOTuning.WRITE, write), (IOTuning.HASH, hash_file), (IOTuning.RESPONSE, response)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = src_path = Path(tmp_dir) / 'data'
+        with path.open('wb') as f:
+            for _ in range(file_size):
+                f.write(os.urandom(1024 * 1024))
+
+        print(f'size: {file_size} MB, speed: MB/s')
+        print('operation'.ljust(10) + ''.join([str(s).rjust(10) for s in size_list]))
+        best = dict()
+        for name, fn in operations:
+            speeds = list()
+            for size in size_list:
+                start = time.time()
+                fn(size, path if name != IOTuning.WRITE else Path(tmp_dir) / 'written')
+                speeds.append(file_size / max(time.time() - start, 1e-6))
+            best[name] = size_list[speeds.index(max(speeds))]
+            print(name.ljust(10) + ''.join([f'{v:.0f}'.rjust(10) for v in speeds]))
+
+    print(f'IO_RECEIVE_CHUNK_SIZE = {best[IOTuning.RECEIVE]}')
+    print(f'IO_WRITE_BUFFER_SIZE = {best[IOTuning.WRITE]}')
+    print(f'IO_HASH_CHUNK_SIZE = {best[IOTuning.HASH]}')
+    print(f'IO_RESPONSE_CHUNK_SIZE = {best[IOTuning.RESPONSE]}')
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option('--url', default='http://localhost:5000/api/v2/node/version', help='the URL of the running node to request by GET')
+@click.option('--concurrency', default='1,16,64', help='the counts of the concurrent clients, separated by comma')
+@click.option('--seconds', default=10, help='the duration of every count of the clients')
+def server_throughput(url, concurrency, seconds):
+    """ requests/s and latency of the running node, compare 'manage.py runserver' with 'gunicorn -c gunicorn.conf.py wsgi:app' """
+    import threading
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    for count in [int(c) for c in concurrency.split(',')]:
+        latencies, errors, lock = list(), [0], threading.Lock()
+        deadline = time.time() + seconds
+
+        def client():
+            session = requests.Session()
+            session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            while time.time() < deadline:
+                start = time.time()
+                try:
+                    ok = session.get(url, timeout=30).status_code < 500
+                except requests.RequestException:
+                    ok = False
+                with lock:
+                    if ok:
+                        latencies.append(time.time() - start)
+                    else:
+                        errors[0] += 1
+
+        threads = [threading.Thread(target=client) for _ in range(count)]
+        start_time = time.time()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.time() - start_time
+
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0
+        print(f'clients: {count}, {len(latencies) / elapsed:.0f} requests/s, p50: {p50:.1f} ms, p99: {p99:.1f} ms, errors: {errors[0]}')
+
+
+# run by a new interpreter: time the execution of every module imported by the target module.
+# the loading of the module is done by '_load_unlocked' of the import system (also on python 3.6).
+IMPORT_PROFILER = """
+import json, sys, time
+_bootstrap = sys.modules['_frozen_importlib']
+_load_unlocked, stats, stack = _bootstrap._load_unlocked, dict(), list()
+
+def load_timed(spec):
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return _load_unlocked(spec)
+    finally:
+        total = time.perf_counter() - start
+        children = stack.pop()
+        if stack:
+            stack[-1] += total
+        stats[spec.name] = (total, total - children)
+
+_bootstrap._load_unlocked = load_timed
+start = time.perf_counter()
+__import__(sys.argv[1])
+total = time.perf_counter() - start
+_bootstrap._load_unlocked = _load_unlocked
+print('RESULT:' + json.dumps({'total': total, 'modules': stats}))
+"""
+
+
+def run_python(code, *args) -> str:
+    """ Run the code by a new interpreter in the root folder of the node and return the result printed after 'RESULT:',
+    the other output (such as the logs) is ignored. """
+    import subprocess
+    import sys
+
+    root = Path(__file__).resolve().parents[2]
+    result = subprocess.run([sys.executable, '-c', code] + list(args), cwd=root.as_posix(), stdout=subprocess.PIPE, check=True)
+    lines = [line for line in result.stdout.decode('utf-8').splitlines() if line.startswith('RESULT:')]
+    return lines[-1][len('RESULT:'):]
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option('--module', default='wsgi', help='the module to import, "wsgi" imports the node and creates the application')
+@click.option('--top', default=30, help='the count of the slowest modules to show')
+def import_time(module, top):
+    """ the cumulative and the self time of every module imported by the module, and the cost of every package """
+    import json
+
+    result = json.loads(run_python(IMPORT_PROFILER, module))
+    modules = result['modules']
+    print(f'import {module}: {result["total"] * 1000:.0f} ms, {len(modules)} modules')
+
+    print('cumulative(ms)'.rjust(14) + 'self(ms)'.rjust(10) + '  module')
+    for name, (total, self_) in sorted(modules.items(), key=lambda i: i[1][0], reverse=True)[:top]:
+        print(f'{total * 1000:.1f}'.rjust(14) + f'{self_ * 1000:.1f}'.rjust(10) + f'  {name}')
+
+    # the self time of the modules of the same top package, such as web3, pymongo.
+    packages = collections.defaultdict(float)
+    for name, (_, self_) in modules.items():
+        packages[name.split('.')[0]] += self_
+    print('self(ms)'.rjust(14) + '  package')
+    for name, self_ in sorted(packages.items(), key=lambda i: i[1], reverse=True)[:top]:
+        print(f'{self_ * 1000:.1f}'.rjust(14) + f'  {name}')
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option('--module', default='wsgi', help='the module to import, "wsgi" imports the node and creates the application')
+@click.option('--runs', default=5, help='the count of the starts by the new interpreters')
+@click.option('--budget', default=0.0, help='the limit (seconds) of the median start time, exit with 1 if exceeded, 0 means no limit')
+def startup_time(module, runs, budget):
+    """ the time and the peak memory to start the node, check the regression by the budget """
+    import statistics
+    import sys
+
+    code = 'import resource, sys, time\n' \
+           'start = time.perf_counter()\n' \
+           '__import__(sys.argv[1])\n' \
+           'print("RESULT:", time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)'
+    times, memories = list(), list()
+    for _ in range(runs):
+        elapsed, max_rss = run_python(code, module).split()
+        times.append(float(elapsed))
+        memories.append(int(max_rss))
+
+    median = statistics.median(times)
+    print(f'import {module}: median {median:.3f} s, min {min(times):.3f} s, max {max(times):.3f} s, '
+          f'peak memory {max(memories) / 1024:.1f} MB, runs: {runs}')
+    if budget and median > budget:
+        print(f'the start time exceeds the budget {budget:.3f} s.')
+        sys.exit(1)
+
+
+@click.group(context_settings=CONTEXT_SETTINGS)
+def group_command():
+    """ benchmark tools for hive node """
+
+
+if __name__ == '__main__':
+    group_command.add_command(backup_manifest)
+    group_command.add_command(encryption)
+    group_command.add_command(backup_pipeline)
+    group_command.add_command(compression)
+    group_command.add_command(rsync_delta)
+    group_command.add_command(v1_transfer)
+    group_command.add_command(pubsub_publish)
+    group_command.add_command(pubsub_pop)
+    group_command.add_command(io_chunks)
+    group_command.add_command(server_throughput)
+    group_command.add_command(import_time)
+    group_command.add_command(startup_time)
+    group_command()
@@ -99,7 +99,7 @@ def try_to_get_info_for_v1_token():
 
 
 class TokenParser:
-    EXCEPT_URLS = ['/api/v2/about/version', '/api/v2/node/version', '/api/v2/about/commit_id', '/api/v2/node/commit_id',
+    EXCEPT_URLS = ['/api/v2/about/version', '/api/v2/node/version', '/api/v2/about/commit_id', '/api/v2/node/commit_id', '/api/v2/node/ready',
                    URL_V2 + URL_SIGN_IN, URL_V2 + URL_AUTH, URL_V2 + URL_BACKUP_AUTH]
     INTERNAL_URLS = [URL_V2 + URL_SERVER_INTERNAL_BACKUP, URL_V2 + URL_SERVER_INTERNAL_STATE, URL_V2 + URL_SERVER_INTERNAL_RESTORE]
     SCRIPTING_PREFIX = URL_V2 + '/vault/scripting'
@@ -36,6 +36,8 @@ VAULT_SERVICE_STATE_FREEZE = "freeze"  # read, but not write
 VAULT_SERVICE_STATE_REMOVED = "removed"  # soft unsubscribe
 
 VAULT_SERVICE_LATEST_ACCESS_TIME = "latest_access_time"  # for access checking on database, files, scripting.
+VAULT_SERVICE_STORAGE_COUNT_TIME = "storage_count_time"  # the start time of the latest recount of the storage usage.
+VAULT_SERVICE_OPERATIONS = "operations"  # the ids of the resumable operations which already changed the storage usage.
 # constants of db end
 
 # for backup server collection
@@ -158,10 +160,12 @@ COL_IPFS_FILES_IS_FILE = 'is_file'
 COL_IPFS_FILES_IPFS_CID = 'ipfs_cid'
 COL_IPFS_FILES_IS_ENCRYPT = 'is_encrypt'
 COL_IPFS_FILES_ENCRYPT_METHOD = 'encrypt_method'
+COL_IPFS_FILES_DELETING = 'deleting'  # the id of the folder deletion which the file belongs to.
 # end of ipfs_files
 
 # ipfs_cid_ref
 COL_IPFS_CID_REF = 'ipfs_cid_ref'
+COL_IPFS_CID_REF_OPERATIONS = 'operations'  # the ids of the resumable operations which already changed the count.
 # end of ipfs_cid_ref
 
 # collection_metadata
@@ -173,6 +177,53 @@ COL_COLLECTION_METADATA_IS_ENCRYPT = 'is_encrypt'
 COL_COLLECTION_METADATA_ENCRYPT_METHOD = 'encrypt_method'
 # end of collection_metadata
 
+# query_cursor
+COL_QUERY_CURSOR = 'query_cursor'
+COL_QUERY_CURSOR_USR_DID = USR_DID
+COL_QUERY_CURSOR_APP_DID = APP_DID
+COL_QUERY_CURSOR_COLLECTION = 'collection'
+COL_QUERY_CURSOR_FILTER = 'filter'
+COL_QUERY_CURSOR_OPTIONS = 'options'
+COL_QUERY_CURSOR_SKIP = 'skip'
+COL_QUERY_CURSOR_REMAINING = 'remaining'
+COL_QUERY_CURSOR_PAGE_SIZE = 'page_size'
+COL_QUERY_CURSOR_EXPIRE_AT = 'expire_at'
+# end of query_cursor
+
+# lease
+COL_LEASE = 'lease'
+COL_LEASE_OWNER = 'owner'
+COL_LEASE_EXPIRE_AT = 'expire_at'
+COL_LEASE_RENEW_AT = 'renew_at'
+COL_LEASE_DONE_AT = 'done_at'
+COL_LEASE_CHECKPOINT = 'checkpoint'
+# end of lease
+
+# job_status
+COL_JOB_STATUS = 'job_status'
+COL_JOB_STATUS_OWNER = 'owner'
+COL_JOB_STATUS_LAST_RUN = 'last_run'
+COL_JOB_STATUS_DURATION = 'duration'
+COL_JOB_STATUS_ITEMS = 'items'
+COL_JOB_STATUS_STATE = 'state'
+COL_JOB_STATUS_ERROR = 'error'
+COL_JOB_STATUS_PROGRESS = 'progress'
+# end of job_status
+
+# migration
+COL_MIGRATION = 'migration'
+COL_MIGRATION_DONE_AT = 'done_at'
+COL_MIGRATION_OWNER = 'owner'
+# end of migration
+
+# startup
+COL_STARTUP = 'startup'
+COL_STARTUP_BOOT_ID = 'boot_id'
+COL_STARTUP_STATE = 'state'
+COL_STARTUP_TASKS = 'tasks'
+COL_STARTUP_UPDATED = 'updated'
+# end of startup
+
 # anonymous_files
 COL_ANONYMOUS_FILES = '__anonymous_files__'
 COL_ANONYMOUS_FILES_USR_DID = USR_DID
@@ -202,6 +253,8 @@ BACKUP_REQUEST_STATE_MSG = 'state_msg'
 BACKUP_REQUEST_TARGET_HOST = 'target_host'
 BACKUP_REQUEST_TARGET_DID = 'target_did'
 BACKUP_REQUEST_TARGET_TOKEN = 'target_token'
+BACKUP_REQUEST_MANIFEST = 'manifest'  # the manifest of the latest successful backup, for incremental backup.
+BACKUP_REQUEST_STATS = 'stats'  # the duration and the transferred size of the latest successful backup.
 
 # For backup subscription.
 BKSERVER_REQ_ACTION = 'req_action'
@@ -211,6 +264,7 @@ BKSERVER_REQ_CID = 'req_cid'
 BKSERVER_REQ_SHA256 = 'req_sha256'
 BKSERVER_REQ_SIZE = 'req_size'
 BKSERVER_REQ_PUBLIC_KEY = 'public_key'
+BKSERVER_REQ_BASE_CID = 'req_base_cid'  # the root cid of the previous successful backup.
 
 # @deprecated
 URL_BACKUP_SERVICE = '/api/v2/internal_backup/service'
@@ -9,7 +9,7 @@ from src.utils.consts import DID
 from src.utils.http_exception import BadRequestException, HiveException
 from src.settings import hive_setting
 from src.utils.did.eladid_wrapper import DIDStore, DIDDocument, RootIdentity, Issuer, Credential, JWTBuilder, Presentation
-from src.modules.files.local_file import LocalFile
+from src.utils.temp_files import temp_files
 
 
 class Entity:
@@ -46,17 +46,12 @@ class Entity:
         except Exception as e:
             raise RuntimeError(f'get_verified_owner_did: invalid value of NODE_CREDENTIAL')
 
-        file_path = LocalFile.generate_tmp_file_path()
-        with open(file_path, 'w') as f:
-            ret_val = f.write(file_content_str)
-            f.flush()
+        with temp_files.scope() as scope:
+            file_path = scope.new_path()
+            with open(file_path, 'w') as f:
+                f.write(file_content_str)
 
-        try:
             self.did_store.import_did(file_path.as_posix(), passphrase)
-        except Exception as ex:
-            raise ex
-        finally:
-            file_path.unlink()
 
     def load_existed_did(self):
         dids = self.did_store.list_dids()
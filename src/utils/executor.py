@@ -1,4 +1,5 @@
 import logging
+import threading
 from concurrent.futures import ThreadPoolExecutor
 
 from flask_executor import Executor
@@ -11,13 +12,18 @@ from src.modules.backup.backup_server import BackupServer
 from src.modules.scripting.scripting import Scripting
 from src.modules.subscription.vault import VaultManager
 from src.utils import hive_job
+from src.utils.leader import leader
+from src.utils.startup import Startup
 from src.utils.scheduler import count_vault_storage_really
 from src.utils.consts import VAULT_SERVICE_COL, VAULT_SERVICE_DID, HIVE_MODE_TEST, VAULT_SERVICE_PRICING_USING, COL_IPFS_BACKUP_SERVER, \
     VAULT_BACKUP_SERVICE_USING, COL_ORDERS, COL_ORDERS_PRICING_NAME, COL_RECEIPTS
 
 executor = Executor()
 # DOCS https://docs.python.org/3/library/concurrent.futures.html#concurrent.futures.ThreadPoolExecutor
+# the thread to run the startup tasks, see submit_startup_tasks().
 pool = ThreadPoolExecutor(1)
+startup_lock = threading.Lock()
+STARTUP_BOOT_KEY = 'startup_boot_id'
 
 
 @executor.job
@@ -112,7 +118,6 @@ def update_vault_databases_usage_task(user_did: str, full_url: str):
         logging.getLogger('AFTER REQUEST').info(f'Succeeded to update_vault_databases_usage({user_did}), {full_url}')
 
 
-@hive_job('retry_backup_when_reboot', 'executor')
 def retry_backup_when_reboot_task():
     """ retry maybe because interrupt by reboot
 
@@ -124,7 +129,6 @@ def retry_backup_when_reboot_task():
     server.retry_backup_request()
 
 
-@hive_job('sync_app_dids', tag='executor')
 def sync_app_dids_task():
     """ Used for syncing exist user_did's app_dids to the 'application' collection
 
@@ -144,7 +148,6 @@ def sync_app_dids_task():
             user_manager.add_app_if_not_exists(user_did, app_did)
 
 
-@hive_job('count_vault_storage_executor', tag='executor')
 def count_vault_storage_task():
     """ Recount the usage size of all vaults.
 
@@ -153,7 +156,6 @@ def count_vault_storage_task():
     count_vault_storage_really()
 
 
-@hive_job('rename_pricing_name_executor', tag='executor')
 def rename_pricing_name():
     """ Rename pricing name: Free, Rookie, Advanced -> Basic, Standard, Premium
 
@@ -187,7 +189,34 @@ def init_executor(app, mode):
         app.config['EXECUTOR_TYPE'] = 'thread'
         app.config['EXECUTOR_MAX_WORKERS'] = 5
 
-        pool.submit(retry_backup_when_reboot_task)
-        pool.submit(sync_app_dids_task)
-        pool.submit(count_vault_storage_task)
-        pool.submit(rename_pricing_name)
+        leader.add_listener(on_elected=submit_startup_tasks)
+
+
+def submit_startup_tasks():
+    """ The startup tasks run on the leader process once for every start of the node.
+
+    The deprecated migrations run once for the MongoDB, the storage recount needs the synced applications,
+    so it runs after the migrations. The start is only recorded as done after all the tasks finish,
+    then the new leader runs them again if the previous one exits during them.
+    """
+    if not leader.is_leader or leader.is_done_for_boot(STARTUP_BOOT_KEY):
+        return
+
+    # this process may be elected again when the startup tasks are still running.
+    if not startup_lock.acquire(blocking=False):
+        return
+
+    startup = Startup()
+    startup.add_migration('sync_app_dids', sync_app_dids_task)
+    startup.add_migration('rename_pricing_name', rename_pricing_name)
+    startup.add_task('retry_backup_when_reboot', retry_backup_when_reboot_task)
+    startup.add_task('count_vault_storage', count_vault_storage_task)
+
+    def run_startup():
+        try:
+            startup.run()
+            leader.set_done_for_boot(STARTUP_BOOT_KEY)
+        finally:
+            startup_lock.release()
+
+    pool.submit(run_startup)
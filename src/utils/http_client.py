@@ -3,11 +3,11 @@
 """
 Http client for backup or other modules.
 """
-import pickle
 from pathlib import Path
 
 import requests
 
+from hive.util.pyrsync import decode_delta
 from src.modules.files.local_file import LocalFile
 from src.utils.http_exception import BadRequestException, HiveException
 
@@ -45,9 +45,9 @@ class HttpClient:
         r = self.get(url, access_token, is_body=False, stream=True)
         LocalFile.write_file_by_response(r, file_path, use_temp=True)
 
-    def post(self, url, access_token, body, is_json=True, is_body=True, success_code=201, timeout=None, **kwargs):
+    def post(self, url, access_token, body, is_json=True, is_body=True, success_code=201, timeout=None, headers=None, **kwargs):
         try:
-            headers = dict()
+            headers = dict(headers) if headers else dict()
             if access_token:
                 headers["Authorization"] = "token " + access_token
             if is_json:
@@ -68,9 +68,10 @@ class HttpClient:
         with open(file_path, 'rb') as f:
             self.post(url, access_token, body=f, is_json=False, is_body=False)
 
-    def post_to_pickle_data(self, url, access_token, body=None):
+    def post_to_delta(self, url, access_token, body=None):
+        """ Get the delta (hive.util.pyrsync binary format) which is decoded while receiving. """
         r = self.post(url, access_token, body, is_json=False, is_body=False, stream=True)
-        return pickle.loads(r.content)
+        return decode_delta(r.raw)
 
     def put(self, url, access_token, body, is_body=False):
         try:
@@ -86,6 +86,7 @@ class BadRequestException(HiveException):
     INVALID_PARAMETER = 1
     BACKUP_IS_IN_PROCESS = 2
     ELADID_ERROR = 3
+    QUERY_TIMEOUT = 4
 
     code = 400
     internal_code = HiveException.NO_INTERNAL_CODE
@@ -115,6 +116,13 @@ class ElaDIDException(BadRequestException):
         super().__init__(msg)
 
 
+class QueryTimeoutException(BadRequestException):
+    internal_code = BadRequestException.QUERY_TIMEOUT
+
+    def __init__(self, msg='The query exceeds the time limit.'):
+        super().__init__(msg)
+
+
 # UnauthorizedException
 
 
@@ -159,6 +167,7 @@ class NotFoundException(HiveException):
     ORDER_NOT_FOUND = 7
     RECEIPT_NOT_FOUND = 8
     APPLICATION_NOT_FOUND = 9
+    CURSOR_NOT_FOUND = 10
 
     code = 404
     internal_code = HiveException.NO_INTERNAL_CODE
@@ -230,6 +239,13 @@ class ReceiptNotFoundException(NotFoundException):
         super().__init__(msg)
 
 
+class CursorNotFoundException(NotFoundException):
+    internal_code = NotFoundException.CURSOR_NOT_FOUND
+
+    def __init__(self, msg='The query cursor can not be found or is expired.'):
+        super().__init__(msg)
+
+
 # AlreadyExistsException
 
 
@@ -263,6 +279,17 @@ class NotImplementedException(HiveException):
         super().__init__(msg)
 
 
+# ServiceUnavailableException
+
+
+class ServiceUnavailableException(HiveException):
+    code = 503
+    internal_code = HiveException.NO_INTERNAL_CODE
+
+    def __init__(self, msg='Service unavailable.'):
+        super().__init__(msg)
+
+
 # InsufficientStorageException
 
 
@@ -8,11 +8,13 @@ import logging
 import typing as t
 
 from werkzeug.exceptions import HTTPException
-from flask import request, make_response, jsonify
+from flask import request, make_response, jsonify, Response
 from flask_restful import Api
+from pymongo.errors import ExecutionTimeout
 from sentry_sdk import capture_exception
 
-from src.utils.http_exception import HiveException, InternalServerErrorException
+from src.utils.http_exception import HiveException, InternalServerErrorException, QueryTimeoutException
+from src.utils.json_stream import JsonItems, iter_json
 
 
 class HiveApi(Api):
@@ -33,7 +35,11 @@ class HiveApi(Api):
         :param data: the data returned by the API class method.
         :return: response object
         """
-        resp = super().make_response(data, *args, **kwargs)
+        if JsonItems.contains(data):
+            # the documents of the database are encoded while sending.
+            resp = Response(iter_json(data), mimetype='application/json')
+        else:
+            resp = super().make_response(data, *args, **kwargs)
         resp.status_code = HiveApi._get_resp_success_code()
         return resp
 
@@ -44,7 +50,10 @@ class HiveApi(Api):
             return jsonify(HiveException.get_flask_error_dict(e.description)), e.code
 
         ex = e
-        if not isinstance(e, HiveException):
+        if isinstance(e, ExecutionTimeout):
+            # the user query exceeds DATABASE_QUERY_MAX_TIME_MS.
+            ex = QueryTimeoutException(f'The query exceeds the time limit: {str(e)}')
+        elif not isinstance(e, HiveException):
             # to be treated as an unexpected exception
             msg = f'V2 internal error: {str(e)}, {traceback.format_exc()}'
             logging.getLogger('http response').error(msg)
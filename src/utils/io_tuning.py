@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+"""
+The buffer sizes of the file I/O operations and the helpers to read and write by the reusable buffers.
+"""
+import typing as t
+
+from src import hive_setting
+
+
+class IOTuning:
+    """ Every kind of I/O operation has its own configurable buffer size, the best sizes on the hardware
+    can be found by the benchmark 'io-chunks'.
+
+    - receive: read the request body or the response body from the network.
+    - write: the buffer of the local file for writing.
+    - hash: read the local file to calculate the hash.
+    - response: read the local file for the response body.
+    """
+
+    RECEIVE = 'receive'
+    WRITE = 'write'
+    HASH = 'hash'
+    RESPONSE = 'response'
+
+    @staticmethod
+    def get_size(kind: str) -> int:
+        if kind == IOTuning.RECEIVE:
+            return hive_setting.IO_RECEIVE_CHUNK_SIZE
+        elif kind == IOTuning.WRITE:
+            return hive_setting.IO_WRITE_BUFFER_SIZE
+        elif kind == IOTuning.HASH:
+            return hive_setting.IO_HASH_CHUNK_SIZE
+        elif kind == IOTuning.RESPONSE:
+            return hive_setting.IO_RESPONSE_CHUNK_SIZE
+        raise ValueError(f'Unknown I/O operation: {kind}')
+
+    @staticmethod
+    def open_for_write(file_path, mode='wb', buffer_size: int = None):
+        """ Open the local file for writing with the buffer size of the disk writing. """
+        return open(file_path, mode, buffering=buffer_size if buffer_size else IOTuning.get_size(IOTuning.WRITE))
+
+    @staticmethod
+    def copy_stream(src: t.BinaryIO, dst: t.BinaryIO, chunk_size: int = None) -> int:
+        """ Copy all data from src to dst through one reusable buffer, return the size of the data.
+
+        The stream without 'readinto' (such as the request stream of werkzeug) is read chunk by chunk.
+        """
+        chunk_size = chunk_size if chunk_size else IOTuning.get_size(IOTuning.RECEIVE)
+        total = 0
+
+        if not hasattr(src, 'readinto'):
+            while True:
+                data = src.read(chunk_size)
+                if not data:
+                    break
+                dst.write(data)
+                total += len(data)
+            return total
+
+        view = memoryview(bytearray(chunk_size))
+        while True:
+            size = src.readinto(view)
+            if not size:
+                break
+            dst.write(view[:size])
+            total += size
+        return total
+
+    @staticmethod
+    def update_hash(hasher, file_path, chunk_size: int = None):
+        """ Update the hash object (hashlib) by the content of the local file, return the hash object. """
+        view = memoryview(bytearray(chunk_size if chunk_size else IOTuning.get_size(IOTuning.HASH)))
+        with open(file_path, 'rb', buffering=0) as f:
+            while True:
+                size = f.readinto(view)
+                if not size:
+                    break
+                hasher.update(view[:size])
+        return hasher
+
+    @staticmethod
+    def read_chunks(f: t.BinaryIO, length: int = None, chunk_size: int = None) -> t.Iterator[bytes]:
+        """ Read the data of the length (or to the end) from the current position chunk by chunk for the response.
+
+        Every chunk is a new object because the server may keep it after the yielding.
+        """
+        chunk_size = chunk_size if chunk_size else IOTuning.get_size(IOTuning.RESPONSE)
+        while length is None or length > 0:
+            data = f.read(chunk_size if length is None else min(chunk_size, length))
+            if not data:
+                break
+            if length is not None:
+                length -= len(data)
+            yield data
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+"""
+Coordinate the scheduler jobs of all processes and nodes sharing the same MongoDB.
+"""
+import hashlib
+import logging
+import socket
+import threading
+import time
+import typing as t
+from datetime import datetime
+
+from src import hive_setting
+from src.modules.database.mongodb_client import MongodbClient
+from src.utils.consts import COL_JOB_STATUS, COL_JOB_STATUS_OWNER, COL_JOB_STATUS_LAST_RUN, COL_JOB_STATUS_DURATION, \
+    COL_JOB_STATUS_ITEMS, COL_JOB_STATUS_STATE, COL_JOB_STATUS_ERROR, COL_JOB_STATUS_PROGRESS, COL_LEASE_DONE_AT, COL_LEASE_CHECKPOINT
+from src.utils.lease import Lease
+
+
+class JobLease:
+    """ The lease of the running job, it is renewed by the heartbeat thread every third of the TTL
+    until the job finishes, then released.
+
+        with JobLease('expire_vault_job') as lease:
+            if lease.acquired:
+                ...
+
+    If the heartbeat fails to renew (such as the job blocks MongoDB for a long time), 'lost' is set and the job
+    should stop as another process may take over.
+    """
+
+    def __init__(self, name, ttl: int = None):
+        self.lease = Lease(f'job:{name}', ttl if ttl else hive_setting.JOB_LEASE_TTL)
+        self.acquired = False
+        self.lost = False
+        self.stopped = threading.Event()
+        self.heartbeat = None
+
+    def __enter__(self):
+        self.acquired = self.lease.acquire()
+        if self.acquired:
+            self.heartbeat = threading.Thread(target=self.__renew, daemon=True)
+            self.heartbeat.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.acquired:
+            self.stopped.set()
+            self.heartbeat.join()
+            if not self.lost:
+                self.lease.release()
+
+    def __renew(self):
+        while not self.stopped.wait(max(self.lease.ttl / 3, 1)):
+            try:
+                renewed = self.lease.acquire()
+            except Exception as e:
+                logging.error(f'[JobLease] Failed to renew the lease {self.lease.name}: {str(e)}')
+                renewed = False
+            if not renewed:
+                logging.error(f'[JobLease] The lease {self.lease.name} is lost.')
+                self.lost = True
+                return
+
+    def get_done_at(self) -> float:
+        doc = self.lease.get()
+        return doc.get(COL_LEASE_DONE_AT, 0) if doc else 0
+
+    def set_done(self):
+        """ Record the time the work of the lease is done and clear the checkpoint, see run_shards(). """
+        self.lease.set(COL_LEASE_DONE_AT, time.time())
+        self.lease.set(COL_LEASE_CHECKPOINT, None)
+
+    def get_checkpoint(self):
+        """ The position saved by the previous holder which does not finish the work. """
+        doc = self.lease.get()
+        return doc.get(COL_LEASE_CHECKPOINT) if doc else None
+
+    def set_checkpoint(self, checkpoint):
+        self.lease.set(COL_LEASE_CHECKPOINT, checkpoint)
+
+
+class JobStatus:
+    """ The last run of every job: the owner process, the start time, the duration, the count of the processed items
+    and the result. """
+
+    def __init__(self):
+        self.mcli = MongodbClient()
+
+    def __get_collection(self):
+        return self.mcli.get_management_collection(COL_JOB_STATUS)
+
+    def record(self, name, start: float, items: t.Optional[int], error: t.Optional[str]):
+        update = {'$set': {
+            COL_JOB_STATUS_OWNER: Lease.get_owner_id(),
+            COL_JOB_STATUS_LAST_RUN: int(start),
+            COL_JOB_STATUS_DURATION: round(time.time() - start, 3),
+            COL_JOB_STATUS_ITEMS: items if items is not None else 0,
+            COL_JOB_STATUS_STATE: 'failed' if error else 'success',
+            COL_JOB_STATUS_ERROR: error if error else ''}}
+        self.__get_collection().update_one({'_id': name}, update, contains_extra=False, upsert=True)
+
+    def update_progress(self, name, progress: dict):
+        """ The progress of the running job, such as the counts of the handled items. """
+        update = {'$set': {COL_JOB_STATUS_PROGRESS: {**progress, 'updated': int(time.time())}}}
+        self.__get_collection().update_one({'_id': name}, update, contains_extra=False, upsert=True)
+
+    def get_all(self) -> t.List[dict]:
+        docs = self.__get_collection().find_many({})
+        return [{'name': d['_id'],
+                 'owner': d.get(COL_JOB_STATUS_OWNER, ''),
+                 'last_run': d.get(COL_JOB_STATUS_LAST_RUN, 0),
+                 'duration': d.get(COL_JOB_STATUS_DURATION, 0),
+                 'items': d.get(COL_JOB_STATUS_ITEMS, 0),
+                 'state': d.get(COL_JOB_STATUS_STATE, ''),
+                 'error': d.get(COL_JOB_STATUS_ERROR, ''),
+                 'progress': d.get(COL_JOB_STATUS_PROGRESS, {})} for d in docs]
+
+
+def leased_job(name, exclusive=True, per_node=False):
+    """ A decorator for the scheduler job to run it on one process only and record the status.
+
+    The job function returns the count of the processed items or None.
+
+        @scheduler.task('interval', id='expire_vault_job', days=1)
+        @hive_job('expire_vault_job')
+        @leased_job('expire_vault_job')
+        def expire_vault_job():
+            ...
+
+    :param name: The job name.
+    :param exclusive: If False, the job does not take the lease of the whole job,
+        the work is shared by the leases of the shards, see run_shards().
+    :param per_node: The job handles the local data of the node (such as the temporary files), one process of
+        every node runs it.
+    """
+
+    def job_decorator(f: t.Callable[..., t.Optional[int]]) -> t.Callable[..., None]:
+        def wrapper(*args, **kwargs):
+            lease_name = f'{name}@{socket.gethostname()}' if per_node else name
+            with JobLease(lease_name) if exclusive else _NoLease() as lease:
+                if not lease.acquired:
+                    logging.getLogger('scheduler').debug(f'{lease_name} is running on another process, skip.')
+                    return
+
+                start, items, error = time.time(), None, None
+                try:
+                    items = f(*args, **kwargs)
+                except Exception as e:
+                    error = str(e)
+                    raise
+                finally:
+                    try:
+                        JobStatus().record(lease_name, start, items, error)
+                    except Exception as e:
+                        logging.getLogger('scheduler').error(f'Failed to record the status of {lease_name}: {str(e)}')
+        return wrapper
+    return job_decorator
+
+
+class _NoLease:
+    acquired = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+def get_shard(key: str, shards: int) -> int:
+    """ The shard of the key (such as the user DID) is same on all nodes. """
+    return int(hashlib.md5(key.encode('utf-8')).hexdigest(), 16) % shards
+
+
+def run_shards(name, handle_shard: t.Callable[[int, int, JobLease], int], shards: int = None, min_interval: int = 0) -> int:
+    """ Split the work of the job into the shards, every shard is handled by the process holding its lease,
+    so the processes of the nodes running the job at the same time share the work.
+
+    :param name: The job name.
+    :param handle_shard: handle_shard(shard, shards, lease) handles the items of the shard and returns the count
+        of them, the lease (JobLease) keeps the checkpoint of the shard.
+    :param shards: The count of the shards, JOB_SHARDS by default.
+    :param min_interval: The shard done in the seconds is skipped, then the work is not repeated by the later runs
+        of the other nodes.
+    :return: the count of the items handled by this process.
+    """
+    shards, total = shards if shards else hive_setting.JOB_SHARDS, 0
+    for shard in range(shards):
+        with JobLease(f'{name}:shard:{shard}') as lease:
+            if not lease.acquired or time.time() - lease.get_done_at() < min_interval:
+                continue
+
+            total += handle_shard(shard, shards, lease)
+            if not lease.lost:
+                lease.set_done()
+    logging.getLogger('scheduler').info(f'{name} handled {total} items at {str(datetime.now())}')
+    return total
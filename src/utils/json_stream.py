@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+"""
+Encode the response body to the extended JSON while sending it, the documents of the database queries are not
+kept in memory as a whole list.
+"""
+import itertools
+import json
+import typing as t
+
+from bson import json_util
+
+from src import hive_setting
+
+
+class JsonItems:
+    """ The documents (such as a pymongo cursor) in the response body, they are encoded to the extended JSON
+    one by one when the response body is sent.
+
+    The cursor is closed after all documents sent or the client disconnects.
+    """
+
+    def __init__(self, docs: t.Iterable[dict], limit: int = None):
+        """
+        :param docs: The documents or the cursor.
+        :param limit: Only send the first documents and check whether there are more ones (has_more).
+        """
+        self.cursor = docs
+        self.docs = docs
+        self.limit = limit
+        self.has_more = False
+
+    def __iter__(self):
+        for i, doc in enumerate(self.docs):
+            if self.limit is not None and i >= self.limit:
+                self.has_more = True
+                break
+            yield doc
+
+    def prefetch(self) -> 'JsonItems':
+        """ Get the first document now, then the errors of the query are raised before sending the response. """
+        docs = iter(self.docs)
+        first = next(docs, None)
+        self.docs = docs if first is None else itertools.chain([first], docs)
+        return self
+
+    def close(self):
+        if hasattr(self.cursor, 'close'):
+            self.cursor.close()
+
+    @staticmethod
+    def contains(value) -> bool:
+        """ Whether the response data contains any JsonItems or JsonValue. """
+        if isinstance(value, (JsonItems, JsonValue)):
+            return True
+        elif isinstance(value, dict):
+            return any(JsonItems.contains(v) for v in value.values())
+        elif isinstance(value, (list, tuple)):
+            return any(JsonItems.contains(v) for v in value)
+        return False
+
+    @staticmethod
+    def to_list(value):
+        """ Load all documents of the JsonItems to the normal json objects, for the non-stream usages. """
+        if isinstance(value, JsonItems):
+            try:
+                return json.loads(json_util.dumps(list(value)))
+            finally:
+                value.close()
+        elif isinstance(value, JsonValue):
+            return JsonItems.to_list(value.get())
+        elif isinstance(value, dict):
+            return {k: JsonItems.to_list(v) for k, v in value.items()}
+        elif isinstance(value, (list, tuple)):
+            return [JsonItems.to_list(v) for v in value]
+        return value
+
+
+class JsonValue:
+    """ The value which is got when it is sent, after the JsonItems before it in the response body,
+    such as whether there are more documents after the sent ones. """
+
+    def __init__(self, get_value: t.Callable[[], t.Any]):
+        self.get = get_value
+
+
+def iter_json(data, chunk_size: int = None) -> t.Iterator[bytes]:
+    """ Encode the response data to the JSON text chunk by chunk, the JsonItems inside are encoded one document
+    by one document and the text is sent when it reaches the chunk size. """
+    chunk_size = chunk_size if chunk_size else hive_setting.IO_RESPONSE_CHUNK_SIZE
+    items = list()
+    try:
+        parts, size = list(), 0
+        for part in _iter_parts(data, items):
+            parts.append(part)
+            size += len(part)
+            if size >= chunk_size:
+                yield ''.join(parts).encode('utf-8')
+                parts, size = list(), 0
+        if parts:
+            yield ''.join(parts).encode('utf-8')
+    finally:
+        for item in items:
+            item.close()
+
+
+def _iter_parts(value, items: list) -> t.Iterator[str]:
+    if isinstance(value, JsonItems):
+        items.append(value)
+        yield '['
+        for i, doc in enumerate(value):
+            if i > 0:
+                yield ', '
+            yield json_util.dumps(doc)
+        yield ']'
+        value.close()
+    elif isinstance(value, JsonValue):
+        yield from _iter_parts(value.get(), items)
+    elif isinstance(value, dict):
+        yield '{'
+        for i, (k, v) in enumerate(value.items()):
+            if i > 0:
+                yield ', '
+            yield json.dumps(str(k))
+            yield ': '
+            yield from _iter_parts(v, items)
+        yield '}'
+    elif isinstance(value, (list, tuple)):
+        yield '['
+        for i, v in enumerate(value):
+            if i > 0:
+                yield ', '
+            yield from _iter_parts(v, items)
+        yield ']'
+    else:
+        yield json_util.dumps(value)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+"""
+Elect the leader process which runs the scheduler jobs and the startup tasks.
+"""
+import logging
+import socket
+import threading
+import typing as t
+
+from src import hive_setting
+from src.utils.lease import Lease
+from src.utils.prefork import prefork
+
+
+class Leader:
+    """ All processes of the node (the workers of the pre-fork server) try to acquire the lease 'leader@<host name>'
+    in MongoDB, the one holding it is the leader and renews it every third of LEADER_LEASE_TTL. Every node sharing
+    the same MongoDB has its own leader, the jobs of the leaders are coordinated by the job leases (job_lease.py).
+
+    If the leader process exits, another one takes over after the lease expires. The listeners are called
+    when this process is elected or loses the lease (such as the network error to MongoDB).
+    """
+
+    LEASE_NAME = 'leader'
+
+    def __init__(self):
+        self.lease = None
+        self.is_leader = False
+        self.thread = None
+        self.stopped = threading.Event()
+        self.on_elected: t.List[t.Callable[[], None]] = list()
+        self.on_lost: t.List[t.Callable[[], None]] = list()
+
+    def add_listener(self, on_elected: t.Callable[[], None] = None, on_lost: t.Callable[[], None] = None):
+        if on_elected:
+            self.on_elected.append(on_elected)
+        if on_lost:
+            self.on_lost.append(on_lost)
+
+    def start(self):
+        if self.thread:
+            return
+        self.lease = Lease(f'{Leader.LEASE_NAME}@{socket.gethostname()}', hive_setting.LEADER_LEASE_TTL)
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.__run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """ Stop the election and release the lease if held. """
+        self.stopped.set()
+        if self.is_leader:
+            self.__set_leader(False)
+            self.lease.release()
+
+    def reset_after_fork(self):
+        """ The thread of the election does not exist in the forked process. """
+        self.thread, self.is_leader = None, False
+
+    def is_done_for_boot(self, key) -> bool:
+        """ Whether the work of the key is done for the current start of the node, such as the startup tasks.
+        The work is recorded by set_done_for_boot() after it finishes, so the next leader runs it again
+        if the previous one exits during it. """
+        doc = self.lease.get()
+        return doc is not None and doc.get(key) == prefork.get_boot_id()
+
+    def set_done_for_boot(self, key) -> bool:
+        """ Record the work of the key is done for the current start of the node, see is_done_for_boot(). """
+        return self.is_leader and self.lease.set(key, prefork.get_boot_id())
+
+    def __run(self):
+        while not self.stopped.is_set():
+            try:
+                acquired = self.lease.acquire()
+            except Exception as e:
+                logging.error(f'[Leader] Failed to acquire the lease: {str(e)}')
+                acquired = False
+
+            if acquired != self.is_leader:
+                self.__set_leader(acquired)
+            self.stopped.wait(max(hive_setting.LEADER_LEASE_TTL / 3, 1))
+
+    def __set_leader(self, is_leader):
+        self.is_leader = is_leader
+        logging.info(f'[Leader] This process ({Lease.get_owner_id()}) {"is elected" if is_leader else "loses"} the leader.')
+        for callback in (self.on_elected if is_leader else self.on_lost):
+            try:
+                callback()
+            except Exception as e:
+                logging.error(f'[Leader] Failed to call the listener: {str(e)}')
+
+
+leader = Leader()
+prefork.register_after_fork(leader.reset_after_fork)
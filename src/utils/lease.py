@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+"""
+The leases in MongoDB which make only one process of the node (or the nodes sharing the same MongoDB) do the work.
+"""
+import os
+import socket
+import typing as t
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+from src.modules.database.mongodb_client import MongodbClient
+from src.utils.consts import COL_LEASE, COL_LEASE_OWNER, COL_LEASE_EXPIRE_AT, COL_LEASE_RENEW_AT
+
+
+class Lease:
+    """ The lease is held by one owner (process) until it expires, the owner renews it before the expiration.
+
+    The owner ID contains the host name and the pid, so it is different in every worker process.
+    """
+
+    def __init__(self, name, ttl: int):
+        """
+        :param name: The unique name of the lease.
+        :param ttl: The seconds the lease is held after acquiring or renewing.
+        """
+        self.name = name
+        self.ttl = ttl
+        self.mcli = MongodbClient()
+
+    @staticmethod
+    def get_owner_id():
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def __get_collection(self):
+        return self.mcli.get_management_collection(COL_LEASE)
+
+    def acquire(self) -> bool:
+        """ Acquire the lease if it is free or expired, or renew it if held by this process. """
+        now, owner = datetime.utcnow(), Lease.get_owner_id()
+        filter_ = {'_id': self.name, '$or': [{COL_LEASE_OWNER: owner}, {COL_LEASE_EXPIRE_AT: {'$lt': now}}]}
+        update = {'$set': {COL_LEASE_OWNER: owner, COL_LEASE_EXPIRE_AT: now + timedelta(seconds=self.ttl), COL_LEASE_RENEW_AT: now}}
+        try:
+            # the lease held by the others is not matched and the upsert fails by the duplicated '_id'.
+            self.__get_collection().find_one_and_update(filter_, update, upsert=True)
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def release(self):
+        """ Release the lease if held by this process, then the others can acquire it immediately. """
+        filter_ = {'_id': self.name, COL_LEASE_OWNER: Lease.get_owner_id()}
+        self.__get_collection().update_one(filter_, {'$set': {COL_LEASE_EXPIRE_AT: datetime.utcfromtimestamp(0)}}, contains_extra=False)
+
+    def set(self, key, value) -> bool:
+        """ Set the field of the lease if it is held by this process. """
+        filter_ = {'_id': self.name, COL_LEASE_OWNER: Lease.get_owner_id()}
+        return self.__get_collection().update_one(filter_, {'$set': {key: value}}, contains_extra=False)['matched_count'] > 0
+
+    def get(self) -> t.Optional[dict]:
+        return self.__get_collection().find_one({'_id': self.name})
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+"""
+Support the pre-fork server (gunicorn, see gunicorn.conf.py): the connection pools and the threads created
+before fork can not be used by the worker processes.
+"""
+import logging
+import os
+import typing as t
+import uuid
+
+
+class Prefork:
+    """ The master process of the pre-fork server records its pid in the environment variable HIVE_PREFORK_MASTER_PID,
+    the application may be loaded by the master (preload_app) or by every worker.
+
+    - register_after_fork: the callbacks to reset the connection pools (MongoDB, HTTP sessions, etc.) in the worker.
+    - start_in_worker: the threads (schedulers, leader election) are started in the worker, not the master.
+    """
+
+    MASTER_PID = 'HIVE_PREFORK_MASTER_PID'
+    BOOT_ID = 'HIVE_BOOT_ID'
+
+    def __init__(self):
+        self.after_fork_callbacks: t.List[t.Callable[[], None]] = list()
+        self.pending_starts: t.List[t.Callable[[], None]] = list()
+
+    @staticmethod
+    def is_master():
+        return os.environ.get(Prefork.MASTER_PID) == str(os.getpid())
+
+    @staticmethod
+    def get_boot_id():
+        """ The ID is same for all workers of the same start of the server. """
+        return os.environ.setdefault(Prefork.BOOT_ID, uuid.uuid4().hex)
+
+    def register_after_fork(self, callback: t.Callable[[], None]):
+        self.after_fork_callbacks.append(callback)
+
+    def start_in_worker(self, start: t.Callable[[], None]):
+        if Prefork.is_master():
+            self.pending_starts.append(start)
+        else:
+            start()
+
+    def after_fork(self):
+        """ Called by the worker process after fork (the hook 'post_fork' of gunicorn). """
+        for callback in self.after_fork_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logging.error(f'[Prefork] Failed to reset after fork: {str(e)}')
+
+        starts, self.pending_starts = self.pending_starts, list()
+        for start in starts:
+            start()
+
+
+prefork = Prefork()
@@ -1,3 +1,9 @@
+# -*- coding: utf-8 -*-
+
+"""
+The response of the file content with the range support, it comes from the package 'flask_rangerequest'
+and reads the file by the tuned chunk size (see IOTuning).
+"""
 import binascii
 import hashlib
 
@@ -6,7 +12,71 @@ from flask import Response, abort, request
 from io import BytesIO
 from werkzeug.http import parse_date, http_date
 
-from ._utils import parse_range_header
+from src.utils.io_tuning import IOTuning
+
+
+def parse_range_header(range_header: str, target_size: int) -> list:
+    end_index = target_size - 1
+    if range_header is None:
+        return [(0, end_index)]
+
+    bytes_ = 'bytes='
+    if not range_header.startswith(bytes_):
+        abort(416)
+
+    ranges = []
+    for range_ in range_header[len(bytes_):].split(','):
+        split = range_.split('-')
+        if len(split) == 1:
+            try:
+                start = int(split[0])
+                end = end_index
+            except ValueError:
+                abort(416)
+        elif len(split) == 2:
+            start, end = split[0], split[1]
+            if not start:
+                # parse ranges of the form "bytes=-100" (i.e., last 100 bytes)
+                end = end_index
+                try:
+                    start = end - int(split[1]) + 1
+                except ValueError:
+                    abort(416)
+            else:
+                # parse ranges of the form "bytes=100-200"
+                try:
+                    start = int(start)
+                    if not end:
+                        end = target_size
+                    else:
+                        end = int(end)
+                except ValueError:
+                    abort(416)
+
+                if end < start:
+                    abort(416)
+
+                end = min(end, end_index)
+        else:
+            abort(416)
+
+        ranges.append((start, end))
+
+    # merge the ranges
+    merged = []
+    ranges = sorted(ranges, key=lambda x: x[0])
+    for range_ in ranges:
+        # initial case
+        if not merged:
+            merged.append(range_)
+        else:
+            # merge ranges that are adjacent or overlapping
+            if range_[0] <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(range_[1], merged[-1][1]))
+            else:
+                merged.append(range_)
+
+    return merged
 
 
 class RangeRequest:
@@ -42,14 +112,7 @@ class RangeRequest:
         if size is not None:
             self.__size = size
         else:
-            # TODO this is stupid, but good enough for now
-            self.__size = 0
-            while True:
-                chunk = self.__data.read(4096)
-                if chunk:
-                    self.__size += len(chunk)
-                else:
-                    break
+            self.__size = self.__data.seek(0, 2)
             self.__data.seek(0)
 
     def make_response(self) -> Response:
@@ -110,14 +173,7 @@ class RangeRequest:
     def __generate(self, ranges: list, readable):
         for (start, end) in ranges:
             readable.seek(start)
-            bytes_left = end - start + 1
-
-            chunk_size = 4096
-            while bytes_left > 0:
-                read_size = min(chunk_size, bytes_left)
-                chunk = readable.read(read_size)
-                bytes_left -= read_size
-                yield chunk
+            yield from IOTuning.read_chunks(readable, end - start + 1)
 
         readable.close()
 
@@ -125,8 +181,9 @@ class RangeRequest:
     def make_etag(cls, data):
         hasher = hashlib.sha256()
 
+        chunk_size = IOTuning.get_size(IOTuning.HASH)
         while True:
-            read_bytes = data.read(4096)
+            read_bytes = data.read(chunk_size)
             if read_bytes:
                 hasher.update(read_bytes)
             else:
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+"""
+Run the startup tasks of the node and record the readiness of the node.
+"""
+import logging
+import socket
+import time
+import traceback
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+
+from sentry_sdk import capture_exception
+
+from src import hive_setting
+from src.modules.database.mongodb_client import MongodbClient
+from src.utils.consts import COL_MIGRATION, COL_MIGRATION_DONE_AT, COL_MIGRATION_OWNER, COL_STARTUP, COL_STARTUP_BOOT_ID, \
+    COL_STARTUP_STATE, COL_STARTUP_TASKS, COL_STARTUP_UPDATED
+from src.utils.job_lease import JobLease
+from src.utils.lease import Lease
+from src.utils.prefork import prefork
+
+
+class Startup:
+    """ The startup tasks run on the leader process once for every start of the node (see submit_startup_tasks()).
+
+    - migration: the one-shot migration of the data, it is recorded in the collection 'migration' after done,
+        then never runs again on any node sharing the same MongoDB. The failed one runs again on the next start.
+        The one running on another node is waited for, and run here if that node does not finish it.
+    - task: runs on every start in the background after the migrations, such as retrying the interrupted backups.
+
+    The migrations run in parallel by the pool (STARTUP_WORKERS), the node is ready after all of them finish,
+    then the tasks run in parallel. The state of the node (by the host name) is kept in the collection 'startup',
+    every worker process answers the readiness by it, see get_state().
+    """
+
+    STATE_STARTING = 'starting'
+    STATE_READY = 'ready'
+
+    TASK_PENDING = 'pending'
+    TASK_RUNNING = 'running'
+    TASK_WAITING = 'waiting'
+    TASK_DONE = 'done'
+    TASK_SKIPPED = 'skipped'
+    TASK_FAILED = 'failed'
+
+    # the interval (seconds) to check the migration running on another node.
+    MIGRATION_CHECK_INTERVAL = 5
+
+    def __init__(self):
+        self.migrations: t.List[t.Tuple[str, t.Callable[[], None]]] = list()
+        self.tasks: t.List[t.Tuple[str, t.Callable[[], None]]] = list()
+        self.mcli = MongodbClient()
+
+    def add_migration(self, name, migrate: t.Callable[[], None]):
+        self.migrations.append((name, migrate))
+
+    def add_task(self, name, task: t.Callable[[], None]):
+        self.tasks.append((name, task))
+
+    @staticmethod
+    def __get_node_id():
+        return socket.gethostname()
+
+    def run(self):
+        """ Run the migrations and the tasks, this blocks until all of them finish. """
+        names = [name for name, _ in self.migrations + self.tasks]
+        self.__set_state(Startup.STATE_STARTING, {name: Startup.TASK_PENDING for name in names})
+
+        start = time.time()
+        with ThreadPoolExecutor(max(hive_setting.STARTUP_WORKERS, 1)) as pool:
+            list(pool.map(lambda m: self.__run_migration(*m), self.migrations))
+            self.__set_state(Startup.STATE_READY)
+            logging.info(f'[Startup] The node is ready after {time.time() - start:.2f} seconds.')
+
+            list(pool.map(lambda task: self.__run_task(*task), self.tasks))
+
+    def __run_migration(self, name, migrate):
+        while True:
+            if self.__is_migrated(name):
+                self.__set_task_state(name, Startup.TASK_SKIPPED)
+                return
+
+            with JobLease(f'migration:{name}') as lease:
+                # check again as another node may finish it just before releasing the lease.
+                if lease.acquired and self.__is_migrated(name):
+                    self.__set_task_state(name, Startup.TASK_SKIPPED)
+                    return
+
+                if lease.acquired:
+                    if self.__run_task(name, migrate) and not lease.lost:
+                        update = {'$set': {COL_MIGRATION_DONE_AT: int(time.time()), COL_MIGRATION_OWNER: Lease.get_owner_id()}}
+                        self.mcli.get_management_collection(COL_MIGRATION).update_one({'_id': name}, update, contains_extra=False, upsert=True)
+                    return
+
+            # the migration is running on another node, the node is not ready until it is done or run here.
+            self.__set_task_state(name, Startup.TASK_WAITING)
+            time.sleep(Startup.MIGRATION_CHECK_INTERVAL)
+
+    def __is_migrated(self, name):
+        return self.mcli.get_management_collection(COL_MIGRATION).find_one({'_id': name}) is not None
+
+    def __run_task(self, name, task) -> bool:
+        self.__set_task_state(name, Startup.TASK_RUNNING)
+        start = time.time()
+        try:
+            task()
+        except Exception as e:
+            msg = f'{name}: {str(e)}, {traceback.format_exc()}'
+            logging.error(f'[Startup] Failed to run the startup task {msg}')
+            capture_exception(error=Exception(f'startup UNEXPECTED: {msg}'))
+            self.__set_task_state(name, Startup.TASK_FAILED)
+            return False
+
+        logging.info(f'[Startup] The startup task {name} is done in {time.time() - start:.2f} seconds.')
+        self.__set_task_state(name, Startup.TASK_DONE)
+        return True
+
+    def __set_state(self, state, tasks: dict = None):
+        update = {COL_STARTUP_BOOT_ID: prefork.get_boot_id(), COL_STARTUP_STATE: state, COL_STARTUP_UPDATED: int(time.time())}
+        if tasks is not None:
+            update[COL_STARTUP_TASKS] = tasks
+        self.__update({'$set': update})
+
+    def __set_task_state(self, name, state):
+        self.__update({'$set': {f'{COL_STARTUP_TASKS}.{name}': state, COL_STARTUP_UPDATED: int(time.time())}})
+
+    def __update(self, update):
+        try:
+            self.mcli.get_management_collection(COL_STARTUP).update_one({'_id': Startup.__get_node_id()}, update, contains_extra=False, upsert=True)
+        except Exception as e:
+            logging.error(f'[Startup] Failed to record the startup state: {str(e)}')
+
+    def get_state(self) -> dict:
+        """ The state of this node for the current start, the previous start of the node is treated as starting. """
+        doc = self.mcli.get_management_collection(COL_STARTUP).find_one({'_id': Startup.__get_node_id()})
+        if not doc or doc.get(COL_STARTUP_BOOT_ID) != prefork.get_boot_id():
+            return {'ready': False, 'state': Startup.STATE_STARTING, 'tasks': {}}
+        return {'ready': doc.get(COL_STARTUP_STATE) == Startup.STATE_READY,
+                'state': doc.get(COL_STARTUP_STATE),
+                'tasks': doc.get(COL_STARTUP_TASKS, {})}
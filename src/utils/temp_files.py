@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+"""
+The temporary files of the node: allocated, tracked and removed by the scope even if an exception raises.
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+import typing as t
+from pathlib import Path
+
+from src import hive_setting
+
+
+class TempScope:
+    """ The temporary files created in the scope are removed when the scope exits.
+
+        with temp_files.scope() as scope:
+            temp_file = scope.new_path()
+            ...
+            plain_path = scope.track(Encryption.decrypt_file_with_curve25519(temp_file, ...))
+
+    The file moved to the final place (such as the cache of the vault) should be released by 'keep',
+    then the path is not removed.
+    """
+
+    def __init__(self, files: 'TempFiles'):
+        self.files = files
+        self.paths: t.List[Path] = list()
+
+    def new_path(self) -> Path:
+        return self.track(self.files.new_path())
+
+    def track(self, path: Path) -> Path:
+        """ Track the temporary file created by the others, such as the encrypted file beside the plain one. """
+        self.files.track(path)
+        self.paths.append(path)
+        return path
+
+    def keep(self, path: Path):
+        self.files.release(path, remove=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        for path in self.paths:
+            self.files.release(path)
+        self.paths.clear()
+
+
+class TempFiles:
+    """ The registry of the temporary files of this process.
+
+    The temporary folder is under DATA_STORE_PATH as the caches of the vaults, so moving the temporary file
+    to the cache is a rename on the same file system. Every process has its own sub-folder (by the pid) and the
+    file is created by 'tempfile.mkstemp', so the name is unique for the concurrent requests without checking.
+    The files leaked by the killed processes are removed by 'clean_orphans' of the scheduler job.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.files: t.Dict[str, float] = dict()  # the path of the tracked file -> the time of the tracking
+
+    @staticmethod
+    def get_temp_dir() -> Path:
+        return Path(hive_setting.get_temp_dir())
+
+    @staticmethod
+    def get_process_dir() -> Path:
+        """ The sub-folder of this process, the pid is different after fork. """
+        return TempFiles.get_temp_dir() / str(os.getpid())
+
+    def allocate(self) -> Path:
+        """ Create the new empty temporary file and return the path, the caller removes it. """
+        process_dir = TempFiles.get_process_dir()
+        try:
+            fd, path = tempfile.mkstemp(dir=process_dir.as_posix())
+        except FileNotFoundError:
+            # the first file of the process, or the empty folder is removed by 'clean_orphans'.
+            process_dir.mkdir(exist_ok=True, parents=True)
+            fd, path = tempfile.mkstemp(dir=process_dir.as_posix())
+        os.close(fd)
+        return Path(path)
+
+    def new_path(self) -> Path:
+        """ Create the new empty temporary file which is tracked, see allocate(). """
+        return self.track(self.allocate())
+
+    def scope(self) -> TempScope:
+        return TempScope(self)
+
+    def track(self, path: Path) -> Path:
+        with self.lock:
+            self.files[path.as_posix()] = time.time()
+        return path
+
+    def release(self, path: Path, remove=True):
+        """ Stop tracking the path and remove the file if it is tracked, the released path is never removed
+        because the name may be reused by the new temporary file. """
+        with self.lock:
+            tracked = self.files.pop(path.as_posix(), None) is not None
+        if remove and tracked:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def __iter_files(self) -> t.Iterator[os.DirEntry]:
+        def iter_dir(dir_path):
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        yield from iter_dir(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry
+
+        tmp_dir = TempFiles.get_temp_dir()
+        if tmp_dir.exists():
+            yield from iter_dir(tmp_dir.as_posix())
+
+    def clean_orphans(self, max_age: int) -> int:
+        """ Remove the files which are not tracked by this process and not modified in max_age seconds,
+        and the empty sub-folders of the other processes, return the count of the removed files. """
+        with self.lock:
+            tracked = set(self.files.keys())
+
+        count, deadline = 0, time.time() - max_age
+        for entry in self.__iter_files():
+            try:
+                if entry.path not in tracked and entry.stat(follow_symlinks=False).st_mtime < deadline:
+                    os.unlink(entry.path)
+                    count += 1
+            except FileNotFoundError:
+                pass
+
+        tmp_dir, process_dir = TempFiles.get_temp_dir(), TempFiles.get_process_dir()
+        if tmp_dir.exists():
+            for sub_dir in tmp_dir.iterdir():
+                if sub_dir.is_dir() and sub_dir != process_dir:
+                    try:
+                        sub_dir.rmdir()
+                    except OSError:
+                        pass  # not empty
+        if count:
+            logging.info(f'[TempFiles] Removed {count} orphan temporary files.')
+        return count
+
+    def get_usage(self) -> dict:
+        """ The count and the total size of the files in the temporary folder of the node. """
+        files, size = 0, 0
+        for entry in self.__iter_files():
+            try:
+                size += entry.stat(follow_symlinks=False).st_size
+                files += 1
+            except FileNotFoundError:
+                pass
+        return {'files': files, 'size': size}
+
+
+temp_files = TempFiles()
@@ -5,7 +5,7 @@ from flask_restful import Api
 
 from src import hive_setting
 from src.utils.consts import URL_SIGN_IN, URL_AUTH, URL_BACKUP_AUTH, URL_SERVER_INTERNAL_BACKUP, URL_SERVER_INTERNAL_RESTORE, URL_SERVER_INTERNAL_STATE
-from src.view import about, auth, subscription, database, files, scripting, payment, backup, provider
+from src.view import about, auth, subscription, database, files, scripting, backup, provider
 
 
 def init_app(api: Api):
@@ -37,12 +37,14 @@ def init_app(api: Api):
     api.add_resource(database.Delete, '/vault/db/collection/<collection_name>', endpoint='database.delete')
     api.add_resource(database.Find, '/vault/db/<collection_name>', endpoint='database.find')
     api.add_resource(database.Query, '/vault/db/query', endpoint='database.query')
+    api.add_resource(database.QueryMore, '/vault/db/query/<cursor_id>', endpoint='database.query_more')
 
     # files service
     api.add_resource(files.ReadingOperation, '/vault/files/<folder_path:path>', endpoint='files.reading_operation')
     api.add_resource(files.WritingOperation, '/vault/files/<path:path>', endpoint='files.writing_operation')
     api.add_resource(files.MoveFile, '/vault/files/<path:path>', endpoint='files.move_file')
     api.add_resource(files.DeleteFile, '/vault/files/<path:path>', endpoint='files.delete_file')
+    api.add_resource(files.Batch, '/vault/files', endpoint='files.batch')
 
     # scripting service
     api.add_resource(scripting.GetScripts, '/vault/scripting/scripts', endpoint='scripting.get_scripts')
@@ -65,6 +67,7 @@ def init_app(api: Api):
     api.add_resource(provider.Vaults, '/provider/vaults', endpoint='provider.vaults')
     api.add_resource(provider.Backups, '/provider/backups', endpoint='provider.backups')
     api.add_resource(provider.FilledOrders, '/provider/filled_orders', endpoint='provider.filled_orders')
+    api.add_resource(provider.Jobs, '/provider/jobs', endpoint='provider.jobs')
 
     # about service
     # INFO: one class with two lines for the documentation to hide '/about', so don't combine them.
@@ -73,9 +76,11 @@ def init_app(api: Api):
     api.add_resource(about.CommitId, '/node/commit_id', endpoint='node.commit_id')
     api.add_resource(about.CommitId, '/about/commit_id', endpoint='about.commit_id')
     api.add_resource(about.NodeInfo, '/node/info', endpoint='node.info')
+    api.add_resource(about.NodeReady, '/node/ready', endpoint='node.ready')
 
     if hive_setting.PAYMENT_ENABLED:
-        # payment service
+        # payment service, the payment module (web3) is imported only if enabled.
+        from src.view import payment
         api.add_resource(payment.Version, '/payment/version', endpoint='payment.version')
         api.add_resource(payment.PlaceOrder, '/payment/order', endpoint='payment.place_order')
         api.add_resource(payment.SettleOrder, '/payment/order/<order_id>', endpoint='payment.settle_order')
@@ -72,6 +72,49 @@ class CommitId(Resource):
         return self.about.get_commit_id()
 
 
+class NodeReady(Resource):
+    def __init__(self):
+        self.about = About()
+
+    def get(self):
+        """ Get the readiness of this hive node, the node is ready after the startup migrations are done.
+        This is for the health check of the load balancer. No authentication is required.
+
+        .. :quickref: 08 About; Get Node Readiness
+
+        **Request**:
+
+        .. sourcecode:: http
+
+            None
+
+        **Response OK**:
+
+        .. sourcecode:: http
+
+            HTTP/1.1 200 OK
+
+        .. code-block:: json
+
+            {
+                "ready": true,
+                "state": "ready",
+                "tasks": {
+                    "sync_app_dids": <pending|running|waiting|done|skipped|failed>,
+                    "retry_backup_when_reboot": <pending|running|waiting|done|skipped|failed>
+                }
+            }
+
+        **Response Error**:
+
+        .. sourcecode:: http
+
+            HTTP/1.1 503 Service Unavailable
+
+        """
+        return self.about.get_node_ready()
+
+
 class NodeInfo(Resource):
     def __init__(self):
         self.about = About()
@@ -111,7 +154,9 @@ class NodeInfo(Resource):
                 "memory_used": <int>,
                 "memory_total": <int>,
                 "storage_used": <int>,
-                "storage_total": <int>
+                "storage_total": <int>,
+                "temp_files": <the count of the temporary files|int>,
+                "temp_size": <the size of the temporary files|int>
             }
 
         **Response Error**:
@@ -210,7 +210,9 @@ class ServerInternalState(Resource):
         self.backup_server = BackupServer()
 
     def get(self):
-        return self.backup_server.internal_backup_state()
+        return self.backup_server.internal_backup_state(rqargs.get_int('wait')[0],
+                                                        rqargs.get_str('result')[0] or None,
+                                                        rqargs.get_str('message')[0] or None)
 
 
 class ServerInternalRestore(Resource):
@@ -468,7 +468,7 @@ class Find(Resource):
 
             filter: (json str)  # the filter doc need to be encoded by url
             skip: (int)         # optional
-            limit: (int)        # optional
+            limit: (int)        # optional, the count of the documents of all pages, no limit by default.
 
         **Request**:
 
@@ -494,9 +494,14 @@ class Find(Resource):
                     "modified": {
                         "$date": 1598803861786
                     }
-                }]
+                }],
+                "is_encrypt": false,
+                "encrypt_method": "",
+                "cursor_id": "5f497bb83bd36ab235d82e6a"  # null if no more pages, see 'Query More'.
             }
 
+        Only the first page (DATABASE_PAGE_SIZE documents) is returned, the next pages can be got by the cursor ID.
+
         **Response Error**:
 
         .. sourcecode:: http
@@ -548,7 +553,8 @@ class Query(Resource):
                     "allow_partial_results": false,
                     "return_key": false,
                     "show_record_id": false,
-                    "batch_size": 0
+                    "batch_size": 0,
+                    "page_size": 100  # the count of the documents of every page, DATABASE_PAGE_SIZE by default.
                 }
             }
 
@@ -580,7 +586,10 @@ class Query(Resource):
                     "modified": {
                         "$date": 1598803861786
                     }
-                }]
+                }],
+                "is_encrypt": false,
+                "encrypt_method": "",
+                "cursor_id": "5f497bb83bd36ab235d82e6a"  # null if no more pages, see 'Query More'.
             }
 
         **Response Error**:
@@ -604,3 +613,94 @@ class Query(Resource):
         options = RV.get_body().get_opt('options', dict, {})
 
         return self.database_service.query_document(collection_name, filter_, options)
+
+
+class QueryMore(Resource):
+    def __init__(self):
+        self.database_service = DatabaseService()
+
+    def get(self, cursor_id):
+        """ Get the next page of the find or query by the cursor ID of the previous page.
+
+        .. :quickref: 03 Database; Get the next page
+
+        **Request**:
+
+        .. code-block:: json
+
+            None
+
+        **Response OK**:
+
+        .. sourcecode:: http
+
+            HTTP/1.1 200 OK
+
+        .. code-block:: json
+
+            {
+                "items": [{
+                    "author": "john doe1_1",
+                    "title": "Eve for Dummies1_1",
+                    "created": {
+                        "$date": 1630022400000
+                    },
+                    "modified": {
+                        "$date": 1598803861786
+                    }
+                }],
+                "is_encrypt": false,
+                "encrypt_method": "",
+                "cursor_id": "5f497bb83bd36ab235d82e6a"  # null if no more pages.
+            }
+
+        The cursor expires after DATABASE_CURSOR_TTL seconds without access.
+
+        **Response Error**:
+
+        .. sourcecode:: http
+
+            HTTP/1.1 400 Bad Request
+
+        .. sourcecode:: http
+
+            HTTP/1.1 401 Unauthorized
+
+        .. sourcecode:: http
+
+            HTTP/1.1 404 Not Found
+
+        """
+
+        return self.database_service.query_more(cursor_id)
+
+    def delete(self, cursor_id):
+        """ Close the cursor if the next pages are not needed.
+
+        .. :quickref: 03 Database; Close the cursor
+
+        **Request**:
+
+        .. code-block:: json
+
+            None
+
+        **Response OK**:
+
+        .. sourcecode:: http
+
+            HTTP/1.1 204 No Content
+
+        **Response Error**:
+
+        .. sourcecode:: http
+
+            HTTP/1.1 401 Unauthorized
+
+        .. sourcecode:: http
+
+            HTTP/1.1 404 Not Found
+
+        """
+
+        self.database_service.close_query(cursor_id)
@@ -328,9 +328,13 @@ class MoveFile(Resource):
 
         **Request**:
 
+        **URL Parameters**:
+
         .. sourcecode:: http
 
-            None
+            to=<path/to/destination>    # The destination path.
+            recursive=<true|false>      # [optional] Move the folder by path with all files under it. Default is 'false'.
+                                        #            The interrupted moving can be resumed by the same request.
 
         **Response OK**:
 
@@ -375,6 +379,8 @@ class MoveFile(Resource):
         if path == dst_path:
             raise InvalidParameterException(f'The source file {path} can be moved to a target file with the same name')
 
+        if RV.get_args().get_opt('recursive', bool, False):
+            return self.files_service.move_folder(path, dst_path)
         return self.files_service.move_file(path, dst_path)
 
 
@@ -389,9 +395,12 @@ class DeleteFile(Resource):
 
         **Request**:
 
+        **URL Parameters**:
+
         .. sourcecode:: http
 
-            None
+            recursive=<true|false>      # [optional] Delete the folder by path with all files under it. Default is 'false'.
+                                        #            The interrupted deletion can be resumed by the same request.
 
         **Response OK**:
 
@@ -422,4 +431,87 @@ class DeleteFile(Resource):
         if not path:
             raise InvalidParameterException('Resource path is mandatory, but its missing.')
 
+        if RV.get_args().get_opt('recursive', bool, False):
+            return self.files_service.delete_folder(path)
         return self.files_service.delete_file(path)
+
+
+class Batch(Resource):
+    def __init__(self):
+        self.files_service = FilesService()
+
+    def post(self):
+        """ Run the operations (delete, move, copy, properties) on the files by order in one request.
+
+        .. :quickref: 04 Files; Batch operations
+
+        The operations run one by one, the later one sees the changes of the earlier ones.
+        The failed operation does not stop the others, the max count of the operations is 1000 by default.
+
+        **Request**:
+
+        .. code-block:: json
+
+            {
+                "operations": [{
+                    "op": "delete",
+                    "path": "<path/to/res>"
+                }, {
+                    "op": "move",                       # or "copy"
+                    "path": "<path/to/res>",
+                    "dest": "<path/to/destination>"
+                }, {
+                    "op": "properties",
+                    "path": "<path/to/res>"
+                }]
+            }
+
+        **Response OK**:
+
+        .. sourcecode:: http
+
+            HTTP/1.1 201 Created
+
+        .. code-block:: json
+
+            {
+                "results": [{
+                    "status": 204
+                }, {
+                    "status": 200,
+                    "name": "<path/to/destination>"
+                }, {
+                    "status": 404,
+                    "error": {
+                        "message": "The file <path/to/res> does not exist."
+                    }
+                }]
+            }
+
+        The result of the operation 'properties' is the same as the properties of 'GET /vault/files/<path>?comp=metadata'.
+
+        **Response Error**:
+
+        .. sourcecode:: http
+
+            HTTP/1.1 400 Bad Request
+
+        .. sourcecode:: http
+
+            HTTP/1.1 401 Unauthorized
+
+        .. sourcecode:: http
+
+            HTTP/1.1 403 Forbidden
+
+        .. sourcecode:: http
+
+            HTTP/1.1 507 Insufficient Storage
+
+        """
+
+        operations = RV.get_body().get('operations', list)
+        if not operations:
+            raise InvalidParameterException('The operations MUST not be empty.')
+
+        return self.files_service.batch(operations)
@@ -180,3 +180,53 @@ class FilledOrders(Resource):
         """
 
         return self.provider.get_filled_orders()
+
+
+class Jobs(Resource):
+    def __init__(self):
+        self.provider = Provider()
+
+    def get(self):
+        """ Get the last run of every scheduler job of the nodes sharing the same MongoDB.
+
+        .. :quickref: 09 Provider; Get Jobs
+
+        **Request**:
+
+        .. sourcecode:: http
+
+            None
+
+        **Response OK**:
+
+        .. sourcecode:: http
+
+            HTTP/1.1 200 OK
+
+        .. code-block:: json
+
+            {
+                "jobs": [{
+                    "name": "expire_vault_job",
+                    "owner": "<host name>:<pid>",
+                    "last_run": <the start timestamp|int>,
+                    "duration": <seconds|float>,
+                    "items": <the count of the processed items|int>,
+                    "state": <success|failed>,
+                    "error": <the error message if failed|str>
+                }]
+            }
+
+        **Response Error**:
+
+        .. sourcecode:: http
+
+            HTTP/1.1 401 Unauthorized
+
+        .. sourcecode:: http
+
+            HTTP/1.1 403 Forbidden
+
+        """
+
+        return self.provider.get_jobs()
@@ -48,6 +48,15 @@ class AboutTestCase(unittest.TestCase):
         self.assertGreaterEqual(response.json().get('user_count'), 0)
         self.assertGreaterEqual(response.json().get('vault_count'), 0)
         self.assertGreaterEqual(response.json().get('backup_count'), 0)
+        self.assertGreaterEqual(response.json().get('temp_files'), 0)
+        self.assertGreaterEqual(response.json().get('temp_size'), 0)
+
+    def test04_get_node_ready(self):
+        response = self.cli.get(f'/node/ready', need_token=False)
+        self.assertIn(response.status_code, [200, 503])
+        if response.status_code == 200:
+            self.assertTrue(response.json().get('ready'))
+            self.assertEqual(response.json().get('state'), 'ready')
 
     def verify_ownership_presentation(self, presentation: any):
         if type(presentation) is not dict:
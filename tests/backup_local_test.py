@@ -126,6 +126,15 @@ class IpfsBackupTestCase(unittest.TestCase):
         self.assertEqual(r.status_code, 201)
         self.check_result()
 
+    def test02_backup_incremental(self):
+        # the second backup only sends the delta since the first one.
+        response = self.cli.put(f'/vault/files/incremental_{self.src_file_name}', b'incremental content', is_json=False)
+        self.assertEqual(response.status_code, 200)
+
+        r = self.cli.post('/vault/content?to=hive_node', body={'credential': self.cli.get_backup_credential()})
+        self.assertEqual(r.status_code, 201)
+        self.check_result()
+
     def test03_restore(self):
         self.vault_unsubscribe()
         self.vault_subscribe()
@@ -324,6 +324,50 @@ class DatabaseTestCase(unittest.TestCase):
         ids = list(map(lambda i: str(i['_id']), items))
         self.assertTrue(all(ids[i] >= ids[i + 1] for i in range(len(ids) - 1)))
 
+    def test06_query_with_cursor(self):
+        def query(page_size=None):
+            options = {'sort': [('_id', pymongo.ASCENDING)]}
+            if page_size:
+                options['page_size'] = page_size
+            response = self.cli.post(f'/db/query', body={
+                "collection": self.collection_name,
+                "filter": {"author": "Alice"},
+                "options": options})
+            RA(response).assert_status(201)
+            return RA(response).body()
+
+        all_ids = [str(i['_id']) for i in query().get('items', list)]
+        self.assertTrue(len(all_ids) > 2)
+
+        # get the next pages by the cursor.
+        body = query(page_size=2)
+        ids = [str(i['_id']) for i in body.get('items', list)]
+        self.assertEqual(len(ids), 2)
+        cursor_id = body.get('cursor_id', str)
+        while cursor_id:
+            response = self.cli.get(f'/db/query/{cursor_id}')
+            RA(response).assert_status(200)
+            ids.extend([str(i['_id']) for i in RA(response).body().get('items', list)])
+            cursor_id = RA(response).body()['cursor_id']
+        self.assertEqual(ids, all_ids)
+
+        # the cursor is removed after the last page.
+        response = self.cli.get(f'/db/query/{body.get("cursor_id", str)}')
+        RA(response).assert_status(404)
+
+    def test06_query_with_closed_cursor(self):
+        response = self.cli.post(f'/db/query', body={
+            "collection": self.collection_name,
+            "filter": {"author": "Alice"},
+            "options": {"page_size": 1}})
+        RA(response).assert_status(201)
+        cursor_id = RA(response).body().get('cursor_id', str)
+
+        response = self.cli.delete(f'/db/query/{cursor_id}')
+        RA(response).assert_status(204)
+        response = self.cli.get(f'/db/query/{cursor_id}')
+        RA(response).assert_status(404)
+
     def test06_query_with_invalid_parameter(self):
         response = self.cli.post(f'/db/query')
         RA(response).assert_status(400)
@@ -10,7 +10,7 @@ import nacl.secret
 import nacl.utils
 
 from src.modules.backup.encryption import Encryption
-from src.modules.files.local_file import LocalFile
+from src.utils.temp_files import temp_files
 from src.utils.did.eladid_wrapper import DIDDocument, Cipher, CipherDecryptionStream, CipherEncryptionStream
 from src.settings import hive_setting
 from tests.utils.http_client import HttpClient
@@ -68,7 +68,7 @@ class CipherTestCase(unittest.TestCase):
     @unittest.skip
     def test_encryption2(self):
         message = b'hello world' * 1000
-        tmp_file = LocalFile.generate_tmp_file_path()
+        tmp_file = temp_files.allocate()
         with open(tmp_file, 'wb') as f:
             f.write(message)
 
@@ -81,6 +81,12 @@ class CipherTestCase(unittest.TestCase):
 
         self.assertEqual(message, plain_data)
 
+        # the cached ciphers and public key are used again.
+        self.assertEqual(pk_client, Encryption.get_service_did_public_key(False))
+        cipher_path = Encryption.encrypt_file_with_curve25519(tmp_file, pk_client, True)
+        plain_path = Encryption.decrypt_file_with_curve25519(cipher_path, pk_server, False)
+        self.assertEqual(message, plain_path.read_bytes())
+
     @unittest.skip
     def test_pynacl(self):
         message = b"The president will be exiting through the lower levels"
@@ -102,3 +108,42 @@ class CipherTestCase(unittest.TestCase):
         decode_data = base58.b58decode(bytes(encode_data, 'utf8'))
         print(data, encode_data, decode_data)
         self.assertEqual(data, decode_data)
+
+    def test_encryption_stream(self):
+        message = b'hello world' * 100000
+        tmp_file = temp_files.allocate()
+        with open(tmp_file, 'wb') as f:
+            f.write(message)
+
+        encryption = Encryption(chunk_size=4096)
+        cipher_path = encryption.encrypt_file(tmp_file)
+        secret_key, nonce = encryption.get_private_key()
+        plain_path = Encryption(secret_key, nonce).decrypt_file(cipher_path)
+        self.assertEqual(message, plain_path.read_bytes())
+
+        # the old format which encrypts the whole data by SecretBox.
+        cipher_path.write_bytes(encryption.box.encrypt(message, encryption.nonce).ciphertext)
+        plain_path = Encryption(secret_key, nonce).decrypt_file(cipher_path)
+        self.assertEqual(message, plain_path.read_bytes())
+
+        for p in (tmp_file, cipher_path, plain_path):
+            p.unlink()
+
+    def test_encryption_negotiate(self):
+        self.assertEqual(Encryption.negotiate(Encryption.get_supported()), Encryption.SECRET_STREAM)
+        self.assertEqual(Encryption.negotiate([]), Encryption.SECRET_BOX)
+
+        # the old node decrypts the whole data by SecretBox.
+        message = b'hello world' * 1000
+        tmp_file = temp_files.allocate()
+        tmp_file.write_bytes(message)
+
+        encryption = Encryption(format_=Encryption.SECRET_BOX)
+        cipher_path = encryption.encrypt_file(tmp_file)
+        self.assertEqual(message, encryption.box.decrypt(cipher_path.read_bytes(), encryption.nonce))
+
+        plain_path = Encryption(*encryption.get_private_key()).decrypt_file(cipher_path)
+        self.assertEqual(message, plain_path.read_bytes())
+
+        for p in (tmp_file, cipher_path, plain_path):
+            p.unlink()
@@ -5,6 +5,7 @@ Testing file for the ipfs-files module.
 """
 import os
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 from src import hive_setting
 
@@ -241,6 +242,104 @@ class IpfsFilesTestCase(unittest.TestCase):
         response = self.cli.delete(f'/files/{file_name}')
         self.assertEqual(response.status_code, 204)
 
+    def test10_upload_files_concurrently(self):
+        # the temporary files of the concurrent uploads are different and removed after uploading.
+        node_cli, count = HttpClient(f'/api/v2'), 200
+        temp_files = node_cli.get('/node/info').json().get('temp_files')
+        files = {f'{self.folder_name}/concurrent/file{i}.txt': f'File Content {i}: ' + str(i) * 1000 for i in range(count)}
+
+        def upload_file(name):
+            return self.cli.put(f'/files/{name}', files[name].encode(), is_json=False).status_code
+
+        with ThreadPoolExecutor(32) as pool:
+            self.assertEqual(list(pool.map(upload_file, files.keys())), [200] * count)
+
+        for name, content in files.items():
+            response = self.cli.get(f'/files/{name}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.text, content)
+        self.assertLessEqual(node_cli.get('/node/info').json().get('temp_files'), temp_files)
+
+        for name in files.keys():
+            self.__delete_file(name)
+
+    def test11_batch_operations(self):
+        name1, name2, name3 = f'{self.folder_name}/batch1.txt', f'{self.folder_name}/batch2.txt', f'{self.folder_name}/batch3.txt'
+        response = self.cli.put(f'/files/{name1}', self.src_file_content.encode(), is_json=False)
+        RA(response).assert_status(200)
+
+        with VaultFreezer() as _:
+            response = self.cli.post('/files', {'operations': [{'op': 'delete', 'path': name1}]})
+            RA(response).assert_status(HttpCode.FORBIDDEN)
+
+        # copy 1 -> 2, move 2 -> 3, properties of 3, delete 1, delete the not existing one.
+        operations = [{'op': 'copy', 'path': name1, 'dest': name2},
+                      {'op': 'move', 'path': name2, 'dest': name3},
+                      {'op': 'properties', 'path': name3},
+                      {'op': 'delete', 'path': name1},
+                      {'op': 'delete', 'path': self.name_not_exist},
+                      {'op': 'move', 'path': name3, 'dest': name3},
+                      {'op': 'unknown', 'path': name3}]
+        with VaultFilesUsageChecker(0) as _:
+            response = self.cli.post('/files', {'operations': operations})
+            RA(response).assert_status(201)
+            results = RA(response).body().get('results', list)
+            self.assertEqual([r['status'] for r in results], [200, 200, 200, 204, 404, 400, 400])
+            self.assertEqual(results[1]['name'], name3)
+            self.assertEqual(results[2]['name'], name3)
+            self.assertEqual(results[2]['size'], len(self.src_file_content))
+
+        self.__check_remote_file_exist(name3)
+        for name in [name1, name2]:
+            response = self.cli.get(f'/files/{name}?comp=metadata')
+            RA(response).assert_status(404)
+
+        response = self.cli.get(f'/files/{name3}')
+        RA(response).assert_status(200)
+        self.assertEqual(response.text, self.src_file_content)
+
+        with VaultFilesUsageChecker(-len(self.src_file_content)) as _:
+            response = self.cli.post('/files', {'operations': [{'op': 'delete', 'path': name3}]})
+            RA(response).assert_status(201)
+            self.assertEqual(RA(response).body().get('results', list)[0]['status'], 204)
+
+    def test11_batch_operations_invalid_parameter(self):
+        response = self.cli.post('/files', {'operations': []})
+        RA(response).assert_status(400)
+
+        response = self.cli.post('/files', {'operations': {'op': 'delete'}})
+        RA(response).assert_status(400)
+
+    def test12_move_delete_folder(self):
+        src_dir, dst_dir = f'{self.folder_name}/folder_src', f'{self.folder_name}/folder_dst'
+        names = ['file1.txt', 'sub/file2.txt', 'sub/sub/file3.txt']
+        for name in names:
+            response = self.cli.put(f'/files/{src_dir}/{name}', self.src_file_content.encode(), is_json=False)
+            RA(response).assert_status(200)
+
+        # the folder can not be moved into itself.
+        response = self.cli.patch(f'/files/{src_dir}?to={src_dir}/sub&recursive=true')
+        RA(response).assert_status(400)
+
+        with VaultFilesUsageChecker(0) as _:
+            response = self.cli.patch(f'/files/{src_dir}?to={dst_dir}&recursive=true')
+            RA(response).assert_status(200)
+            RA(response).body().assert_equal('name', dst_dir)
+
+        for name in names:
+            self.__check_remote_file_exist(f'{dst_dir}/{name}')
+        response = self.cli.get(f'/files/{src_dir}?comp=children')
+        RA(response).assert_status(404)
+
+        with VaultFilesUsageChecker(-len(self.src_file_content) * len(names)) as _:
+            response = self.cli.delete(f'/files/{dst_dir}?recursive=true')
+            RA(response).assert_status(204)
+
+        response = self.cli.get(f'/files/{dst_dir}?comp=children')
+        RA(response).assert_status(404)
+        response = self.cli.delete(f'/files/{dst_dir}?recursive=true')
+        RA(response).assert_status(404)
+
     def __check_remote_file_exist(self, file_name):
         response = self.cli.get(f'/files/{file_name}?comp=metadata')
         self.assertEqual(response.status_code, 200)
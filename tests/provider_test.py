@@ -37,3 +37,8 @@ class ProviderTestCase(unittest.TestCase):
     def test03_get_filled_orders(self):
         response = self.cli_owner.get(f'/filled_orders')
         self.assertTrue(response.status_code in [200, 404])
+
+    def test04_get_jobs(self):
+        response = self.cli_owner.get(f'/jobs')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.json().get('jobs'), list)
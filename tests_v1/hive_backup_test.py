@@ -3,7 +3,6 @@ import sys
 import unittest
 import logging
 from io import BytesIO
-import pickle
 
 import requests
 from flask import appcontext_pushed, g
@@ -15,9 +14,10 @@ from hive.util.constants import DID, HIVE_MODE_TEST, DID_INFO_DB_NAME, VAULT_ORD
     INTER_BACKUP_SAVE_FINISH_URL, INTER_BACKUP_RESTORE_FINISH_URL, APP_ID, INTER_BACKUP_PATCH_HASH_URL, \
     INTER_BACKUP_FILE_URL, INTER_BACKUP_PATCH_DELTA_URL, CHUNK_SIZE
 from hive.util.did_info import get_all_did_info_by_did
+from hive.util.file_transfer import FileTransfer
 from hive.util.payment.vault_backup_service_manage import setup_vault_backup_service, update_vault_backup_service_item
 from hive.util.payment.vault_service_manage import delete_user_vault, setup_vault_service, get_vault_path
-from hive.util.pyrsync import rsyncdelta, rsyncdelta
+from hive.util.pyrsync import rsyncdelta, encode_delta
 from src import create_app
 from tests_v1 import test_common
 from tests_v1.test_common import upsert_collection, create_upload_file, prepare_vault_data, copy_to_backup_data, \
@@ -278,7 +278,8 @@ class HiveBackupTestCase(unittest.TestCase):
         delta_list = rsyncdelta(new_file, hashes, blocksize=CHUNK_SIZE)
 
         with open("test_patch.delta", "wb") as f:
-            pickle.dump(delta_list, f)
+            for chunk in encode_delta(delta_list):
+                f.write(chunk)
 
         with open("test_patch.delta", "rb") as f:
             self.post_backup_file_delta(file_name, f)
@@ -302,7 +303,7 @@ class HiveBackupTestCase(unittest.TestCase):
         with open(src_file.as_posix(), "wb") as f:
             f.write(file_new_content.encode(encoding="utf-8"))
 
-        HiveBackup.patch_remote_file(src_file.as_posix(), dst_file_name, host, token)
+        HiveBackup.patch_remote_file(src_file.as_posix(), dst_file_name, FileTransfer(host, token))
 
         file_get_content2 = self.get_backup_file(dst_file_name)
         self.assertEqual(file_new_content, str(file_get_content2, "utf-8"))
@@ -327,7 +328,7 @@ class HiveBackupTestCase(unittest.TestCase):
             file_local_content = f.read()
         self.assertEqual(file_new_content, str(file_local_content, "utf-8"))
 
-        HiveBackup.patch_local_file(src_file_name, dst_file.as_posix(), host, token)
+        HiveBackup.patch_local_file(src_file_name, dst_file.as_posix(), FileTransfer(host, token))
 
         with open(dst_file.as_posix(), "rb") as f:
             file_local_content = f.read()
@@ -1,6 +1,8 @@
 import json
 import operator
 import sys
+import threading
+import time
 import unittest
 import logging
 
@@ -14,6 +16,7 @@ from hive.settings import hive_setting
 from hive.util.constants import DID_INFO_DB_NAME, HIVE_MODE_TEST, SUB_MESSAGE_COLLECTION, SUB_MESSAGE_PUB_DID, \
     SUB_MESSAGE_PUB_APPID, PUB_CHANNEL_COLLECTION, PUB_CHANNEL_PUB_DID, PUB_CHANNEL_PUB_APPID
 from hive.util.error_code import ALREADY_EXIST, NOT_FOUND
+from hive.util.pubsub.pb_exchanger import pubsub_push_message
 from src import create_app
 from tests_v1 import test_common
 from tests_v1.hive_auth_test import DIDApp, DApp
@@ -172,13 +175,14 @@ class HivePubsubTestCase(unittest.TestCase):
         self.assert200(s)
         self.assertEqual(r["_status"], "OK")
 
-    def pop_message(self, pub_did, pub_appid, channel_name, limit, token):
+    def pop_message(self, pub_did, pub_appid, channel_name, limit, token, wait_ms=0):
         auth = self.get_auth(token)
         data = {
             "pub_did": pub_did,
             "pub_app_id": pub_appid,
             "channel_name": channel_name,
-            "message_limit": limit
+            "message_limit": limit,
+            "wait_ms": wait_ms
         }
         r, s = self.parse_response(
             self.test_client.post('/api/v1/pubsub/pop',
@@ -382,6 +386,47 @@ class HivePubsubTestCase(unittest.TestCase):
         messages1 = self.pop_message(self.did, self.app_id, "test_channel1", 10, token1)
         self.assertTrue(operator.eq(messages1, list()))
 
+    def test_subscribe_after_push(self):
+        self.publish_channel("test_channel1")
+        self.user_did1 = DIDApp("didapp",
+                                "clever bless future fuel obvious black subject cake art pyramid member clump")
+        self.testapp1 = DApp("testapp", test_common.app_id,
+                             "chimney limit involve fine absent topic catch chalk goat era suit leisure")
+        token1, hive_did = test_common.test_auth_common(self, self.user_did1, self.testapp1)
+
+        # the messages before subscribing are not popped.
+        self.push_message("test_channel1", "message_before")
+        self.subscribe_channel(self.did, self.app_id, "test_channel1", token1)
+        self.push_message("test_channel1", "message_after")
+        messages1 = self.pop_message(self.did, self.app_id, "test_channel1", 10, token1)
+        self.assertEqual([m["message"] for m in messages1], ["message_after"])
+
+    def test_pop_wait_message(self):
+        self.publish_channel("test_channel1")
+        self.user_did1 = DIDApp("didapp",
+                                "clever bless future fuel obvious black subject cake art pyramid member clump")
+        self.testapp1 = DApp("testapp", test_common.app_id,
+                             "chimney limit involve fine absent topic catch chalk goat era suit leisure")
+        token1, hive_did = test_common.test_auth_common(self, self.user_did1, self.testapp1)
+        self.subscribe_channel(self.did, self.app_id, "test_channel1", token1)
+
+        # empty channel returns after waiting.
+        start = time.time()
+        messages1 = self.pop_message(self.did, self.app_id, "test_channel1", 10, token1, wait_ms=500)
+        self.assertTrue(operator.eq(messages1, list()))
+        self.assertTrue(time.time() - start >= 0.5)
+
+        # returns as soon as the message is pushed.
+        timer = threading.Timer(0.5, pubsub_push_message,
+                                (self.did, self.app_id, "test_channel1", "message_wait", time.time()))
+        timer.start()
+        start = time.time()
+        messages1 = self.pop_message(self.did, self.app_id, "test_channel1", 10, token1, wait_ms=10000)
+        timer.join()
+        self.assertEqual(len(messages1), 1)
+        self.assertEqual(messages1[0]["message"], "message_wait")
+        self.assertTrue(time.time() - start < 5)
+
 
 if __name__ == '__main__':
     unittest.main()
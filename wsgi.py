@@ -0,0 +1,11 @@
+"""
+The entry of the WSGI server, such as gunicorn (see gunicorn.conf.py):
+
+$ gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import os
+
+from src import create_app
+from src.utils.consts import HIVE_MODE_PROD
+
+app = create_app(os.environ.get('HIVE_MODE', HIVE_MODE_PROD))